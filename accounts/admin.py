@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, MemberProfile, Guarantor, Notification
+from .models import UserProfile, MemberProfile, Guarantor, Notification, ArchivedNotification
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -44,3 +44,14 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('recipient')
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'notification_type', 'title', 'created_at', 'archived_at']
+    list_filter = ['notification_type', 'created_at']
+    search_fields = ['recipient__username', 'recipient__first_name', 'recipient__last_name', 'title', 'message']
+    readonly_fields = ['created_at', 'archived_at']
+    ordering = ['-created_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('recipient')
@@ -5,3 +5,10 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
 
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from tblsaccos.database import configure_sqlite
+        from . import signals  # noqa: F401
+
+        # Tune every SQLite connection the project opens (see tblsaccos.database)
+        connection_created.connect(configure_sqlite, dispatch_uid='tblsaccos.configure_sqlite')
@@ -1,3 +1,8 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
 def user_type_processor(request):
     """Context processor to make user_type available in all templates"""
     if request.user.is_authenticated:
@@ -18,98 +23,24 @@ def user_type_processor(request):
     }
 
 
-def notifications_processor(request):
-    """Context processor to provide notification data globally"""
-    if request.user.is_authenticated:
-        try:
-            unread_count = request.user.notifications.filter(is_read=False).count()
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error in notifications_processor: {e}")
-            unread_count = 0
-    else:
-        unread_count = 0
-    
-    return {
-        'unread_notifications_count': unread_count
-    }
-
-
-def guarantor_requests_processor(request):
-    """Context processor to provide guarantor requests count globally"""
-    if request.user.is_authenticated:
-        try:
-            from loans.models import LoanApplication
-            from django.db.models import Q
-            
-            # Count pending guarantor requests for this user
-            guarantor_count = LoanApplication.objects.filter(
-                Q(guarantor_approvals__guarantor=request.user) & 
-                Q(guarantor_approvals__approved_at__isnull=True)
-            ).distinct().count()
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error in guarantor_requests_processor: {e}")
-            guarantor_count = 0
-    else:
-        guarantor_count = 0
-    
-    return {
-        'guarantor_requests_count': guarantor_count
-    }
-
-
-def pending_payments_processor(request):
-    """Context processor to provide pending payments count for accountants"""
-    if request.user.is_authenticated:
-        try:
-            from loans.models import LoanApplication
-            
-            # Count pending payments for accountants (loans approved by committee)
-            if hasattr(request.user, 'profile') and request.user.profile.user_type in ['accountant', 'admin']:
-                pending_payments = LoanApplication.objects.filter(status='committee_approved').count()
-            else:
-                pending_payments = 0
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error in pending_payments_processor: {e}")
-            pending_payments = 0
-    else:
-        pending_payments = 0
-    
-    return {
-        'pending_payments': pending_payments
-    }
-
+def nav_counters_processor(request):
+    """Context processor to provide every navigation badge count globally"""
+    from .counters import EMPTY_COUNTERS, get_nav_counters
 
-def pending_applications_processor(request):
-    """Context processor to provide pending applications count for staff"""
-    pending_count = 0  # Initialize default value
-    
-    if request.user.is_authenticated:
-        try:
-            from loans.models import LoanApplication
-            
-            if hasattr(request.user, 'profile'):
-                user_type = request.user.profile.user_type
-                
-                if user_type == 'hr_officer':
-                    # HR officers see guarantor-approved applications
-                    pending_count = LoanApplication.objects.filter(status='guarantor_approved').count()
-                elif user_type == 'loan_officer':
-                    # Loan officers see HR-reviewed applications
-                    pending_count = LoanApplication.objects.filter(status='hr_reviewed').count()
-                elif user_type == 'committee_member':
-                    # Committee members see loan officer approved applications
-                    pending_count = LoanApplication.objects.filter(status='loan_officer_approved').count()
-                # else: pending_count remains 0 (default)
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error in pending_applications_processor: {e}")
-            pending_count = 0  # Reset to 0 on error
-    
-    return {
-        'pending_applications': pending_count
-    }
+    if not request.user.is_authenticated:
+        return dict(EMPTY_COUNTERS, unread_notifications_count=0)
 
+    try:
+        profile = request.user.profile
+        user_type, unread = profile.user_type, profile.unread_notifications
+    except Exception:
+        user_type, unread = 'member', 0
 
+    try:
+        counters = get_nav_counters(request.user, user_type)
+    except Exception:
+        # A failing badge must not break every page
+        logger.exception('Could not compute navigation counters for user %s', request.user.pk)
+        counters = EMPTY_COUNTERS
+    # The unread badge comes from the profile row, which is already loaded
+    return dict(counters, unread_notifications_count=max(unread, 0))
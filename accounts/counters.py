@@ -0,0 +1,77 @@
+"""
+Navigation badge counters.
+
+Every badge shown in the sidebar and top bar (pending guarantor requests,
+workspace queues and pending payments) is computed here in a single query and
+cached per user through ``loans.caching``: any loan application change
+invalidates every user's counters (workspace queues are shared by role), and a
+guarantor request change invalidates the guarantor's. The unread notifications
+badge is read straight from the denormalized counter on the user's profile.
+"""
+
+from django.db.models import F, Func, IntegerField, Subquery, Value
+
+from loans import caching
+
+# How long a user's counters may be served from cache before being recomputed
+NAV_COUNTERS_TIMEOUT = 120
+
+# Loan status each staff role is waiting on in their workspace
+ROLE_PENDING_STATUS = {
+    'hr_officer': 'guarantor_approved',
+    'loan_officer': 'hr_reviewed',
+    'committee_member': 'loan_officer_approved',
+}
+
+# Roles that process payments for committee approved loans
+PAYMENT_ROLES = ['accountant', 'admin']
+
+EMPTY_COUNTERS = {
+    'guarantor_requests_count': 0,
+    'pending_payments': 0,
+    'pending_applications': 0,
+}
+
+
+def _count(queryset):
+    """Wrap a queryset as a scalar COUNT(*) subquery"""
+    return Subquery(
+        queryset.order_by().annotate(total=Func(F('pk'), function='COUNT')).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def compute_nav_counters(user, user_type):
+    """Compute every badge for a user in one database round trip"""
+    from django.contrib.auth.models import User
+    from loans.models import GuarantorApproval, LoanApplication
+
+    pending_status = ROLE_PENDING_STATUS.get(user_type)
+
+    counters = User.objects.filter(pk=user.pk).values(
+        # GuarantorApproval is unique per (application, guarantor), so each
+        # open row is one distinct pending application
+        guarantor_requests_count=_count(
+            GuarantorApproval.objects.filter(guarantor=user, approved_at__isnull=True)
+        ),
+        pending_payments=(
+            _count(LoanApplication.objects.filter(status='committee_approved'))
+            if user_type in PAYMENT_ROLES else Value(0)
+        ),
+        pending_applications=(
+            _count(LoanApplication.objects.filter(status=pending_status))
+            if pending_status else Value(0)
+        ),
+    ).first()
+
+    return counters or dict(EMPTY_COUNTERS)
+
+
+def get_nav_counters(user, user_type):
+    """Return the cached badge counters for a user, computing them on a miss"""
+    return caching.cached(
+        f'nav_counters:{user.pk}:{user_type}',
+        [caching.LOANS, caching.user_scope(user.pk)],
+        lambda: compute_nav_counters(user, user_type),
+        NAV_COUNTERS_TIMEOUT,
+    )
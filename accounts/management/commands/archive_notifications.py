@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from accounts.retention import archive_notifications, retention_days
+
+class Command(BaseCommand):
+    help = 'Move old read notifications into the notification archive (run daily as a scheduled task)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Archive read notifications older than this many days (default: NOTIFICATION_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of notifications moved per transaction'
+        )
+        parser.add_argument(
+            '--export', metavar='PATH', default=None,
+            help='Also append the archived notifications to this gzip-compressed JSON lines file'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        archived = archive_notifications(
+            older_than_days=days,
+            batch_size=options['batch_size'],
+            export_path=options['export'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully archived {archived} notifications older than {days} days.')
+        )
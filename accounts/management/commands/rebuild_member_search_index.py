@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from accounts.search import rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the member search index used by the guarantor picker'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully indexed {indexed} members.')
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from accounts.notifications import reconcile_unread_counters
+
+class Command(BaseCommand):
+    help = 'Correct drifted unread notification counters from the notification table (run periodically)'
+
+    def handle(self, *args, **options):
+        corrected = reconcile_unread_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully reconciled unread counters; {corrected} were corrected.')
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0005_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('guarantor_request', 'Guarantor Request'), ('hr_review_pending', 'HR Review Pending'), ('loan_officer_review_pending', 'Loan Officer Review Pending'), ('committee_review_pending', 'Committee Review Pending'), ('application_approved', 'Application Approved'), ('application_rejected', 'Application Rejected'), ('payment_due', 'Payment Due'), ('general', 'General Update')], max_length=50)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('related_object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('related_object_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['created_at', 'id'], name='notification_read_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivednotification',
+            name='recipient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivednotification',
+            index=models.Index(fields=['recipient', 'created_at'], name='archived_recipient_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:47
+
+from django.db import migrations, models
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_unread_notifications(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    Notification = apps.get_model('accounts', 'Notification')
+    UserProfile.objects.update(unread_notifications=Coalesce(
+        Subquery(
+            Notification.objects.filter(recipient=OuterRef('user_id'), is_read=False).order_by()
+            .values('recipient').annotate(total=Func(F('pk'), function='COUNT')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_notification_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
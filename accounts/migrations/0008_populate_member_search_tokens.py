@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:20
+
+import re
+
+from django.db import migrations
+
+# A frozen copy of accounts.search's tokenizer as of this migration, so later
+# changes to it never rewrite what this migration did
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(*values):
+    tokens = set()
+    for value in values:
+        if value:
+            text = str(value).lower()
+            tokens.update(_WORD_RE.findall(text))
+            tokens.add(text.strip())
+    return {token[:100] for token in tokens if token}
+
+
+def member_tokens(user, profile):
+    return tokenize(user.first_name, user.last_name, profile.employee_id, profile.department)
+
+
+def build_member_search_index(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    MemberSearchToken = apps.get_model('accounts', 'MemberSearchToken')
+    MemberSearchToken.objects.all().delete()
+    tokens = []
+    for profile in UserProfile.objects.filter(user_type='member', is_active=True).select_related('user').iterator(chunk_size=1000):
+        tokens.extend(
+            MemberSearchToken(user_id=profile.user_id, token=token)
+            for token in member_tokens(profile.user, profile)
+        )
+        if len(tokens) >= 1000:
+            MemberSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    MemberSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_userprofile_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_member_search_index, migrations.RunPython.noop),
+    ]
@@ -20,6 +20,8 @@ class UserProfile(models.Model):
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Denormalized badge count, kept in step by accounts.notifications
+    unread_notifications = models.IntegerField(default=0)
     
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.user.username})"
@@ -92,6 +94,22 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge and dashboard: a recipient's unread notifications
+            models.Index(
+                fields=['recipient', 'created_at'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx',
+            ),
+            # Notification list, newest first
+            models.Index(fields=['recipient', 'created_at'], name='notification_recipient_idx'),
+            # Retention: read notifications, oldest first
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_read=True),
+                name='notification_read_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.recipient.username} - {self.get_notification_type_display()}"
@@ -99,3 +117,34 @@ class Notification(models.Model):
     @property
     def is_unread(self):
         return not self.is_read
+
+class ArchivedNotification(models.Model):
+    """Read notification moved out of Notification by the retention job"""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    notification_type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    related_object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_object_type = models.CharField(max_length=50, null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='archived_recipient_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient.username} - {self.get_notification_type_display()}"
+
+class MemberSearchToken(models.Model):
+    """Lower-cased word of an active member's name, employee id or department"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=100, db_index=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.token}"
+    
+    class Meta:
+        unique_together = ['user', 'token']
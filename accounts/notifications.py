@@ -0,0 +1,142 @@
+"""
+Bulk notification fan-out.
+
+`notify_many` writes one Notification per recipient in a single bulk insert
+and bumps the recipients' unread counters in one UPDATE. Email delivery, when enabled with
+NOTIFICATION_EMAIL_DELIVERY, is queued once the transaction commits and sent
+from a background thread so it never adds to the request's latency.
+`notify_role` fans a notification out to every active staff member of a role,
+and `notify_batch` writes several different notifications in one insert.
+
+Each profile's `unread_notifications` counter is adjusted with F()
+expressions wherever notifications are created or marked read, and
+`reconcile_unread_counters` corrects any drift from the Notification table.
+"""
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import get_connection, EmailMessage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Notification, UserProfile
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_BATCH_SIZE = 500
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notify')
+
+
+def _recipient_ids(recipients):
+    ids = (getattr(recipient, 'pk', recipient) for recipient in recipients)
+    return list(dict.fromkeys(pk for pk in ids if pk is not None))
+
+
+def adjust_unread(user_ids, delta):
+    """Atomically add `delta` to the unread counters of `user_ids`"""
+    if delta:
+        UserProfile.objects.filter(user_id__in=user_ids).update(
+            unread_notifications=F('unread_notifications') + delta
+        )
+
+
+def reconcile_unread_counters():
+    """Reset every drifted unread counter from the Notification table; returns how many were wrong"""
+    actual = Coalesce(
+        Subquery(
+            Notification.objects.filter(recipient=OuterRef('user_id'), is_read=False).order_by()
+            .values('recipient').annotate(total=Func(F('pk'), function='COUNT')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+    return UserProfile.objects.exclude(unread_notifications=actual).update(unread_notifications=actual)
+
+
+def role_members(roles):
+    """Active users holding any of `roles`"""
+    if isinstance(roles, str):
+        roles = [roles]
+    return User.objects.filter(
+        is_active=True, profile__is_active=True, profile__user_type__in=roles
+    )
+
+
+def _deliver_emails(recipient_ids, title, message):
+    close_old_connections()
+    try:
+        addresses = User.objects.filter(pk__in=recipient_ids).exclude(email='').values_list('email', flat=True)
+        emails = [
+            EmailMessage(title, message, settings.DEFAULT_FROM_EMAIL, [address])
+            for address in addresses
+        ]
+        if emails:
+            get_connection().send_messages(emails)
+    except Exception:
+        logger.exception("Failed to deliver notification emails: %s", title)
+    finally:
+        close_old_connections()
+
+
+def queue_delivery(recipient_ids, title, message):
+    """Send email copies of a notification in the background after commit"""
+    if not getattr(settings, 'NOTIFICATION_EMAIL_DELIVERY', False):
+        return
+    transaction.on_commit(lambda: _executor.submit(_deliver_emails, recipient_ids, title, message))
+
+
+def notify_batch(notices):
+    """
+    Write several different notifications at once. `notices` is a list of
+    (recipients, fields) pairs, where recipients are users or user ids and
+    fields are the Notification's type, title, message and related object.
+    Every row goes in one bulk insert. Returns the number created.
+    """
+    rows = []
+    received = Counter()
+    for recipients, fields in notices:
+        recipient_ids = _recipient_ids(recipients)
+        rows.extend(Notification(recipient_id=recipient_id, **fields) for recipient_id in recipient_ids)
+        received.update(recipient_ids)
+        if recipient_ids:
+            queue_delivery(recipient_ids, fields['title'], fields['message'])
+    if not rows:
+        return 0
+
+    Notification.objects.bulk_create(rows, batch_size=NOTIFICATION_BATCH_SIZE)
+    # One counter UPDATE per distinct increment, normally just +1
+    by_count = {}
+    for recipient_id, count in received.items():
+        by_count.setdefault(count, []).append(recipient_id)
+    for count, recipient_ids in by_count.items():
+        adjust_unread(recipient_ids, count)
+    return len(rows)
+
+
+def notify_many(recipients, notification_type, title, message, related_object_id=None, related_object_type=None):
+    """
+    Notify every user in `recipients` (users or user ids) with one bulk insert.
+    Returns the number of notifications created.
+    """
+    return notify_batch([(recipients, {
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'related_object_id': related_object_id,
+        'related_object_type': related_object_type,
+    })])
+
+
+def notify_role(roles, notification_type, title, message, related_object_id=None, related_object_type=None):
+    """Notify every active staff member holding any of `roles`"""
+    recipient_ids = role_members(roles).values_list('pk', flat=True)
+    return notify_many(
+        recipient_ids, notification_type, title, message,
+        related_object_id=related_object_id, related_object_type=related_object_type,
+    )
@@ -0,0 +1,77 @@
+"""
+Notification retention.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are moved from the
+hot Notification table into ArchivedNotification, one batch per transaction,
+so the table the badges and the notification list query stays small. Each
+archived batch can also be appended to a gzip-compressed JSON lines export.
+Unread notifications are never archived.
+"""
+
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from tblsaccos.database import immediate_atomic
+from .models import ArchivedNotification, Notification
+
+DEFAULT_RETENTION_DAYS = 90
+
+ARCHIVED_FIELDS = [
+    'recipient_id', 'notification_type', 'title', 'message',
+    'related_object_id', 'related_object_type', 'created_at',
+]
+
+
+def retention_days():
+    return getattr(settings, 'NOTIFICATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def archivable_notifications(cutoff):
+    return Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('created_at', 'id')
+
+
+@immediate_atomic()
+def _archive_batch(cutoff, batch_size):
+    rows = list(
+        archivable_notifications(cutoff).select_for_update().values('id', *ARCHIVED_FIELDS)[:batch_size]
+    )
+    if not rows:
+        return rows
+    ArchivedNotification.objects.bulk_create([
+        ArchivedNotification(**{field: row[field] for field in ARCHIVED_FIELDS})
+        for row in rows
+    ])
+    Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return rows
+
+
+def archive_notifications(older_than_days=None, batch_size=1000, export_path=None):
+    """
+    Move read notifications older than `older_than_days` into the archive.
+    When `export_path` is given, archived rows are also appended to it as
+    gzip-compressed JSON lines. Returns the number of notifications archived.
+    """
+    days = retention_days() if older_than_days is None else older_than_days
+    cutoff = timezone.now() - timedelta(days=days)
+    export = gzip.open(export_path, 'at', encoding='utf-8') if export_path else None
+    archived = 0
+    try:
+        while True:
+            rows = _archive_batch(cutoff, batch_size)
+            if not rows:
+                break
+            archived += len(rows)
+            if export:
+                for row in rows:
+                    export.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            if len(rows) < batch_size:
+                break
+    finally:
+        if export:
+            export.close()
+    return archived
@@ -0,0 +1,132 @@
+"""
+Prefix-token search index over active members.
+
+Each active member is indexed as the lower-cased words of their first name,
+last name, employee id and department in MemberSearchToken. A search matches
+every query word as a prefix of some token using an index range scan
+(token >= word AND token < word + U+FFFF) instead of scanning User and
+UserProfile with icontains. Results are cached briefly per normalized query.
+"""
+
+import hashlib
+import re
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Max, Q, When
+
+from .models import MemberSearchToken, UserProfile
+
+SEARCH_RESULTS_LIMIT = 10
+SEARCH_CACHE_TIMEOUT = 30
+MIN_QUERY_LENGTH = 2
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(*values):
+    tokens = set()
+    for value in values:
+        if value:
+            text = str(value).lower()
+            tokens.update(_WORD_RE.findall(text))
+            # Keep identifiers such as "TBL-0042" searchable as typed
+            tokens.add(text.strip())
+    return {token[:100] for token in tokens if token}
+
+
+def member_tokens(user, profile):
+    return tokenize(user.first_name, user.last_name, profile.employee_id, profile.department)
+
+
+def is_searchable(profile):
+    return profile.user_type == 'member' and profile.is_active
+
+
+@transaction.atomic
+def index_member(user_id):
+    """Rebuild the search tokens of a single user"""
+    MemberSearchToken.objects.filter(user_id=user_id).delete()
+    profile = UserProfile.objects.select_related('user').filter(user_id=user_id).first()
+    if profile is None or not is_searchable(profile):
+        return
+    MemberSearchToken.objects.bulk_create([
+        MemberSearchToken(user_id=user_id, token=token)
+        for token in member_tokens(profile.user, profile)
+    ])
+
+
+@transaction.atomic
+def rebuild_index(batch_size=1000):
+    """Rebuild the search tokens of every member from scratch"""
+    MemberSearchToken.objects.all().delete()
+    profiles = UserProfile.objects.filter(user_type='member', is_active=True).select_related('user')
+    tokens = []
+    indexed = 0
+    for profile in profiles.iterator(chunk_size=batch_size):
+        indexed += 1
+        tokens.extend(
+            MemberSearchToken(user_id=profile.user_id, token=token)
+            for token in member_tokens(profile.user, profile)
+        )
+        if len(tokens) >= batch_size:
+            MemberSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    MemberSearchToken.objects.bulk_create(tokens)
+    return indexed
+
+
+def _prefix(word):
+    return Q(token__gte=word, token__lt=word + '\uffff')
+
+
+def _search(words, limit):
+    conditions = [_prefix(word) for word in words]
+    matches = MemberSearchToken.objects.filter(reduce(or_, conditions)).values('user_id').annotate(
+        exact=Count('id', filter=Q(token__in=words)),
+        **{
+            f'word_{i}': Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+            for i, condition in enumerate(conditions)
+        }
+    ).filter(
+        # Every query word has to match one of the member's tokens
+        **{f'word_{i}': 1 for i in range(len(words))}
+    ).order_by('-exact', 'user_id')[:limit]
+
+    ranked_ids = [match['user_id'] for match in matches]
+    if not ranked_ids:
+        return []
+
+    profiles = {
+        profile.user_id: profile
+        for profile in UserProfile.objects.filter(user_id__in=ranked_ids).select_related('user')
+    }
+    results = []
+    for user_id in ranked_ids:
+        profile = profiles.get(user_id)
+        if profile is None:
+            continue
+        results.append({
+            'id': user_id,
+            'full_name': profile.user.get_full_name(),
+            'employee_id': profile.employee_id or 'N/A',
+            'department': profile.department or 'N/A',
+            'username': profile.user.username,
+        })
+    return results
+
+
+def search_members(query, limit=SEARCH_RESULTS_LIMIT):
+    """Ranked active members matching every word of `query` as a prefix"""
+    normalized = ' '.join(_WORD_RE.findall(query.lower()))
+    if len(normalized) < MIN_QUERY_LENGTH:
+        return []
+
+    key = f'member_search:{limit}:{hashlib.md5(normalized.encode()).hexdigest()}'
+    results = cache.get(key)
+    if results is None:
+        results = _search(normalized.split(), limit)
+        cache.set(key, results, SEARCH_CACHE_TIMEOUT)
+    return results
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UserProfile
+from .search import index_member
+
+# User fields that feed the member search index
+SEARCH_USER_FIELDS = {'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Re-index a member when their name changes (but not on every login)"""
+    if update_fields is None or SEARCH_USER_FIELDS & set(update_fields):
+        index_member(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    """Re-index on employee id, department, role or active flag changes"""
+    index_member(instance.user_id)
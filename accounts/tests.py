@@ -0,0 +1,297 @@
+import gzip
+import importlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from loans import workflow
+from loans.models import GuarantorApproval, LoanApplication
+from loans.tests import create_loan_type
+
+from .context_processors import nav_counters_processor
+from .counters import get_nav_counters
+from .models import ArchivedNotification, MemberSearchToken, Notification, UserProfile
+from .notifications import notify_many, notify_role, reconcile_unread_counters
+from .retention import archive_notifications
+from .search import search_members
+from .views import create_notification
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are asserted against SQLite')
+class NotificationIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='member')
+
+    def test_unread_count_uses_partial_index(self):
+        plan = Notification.objects.filter(recipient=self.user, is_read=False).order_by().explain()
+        self.assertIn('USING INDEX notification_unread_idx', plan)
+
+    def test_notification_list_uses_recipient_created_index(self):
+        plan = Notification.objects.filter(recipient=self.user).explain()
+        self.assertIn('USING INDEX notification_recipient_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+def unread(user):
+    return UserProfile.objects.get(user=user).unread_notifications
+
+
+class NotifyManyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username=f'user{i}') for i in range(5)]
+        for user in cls.users:
+            UserProfile.objects.create(user=user)
+
+    def test_bulk_insert_in_constant_queries(self):
+        # One INSERT for the notifications, one UPDATE for the unread counters
+        with self.assertNumQueries(2):
+            created = notify_many(self.users + [self.users[0].pk], 'general', 'Title', 'Message')
+        self.assertEqual(created, 5)
+        self.assertEqual(Notification.objects.filter(title='Title').count(), 5)
+        self.assertEqual([unread(user) for user in self.users], [1] * 5)
+
+    def test_notify_role_reaches_active_staff_only(self):
+        active, inactive, member = self.users[:3]
+        UserProfile.objects.filter(user__in=[active, inactive]).update(user_type='hr_officer')
+        UserProfile.objects.filter(user=inactive).update(is_active=False)
+        notify_role('hr_officer', 'hr_review_pending', 'HR Review Pending', 'Message')
+        self.assertEqual(
+            list(Notification.objects.filter(notification_type='hr_review_pending').values_list('recipient', flat=True)),
+            [active.pk],
+        )
+
+
+class UnreadCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='member')
+        UserProfile.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def notify(self):
+        return create_notification(self.user, 'general', 'Title', 'Message')
+
+    def test_marking_read_decrements_once(self):
+        notification = self.notify()
+        self.notify()
+        self.assertEqual(unread(self.user), 2)
+        url = reverse('accounts:mark_notification_read', args=[notification.pk])
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(unread(self.user), 1)
+
+    def test_mark_all_read_clears_counter(self):
+        self.notify()
+        self.notify()
+        self.client.post(reverse('accounts:mark_all_notifications_read'))
+        self.assertEqual(unread(self.user), 0)
+
+    def test_badge_reads_the_profile_counter(self):
+        self.notify()
+        response = self.client.get(reverse('accounts:notifications'))
+        self.assertEqual(response.context['unread_notifications_count'], 1)
+        self.assertEqual(response.context['unread_count'], 1)
+
+    def test_reconcile_corrects_drift(self):
+        self.notify()
+        UserProfile.objects.filter(user=self.user).update(unread_notifications=7)
+        self.assertEqual(reconcile_unread_counters(), 1)
+        self.assertEqual(unread(self.user), 1)
+        self.assertEqual(reconcile_unread_counters(), 0)
+
+
+class ArchiveNotificationsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='member')
+
+    def notification(self, title, is_read, age_days):
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type='general', title=title, message='Message', is_read=is_read
+        )
+        Notification.objects.filter(pk=notification.pk).update(
+            created_at=timezone.now() - timedelta(days=age_days)
+        )
+
+    def test_moves_only_old_read_notifications(self):
+        self.notification('old read', True, 100)
+        self.notification('old unread', False, 100)
+        self.notification('recent read', True, 10)
+
+        self.assertEqual(archive_notifications(older_than_days=90, batch_size=1), 1)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)), ['old unread', 'recent read']
+        )
+        archived = ArchivedNotification.objects.get()
+        self.assertEqual((archived.recipient, archived.title), (self.user, 'old read'))
+
+    def test_compressed_export(self):
+        for i in range(3):
+            self.notification(f'old {i}', True, 100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.jsonl.gz')
+            self.assertEqual(archive_notifications(older_than_days=90, batch_size=2, export_path=path), 3)
+            with gzip.open(path, 'rt') as export:
+                rows = [json.loads(line) for line in export]
+        self.assertEqual(sorted(row['title'] for row in rows), ['old 0', 'old 1', 'old 2'])
+
+    def test_older_notifications_view_reads_the_archive(self):
+        self.notification('old read', True, 100)
+        archive_notifications(older_than_days=90)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('accounts:older_notifications'))
+        self.assertContains(response, 'old read')
+
+
+class MemberSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.amina = cls.member('amina', 'Amina', 'Juma', 'TBL-0042', 'Finance')
+        cls.juma = cls.member('juma', 'Juma', 'Mrisho', 'TBL-0043', 'Procurement')
+        cls.aminata = cls.member('aminata', 'Aminata', 'Said', 'TBL-0100', 'Finance')
+
+    @staticmethod
+    def member(username, first_name, last_name, employee_id, department, **profile):
+        user = User.objects.create(username=username, first_name=first_name, last_name=last_name)
+        UserProfile.objects.create(user=user, employee_id=employee_id, department=department, **profile)
+        return user
+
+    def setUp(self):
+        # Results are cached per query
+        cache.clear()
+
+    def ids(self, query):
+        return [result['id'] for result in search_members(query)]
+
+    def test_every_word_matches_a_token_prefix(self):
+        self.assertEqual(self.ids('amin'), [self.amina.pk, self.aminata.pk])
+        self.assertEqual(self.ids('amin fin'), [self.amina.pk, self.aminata.pk])
+        self.assertEqual(self.ids('amin proc'), [])
+        self.assertEqual(self.ids('tbl-0042'), [self.amina.pk])
+
+    def test_fragments_inside_a_word_do_not_match(self):
+        # Unlike the former icontains search, words only match from their start
+        self.assertEqual(self.ids('mina'), [])
+        self.assertEqual(self.ids('042'), [])
+        self.assertEqual(self.ids('nance'), [])
+        self.assertEqual(self.ids('finance'), [self.amina.pk, self.aminata.pk])
+
+    def test_exact_tokens_rank_first(self):
+        # Juma Mrisho matches "juma" on his first name, Amina Juma on her last name
+        self.assertEqual(self.ids('juma'), [self.amina.pk, self.juma.pk])
+        self.assertEqual(self.ids('aminata'), [self.aminata.pk])
+
+    def test_short_queries_return_nothing(self):
+        self.assertEqual(search_members('a'), [])
+        self.assertEqual(search_members('  !'), [])
+
+    def test_only_active_members_are_indexed(self):
+        self.member('officer', 'Amina', 'Officer', 'TBL-0200', 'Finance', user_type='loan_officer')
+        profile = UserProfile.objects.get(user=self.aminata)
+        profile.is_active = False
+        profile.save()
+        self.assertEqual(self.ids('amin'), [self.amina.pk])
+
+    def test_renames_are_reindexed(self):
+        self.juma.first_name = 'Baraka'
+        self.juma.save(update_fields=['first_name'])
+        self.assertEqual(self.ids('baraka'), [self.juma.pk])
+        self.assertEqual(self.ids('juma'), [self.amina.pk])
+
+    def test_migration_builds_the_index(self):
+        migration = importlib.import_module('accounts.migrations.0008_populate_member_search_tokens')
+        MemberSearchToken.objects.all().delete()
+        migration.build_member_search_index(apps, None)
+        self.assertEqual(self.ids('amin'), [self.amina.pk, self.aminata.pk])
+
+
+class NavCountersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type('chap_chap')
+        cls.applicant = User.objects.create(username='applicant')
+        UserProfile.objects.create(user=cls.applicant, employee_id='M1')
+        cls.guarantor = User.objects.create(username='guarantor')
+        UserProfile.objects.create(user=cls.guarantor, employee_id='M2')
+        cls.hr_officer = User.objects.create(username='hr')
+        UserProfile.objects.create(user=cls.hr_officer, user_type='hr_officer', employee_id='H1')
+        cls.accountant = User.objects.create(username='accountant')
+        UserProfile.objects.create(user=cls.accountant, user_type='accountant', employee_id='A1')
+
+    def setUp(self):
+        cache.clear()
+
+    def application(self, status):
+        return LoanApplication.objects.create(
+            applicant=self.applicant, loan_type=self.loan_type, status=status, purpose='business',
+            amount=Decimal('100000'), period=12, phone_number='0700000000', department='Finance',
+            bank_name='NMB', account_number='0001', savings_value=Decimal('0'), shares_value=Decimal('0'),
+        )
+
+    def test_role_counters(self):
+        self.application('guarantor_approved')
+        self.application('committee_approved')
+        self.application('committee_approved')
+        self.assertEqual(get_nav_counters(self.hr_officer, 'hr_officer'), {
+            'guarantor_requests_count': 0, 'pending_payments': 0, 'pending_applications': 1,
+        })
+        self.assertEqual(get_nav_counters(self.accountant, 'accountant'), {
+            'guarantor_requests_count': 0, 'pending_payments': 2, 'pending_applications': 0,
+        })
+
+    def test_counters_are_cached_until_an_application_changes(self):
+        self.application('guarantor_approved')
+        self.assertEqual(get_nav_counters(self.hr_officer, 'hr_officer')['pending_applications'], 1)
+        with CaptureQueriesContext(connection) as queries:
+            get_nav_counters(self.hr_officer, 'hr_officer')
+        self.assertEqual(len(queries), 0)
+
+        loan = self.application('guarantor_approved')
+        self.assertEqual(get_nav_counters(self.hr_officer, 'hr_officer')['pending_applications'], 2)
+        loan.status = 'hr_reviewed'
+        loan.save()
+        self.assertEqual(get_nav_counters(self.hr_officer, 'hr_officer')['pending_applications'], 1)
+
+    def test_guarantor_requests_follow_responses(self):
+        loan = self.application('pending')
+        self.assertEqual(get_nav_counters(self.guarantor, 'member')['guarantor_requests_count'], 0)
+        GuarantorApproval.objects.create(loan_application=loan, guarantor=self.guarantor)
+        self.assertEqual(get_nav_counters(self.guarantor, 'member')['guarantor_requests_count'], 1)
+        workflow.respond_as_guarantor(loan, self.guarantor, approve=True)
+        self.assertEqual(get_nav_counters(self.guarantor, 'member')['guarantor_requests_count'], 0)
+
+    def test_processor_adds_the_unread_badge_from_the_profile(self):
+        create_notification(self.guarantor, 'general', 'Title', 'Message')
+        request = RequestFactory().get('/')
+        request.user = User.objects.select_related('profile').get(pk=self.guarantor.pk)
+        self.assertEqual(nav_counters_processor(request)['unread_notifications_count'], 1)
+
+    def test_processor_logs_counter_failures(self):
+        request = RequestFactory().get('/')
+        request.user = self.guarantor
+        with mock.patch('accounts.counters.get_nav_counters', side_effect=RuntimeError('cache down')):
+            with self.assertLogs('accounts.context_processors', 'ERROR'):
+                context = nav_counters_processor(request)
+        self.assertEqual(context['pending_applications'], 0)
@@ -5,6 +5,9 @@ from django.contrib import messages
 from django.contrib.auth.models import User
 from .forms import CustomUserCreationForm, LoginForm, MemberProfileForm
 from .models import UserProfile, MemberProfile
+from .notifications import adjust_unread, queue_delivery
+from .retention import retention_days
+from staff.pagination import keyset_page
 from django.http import JsonResponse
 
 def register_view(request):
@@ -172,7 +175,10 @@ def update_notifications_view(request):
 def notifications(request):
     """View for displaying user notifications"""
     notifications = request.user.notifications.all()[:20]  # Last 20 notifications
-    unread_count = request.user.notifications.filter(is_read=False).count()
+    try:
+        unread_count = max(request.user.profile.unread_notifications, 0)
+    except UserProfile.DoesNotExist:
+        unread_count = 0
     
     context = {
         'notifications': notifications,
@@ -180,21 +186,31 @@ def notifications(request):
     }
     return render(request, 'accounts/notifications.html', context)
 
+@login_required
+def older_notifications(request):
+    """Notifications moved to the archive by the retention job"""
+    page = keyset_page(request.user.archived_notifications.all(), request.GET.get('cursor'))
+    return render(request, 'accounts/older_notifications.html', {
+        'page': page,
+        'retention_days': retention_days(),
+    })
+
 @login_required
 def mark_notification_read(request, notification_id):
     """Mark a notification as read"""
-    try:
-        notification = request.user.notifications.get(id=notification_id)
-        notification.is_read = True
-        notification.save()
-        return JsonResponse({'success': True})
-    except Notification.DoesNotExist:
+    notifications = request.user.notifications.filter(id=notification_id)
+    # Only the request that actually flips is_read decrements the counter
+    if notifications.filter(is_read=False).update(is_read=True):
+        adjust_unread([request.user.pk], -1)
+    elif not notifications.exists():
         return JsonResponse({'success': False, 'error': 'Notification not found'})
+    return JsonResponse({'success': True})
 
 @login_required
 def mark_all_notifications_read(request):
     """Mark all notifications as read"""
-    request.user.notifications.filter(is_read=False).update(is_read=True)
+    marked = request.user.notifications.filter(is_read=False).update(is_read=True)
+    adjust_unread([request.user.pk], -marked)
     return JsonResponse({'success': True})
 
 def get_user_notifications(user):
@@ -204,7 +220,7 @@ def get_user_notifications(user):
 def create_notification(recipient, notification_type, title, message, related_object_id=None, related_object_type=None):
     """Create a new notification"""
     from .models import Notification
-    return Notification.objects.create(
+    notification = Notification.objects.create(
         recipient=recipient,
         notification_type=notification_type,
         title=title,
@@ -212,3 +228,7 @@ def create_notification(recipient, notification_type, title, message, related_ob
         related_object_id=related_object_id,
         related_object_type=related_object_type
     )
+    if not notification.is_read:
+        adjust_unread([notification.recipient_id], 1)
+    queue_delivery([notification.recipient_id], title, message)
+    return notification
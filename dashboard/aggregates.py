@@ -0,0 +1,145 @@
+"""
+Aggregation engine for the admin dashboard charts.
+
+Status, purpose and approved totals come from a single grouped query over
+LoanApplication. Monthly trends are read from DailyApplicationRollup, which
+holds one row per closed day, so only today's applications are ever counted
+live and historical months are never recomputed.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from loans.models import LoanApplication
+from .models import DailyApplicationRollup
+
+# Chart label for each status shown on the admin dashboard
+STATUS_CHART_LABELS = [
+    ('pending', 'Pending'),
+    ('guarantor_approved', 'Guarantor_Approved'),
+    ('hr_reviewed', 'HR_Reviewed'),
+    ('loan_officer_approved', 'Loan_Officer_Approved'),
+    ('committee_approved', 'Committee_Approved'),
+    ('payment_processing', 'Payment_Processing'),
+    ('disbursed', 'Disbursed'),
+    ('rejected', 'Rejected'),
+]
+
+# Number of calendar months shown in the monthly trends chart
+TREND_MONTHS = 6
+
+# Remembers the last range rolled up so the check runs once a day
+ROLLUP_THROUGH_CACHE_KEY = 'dashboard:rollups_through'
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _months_back(day, months):
+    """First day of the month `months` calendar months before `day`"""
+    index = day.year * 12 + (day.month - 1) - months
+    return day.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def application_breakdown():
+    """Status, purpose and approved totals in one grouped query"""
+    rows = LoanApplication.objects.order_by().values('status', 'purpose').annotate(
+        count=Count('id'),
+        approved_amount=Sum('final_approved_amount'),
+        monthly_repayment=Sum('monthly_repayment'),
+    )
+
+    purpose_labels = dict(LoanApplication.LOAN_PURPOSES)
+    status_counts = {}
+    purpose_data = {}
+    total_applications = 0
+    total_loan_amount = 0
+    total_monthly_repayment = 0
+
+    for row in rows:
+        total_applications += row['count']
+        status_counts[row['status']] = status_counts.get(row['status'], 0) + row['count']
+        purpose = purpose_labels.get(row['purpose'], row['purpose'])
+        purpose_data[purpose] = purpose_data.get(purpose, 0) + row['count']
+        if row['status'] == 'committee_approved':
+            total_loan_amount += row['approved_amount'] or 0
+            total_monthly_repayment += row['monthly_repayment'] or 0
+
+    return {
+        'total_applications': total_applications,
+        'status_counts': status_counts,
+        'status_data': {label: status_counts.get(status, 0) for status, label in STATUS_CHART_LABELS},
+        'purpose_data': purpose_data,
+        'total_loan_amount': total_loan_amount,
+        'total_monthly_repayment': total_monthly_repayment,
+    }
+
+
+def ensure_daily_rollups(through=None, earliest=None):
+    """
+    Roll up every closed day from `earliest` (default: the start of the trend
+    window) up to and including `through` (default: yesterday) that has no
+    DailyApplicationRollup row yet. Existing days are never recomputed.
+    """
+    today = timezone.localdate()
+    through = through or today - timedelta(days=1)
+    start = earliest or _months_back(today, TREND_MONTHS - 1)
+    if cache.get(ROLLUP_THROUGH_CACHE_KEY) == (start, through):
+        return 0
+
+    rolled_up = set(
+        DailyApplicationRollup.objects.filter(day__gte=start, day__lte=through).values_list('day', flat=True)
+    )
+    missing = []
+    day = start
+    while day <= through:
+        if day not in rolled_up:
+            missing.append(day)
+        day += timedelta(days=1)
+
+    if missing:
+        counts = dict(
+            LoanApplication.objects.order_by().filter(
+                created_at__gte=_start_of_day(missing[0]),
+                created_at__lt=_start_of_day(missing[-1] + timedelta(days=1)),
+            ).annotate(day=TruncDate('created_at')).values('day').annotate(
+                count=Count('id')
+            ).values_list('day', 'count')
+        )
+        # Another worker may be rolling up the same days concurrently
+        DailyApplicationRollup.objects.bulk_create(
+            [DailyApplicationRollup(day=day, applications=counts.get(day, 0)) for day in missing],
+            ignore_conflicts=True,
+        )
+
+    cache.set(ROLLUP_THROUGH_CACHE_KEY, (start, through), 60 * 60 * 24)
+    return len(missing)
+
+
+def monthly_application_counts(months=TREND_MONTHS):
+    """Applications per calendar month, most recent month first"""
+    today = timezone.localdate()
+    window_start = _months_back(today, months - 1)
+    ensure_daily_rollups(earliest=window_start)
+
+    per_month = dict(
+        DailyApplicationRollup.objects.order_by().filter(day__gte=window_start).annotate(
+            month=TruncMonth('day')
+        ).values('month').annotate(total=Sum('applications')).values_list('month', 'total')
+    )
+    # Today is still open, so it is the only day counted live
+    todays_count = LoanApplication.objects.filter(created_at__gte=_start_of_day(today)).count()
+
+    monthly_data = {}
+    for i in range(months):
+        month = _months_back(today, i)
+        count = per_month.get(month, 0)
+        if i == 0:
+            count += todays_count
+        monthly_data[month.strftime('%B %Y')] = count
+    return monthly_data
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class DailyApplicationRollup(models.Model):
+    """Number of loan applications created on a single (closed) day"""
+    day = models.DateField(unique=True)
+    applications = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.day} - {self.applications} applications"
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = 'Daily Application Rollup'
+        verbose_name_plural = 'Daily Application Rollups'
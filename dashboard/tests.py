@@ -0,0 +1,93 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from loans.models import LoanApplication
+from loans.tests import create_loan_type
+
+from .aggregates import _months_back, _start_of_day, application_breakdown, ensure_daily_rollups, monthly_application_counts
+from .models import DailyApplicationRollup
+
+
+class AggregateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type('chap_chap')
+        cls.applicant = User.objects.create(username='applicant')
+        cls.today = timezone.localdate()
+
+    def setUp(self):
+        cache.clear()
+
+    def application(self, days_ago=0, **fields):
+        defaults = {
+            'purpose': 'business', 'amount': Decimal('100000'), 'period': 12, 'phone_number': '0700000000',
+            'department': 'Finance', 'bank_name': 'NMB', 'account_number': '0001',
+            'savings_value': Decimal('0'), 'shares_value': Decimal('0'),
+        }
+        defaults.update(fields)
+        loan = LoanApplication.objects.create(applicant=self.applicant, loan_type=self.loan_type, **defaults)
+        # created_at is set on insert, so older applications are moved back afterwards
+        created_at = _start_of_day(self.today - timedelta(days=days_ago)) + timedelta(hours=12)
+        LoanApplication.objects.filter(pk=loan.pk).update(created_at=created_at)
+        return loan
+
+    def rollups(self):
+        return dict(DailyApplicationRollup.objects.values_list('day', 'applications'))
+
+    def test_closed_days_are_rolled_up_with_their_totals(self):
+        self.application(days_ago=3)
+        self.application(days_ago=3)
+        self.application(days_ago=1)
+        self.application(days_ago=0)
+        earliest = self.today - timedelta(days=4)
+
+        self.assertEqual(ensure_daily_rollups(earliest=earliest), 4)
+        self.assertEqual(self.rollups(), {
+            earliest: 0,
+            self.today - timedelta(days=3): 2,
+            self.today - timedelta(days=2): 0,
+            self.today - timedelta(days=1): 1,
+        })
+        # Nothing left to do until another day closes
+        self.assertEqual(ensure_daily_rollups(earliest=earliest), 0)
+
+    def test_missing_days_before_existing_rollups_are_backfilled(self):
+        self.application(days_ago=5)
+        yesterday = self.today - timedelta(days=1)
+        DailyApplicationRollup.objects.create(day=yesterday, applications=7)
+
+        earliest = self.today - timedelta(days=6)
+        self.assertEqual(ensure_daily_rollups(earliest=earliest), 5)
+        rollups = self.rollups()
+        self.assertEqual(len(rollups), 6)
+        self.assertEqual(rollups[self.today - timedelta(days=5)], 1)
+        # Days already rolled up are never recomputed
+        self.assertEqual(rollups[yesterday], 7)
+
+        # A wider range is backfilled too, even on the same day
+        self.assertEqual(ensure_daily_rollups(earliest=earliest - timedelta(days=2)), 2)
+
+    def test_monthly_counts_add_todays_applications_live(self):
+        self.application(days_ago=0)
+        self.application(days_ago=0)
+        counts = monthly_application_counts()
+        self.assertEqual(len(counts), 6)
+        self.assertEqual(counts[self.today.strftime('%B %Y')], 2)
+        self.assertEqual(min(self.rollups()), _months_back(self.today, 5))
+
+    def test_application_breakdown(self):
+        self.application(status='committee_approved', final_approved_amount=Decimal('80000'))
+        self.application(status='committee_approved', purpose='education', final_approved_amount=Decimal('20000'))
+        self.application(status='rejected')
+        breakdown = application_breakdown()
+        self.assertEqual(breakdown['total_applications'], 3)
+        self.assertEqual(breakdown['status_data']['Committee_Approved'], 2)
+        self.assertEqual(breakdown['status_data']['Rejected'], 1)
+        self.assertEqual(breakdown['total_loan_amount'], Decimal('100000'))
+        self.assertEqual(sum(breakdown['purpose_data'].values()), 3)
@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     LoanType, LoanApplication, GuarantorApproval, 
     HRReview, LoanOfficerReview, CommitteeReview, 
-    RepaymentSchedule, LoanPayment, AccountantReview
+    RepaymentSchedule, LoanPayment, AccountantReview,
+    MemberFinancialSummary
 )
 
 @admin.register(LoanType)
@@ -171,7 +172,7 @@ class AccountantReviewAdmin(admin.ModelAdmin):
 class RepaymentScheduleAdmin(admin.ModelAdmin):
     list_display = [
         'loan_application', 'installment_number', 'due_date', 
-        'amount', 'is_paid', 'paid_at'
+        'amount', 'principal', 'interest', 'is_paid', 'paid_at'
     ]
     list_filter = ['is_paid', 'due_date', 'loan_application__status']
     search_fields = ['loan_application__applicant__username']
@@ -188,3 +189,16 @@ class LoanPaymentAdmin(admin.ModelAdmin):
     search_fields = ['loan_application__applicant__username', 'reference_number']
     readonly_fields = ['payment_date']
     ordering = ['-payment_date']
+
+@admin.register(MemberFinancialSummary)
+class MemberFinancialSummaryAdmin(admin.ModelAdmin):
+    list_display = [
+        'user', 'total_borrowed', 'total_paid', 'monthly_deduction',
+        'pending_guarantor_requests', 'updated_at'
+    ]
+    search_fields = ['user__username', 'user__first_name', 'user__last_name']
+    readonly_fields = [
+        'user', 'total_borrowed', 'total_paid', 'monthly_deduction',
+        'pending_guarantor_requests', 'updated_at'
+    ]
+    ordering = ['user__username']
@@ -0,0 +1,204 @@
+"""
+Amortization engine for loan repayment schedules.
+
+Schedules are computed column-wise (due dates, principal, interest and
+installment amounts as parallel lists) for either the flat method, where
+interest is charged on the original principal, or the reducing balance
+method, where each installment pays interest on the outstanding balance.
+Amounts are rounded to cents and the final installment absorbs any rounding
+difference, so a schedule always adds up exactly to principal + interest.
+"""
+
+import calendar
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from tblsaccos.database import immediate_atomic
+from .models import LoanApplication, RepaymentSchedule
+from .quotes import monthly_rate
+
+METHOD_FLAT = 'flat'
+METHOD_REDUCING_BALANCE = 'reducing_balance'
+METHODS = [METHOD_FLAT, METHOD_REDUCING_BALANCE]
+
+CENT = Decimal('0.01')
+
+
+def default_method():
+    return getattr(settings, 'LOAN_AMORTIZATION_METHOD', METHOD_FLAT)
+
+
+def _round(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def add_months(start, months):
+    """Same day `months` later, clamped to the end of shorter months"""
+    index = start.year * 12 + (start.month - 1) + months
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+class Schedule:
+    """A repayment schedule held as parallel columns"""
+
+    def __init__(self, due_dates, principal, interest):
+        self.due_dates = due_dates
+        self.principal = principal
+        self.interest = interest
+        self.amounts = [p + i for p, i in zip(principal, interest)]
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @property
+    def total_principal(self):
+        return sum(self.principal, Decimal('0'))
+
+    @property
+    def total_interest(self):
+        return sum(self.interest, Decimal('0'))
+
+    @property
+    def total_amount(self):
+        return sum(self.amounts, Decimal('0'))
+
+    def balances(self):
+        """Outstanding principal after each installment"""
+        remaining = self.total_principal
+        balances = []
+        for principal in self.principal:
+            remaining -= principal
+            balances.append(remaining)
+        return balances
+
+    def to_rows(self, loan):
+        return [
+            RepaymentSchedule(
+                loan_application=loan,
+                installment_number=number,
+                due_date=due_date,
+                amount=amount,
+                principal=principal,
+                interest=interest,
+            )
+            for number, (due_date, amount, principal, interest) in enumerate(
+                zip(self.due_dates, self.amounts, self.principal, self.interest), start=1
+            )
+        ]
+
+
+def _spread(total, period):
+    """Split `total` into `period` rounded parts, the last absorbing the remainder"""
+    part = _round(total / period)
+    return [part] * (period - 1) + [total - part * (period - 1)]
+
+
+def flat_schedule(principal, rate, period, start_date):
+    """Interest charged on the original principal for every month of the loan"""
+    principal = Decimal(principal)
+    total_interest = _round(principal * rate * period)
+    due_dates = [add_months(start_date, n) for n in range(1, period + 1)]
+    return Schedule(due_dates, _spread(principal, period), _spread(total_interest, period))
+
+
+def reducing_balance_schedule(principal, rate, period, start_date):
+    """Level installments, each paying interest on the outstanding balance"""
+    principal = Decimal(principal)
+    if rate:
+        payment = _round(principal * rate / (1 - (1 + rate) ** -period))
+    else:
+        payment = _round(principal / period)
+
+    principal_parts, interest_parts = [], []
+    balance = principal
+    for n in range(1, period + 1):
+        interest = _round(balance * rate)
+        # The final installment clears whatever principal is left
+        part = balance if n == period else min(payment - interest, balance)
+        principal_parts.append(part)
+        interest_parts.append(interest)
+        balance -= part
+
+    due_dates = [add_months(start_date, n) for n in range(1, period + 1)]
+    return Schedule(due_dates, principal_parts, interest_parts)
+
+
+def compute_schedule(loan, method=None, start_date=None):
+    """Compute the repayment schedule of a loan application"""
+    loan_type = loan.loan_type
+    method = method or default_method()
+    start_date = start_date or (
+        timezone.localdate(loan.disbursement_date) if loan.disbursement_date else timezone.localdate()
+    )
+    principal = loan.final_approved_amount or loan.amount
+    rate = monthly_rate(loan_type.name, loan_type.interest_rate)
+
+    if method == METHOD_REDUCING_BALANCE:
+        return reducing_balance_schedule(principal, rate, loan.period, start_date)
+    if method == METHOD_FLAT:
+        return flat_schedule(principal, rate, loan.period, start_date)
+    raise ValueError(f"Unknown amortization method: {method}")
+
+
+@immediate_atomic()
+def persist_schedule(loan, method=None, start_date=None):
+    """Replace a loan's repayment schedule with a freshly computed one"""
+    from .signals import touch_application
+
+    schedule = compute_schedule(loan, method=method, start_date=start_date)
+    loan.repayment_schedule.all().delete()
+    RepaymentSchedule.objects.bulk_create(schedule.to_rows(loan))
+    # bulk_create bypasses post_save, so bump the application version here
+    touch_application(loan.pk)
+    return schedule
+
+
+def regenerate_schedules(loans, method=None, batch_size=500):
+    """
+    Recompute and replace the schedules of many loans, e.g. after a rate
+    change. Works in batches: one delete and one bulk insert per batch.
+    Paid and partly paid installments are kept and only the rest is
+    regenerated from the original start date. Returns the number of loans processed.
+    """
+    processed = 0
+    batch = []
+
+    def flush():
+        ids = [loan.pk for loan in batch]
+        # Installments that have received any payment are kept as they are
+        started = Q(is_paid=True) | Q(amount_paid__gt=0)
+        paid = set(
+            RepaymentSchedule.objects.filter(started, loan_application_id__in=ids)
+            .values_list('loan_application_id', 'installment_number')
+        )
+        rows = []
+        for loan in batch:
+            schedule = compute_schedule(loan, method=method)
+            rows.extend(
+                row for row in schedule.to_rows(loan)
+                if (loan.pk, row.installment_number) not in paid
+            )
+        with immediate_atomic():
+            RepaymentSchedule.objects.filter(loan_application_id__in=ids).exclude(started).delete()
+            RepaymentSchedule.objects.bulk_create(rows, batch_size=batch_size)
+            # Bump the versions in one query; PDFs re-render on their next download
+            LoanApplication.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+        batch.clear()
+
+    queryset = loans.select_related('loan_type').only(
+        'id', 'amount', 'final_approved_amount', 'period', 'disbursement_date',
+        'loan_type__name', 'loan_type__interest_rate',
+    )
+    for loan in queryset.iterator(chunk_size=batch_size):
+        batch.append(loan)
+        processed += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return processed
@@ -0,0 +1,102 @@
+"""
+Portfolio-at-risk analytics over repayment schedules.
+
+Outstanding principal, arrears and the oldest missed due date of every
+disbursed loan come from a single grouped query over RepaymentSchedule. One
+pass over those per-loan rows then derives days past due and the PAR30/60/90
+buckets: the share of outstanding principal held by loans whose oldest unpaid
+installment is more than 30, 60 or 90 days overdue. The result is cached
+briefly since it backs a dashboard panel.
+"""
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Case, Count, DecimalField, F, Min, Q, Sum, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import RepaymentSchedule
+
+PAR_THRESHOLDS = [30, 60, 90]
+PORTFOLIO_RISK_TIMEOUT = 300
+
+# Statuses in which a loan has been paid out and is being repaid
+ACTIVE_LOAN_STATUSES = ['disbursed']
+
+ZERO = Decimal('0')
+
+
+def _installment_principal():
+    """Principal still owed on an installment; partial payments cover its interest first"""
+    remaining = F('amount') - F('amount_paid')
+    return Case(
+        # Schedules generated before the principal/interest split only carry an amount
+        When(principal=0, interest=0, then=remaining),
+        default=Least(F('principal'), remaining),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def loan_risk(today=None, **filters):
+    """Outstanding principal, arrears and days past due of every active loan"""
+    today = today or timezone.localdate()
+    unpaid = Q(is_paid=False)
+    overdue = Q(is_paid=False, due_date__lt=today)
+    rows = RepaymentSchedule.objects.filter(
+        loan_application__status__in=ACTIVE_LOAN_STATUSES, **filters
+    ).order_by().values('loan_application').annotate(
+        outstanding_principal=Sum(_installment_principal(), filter=unpaid),
+        arrears=Sum(F('amount') - F('amount_paid'), filter=overdue),
+        overdue_installments=Count('id', filter=overdue),
+        oldest_overdue=Min('due_date', filter=overdue),
+    )
+    return [
+        {
+            'loan_id': row['loan_application'],
+            'outstanding_principal': row['outstanding_principal'] or ZERO,
+            'arrears': row['arrears'] or ZERO,
+            'overdue_installments': row['overdue_installments'],
+            'days_past_due': (today - row['oldest_overdue']).days if row['oldest_overdue'] else 0,
+        }
+        for row in rows
+    ]
+
+
+def compute_portfolio_risk(today=None):
+    """Portfolio totals and PAR buckets over every active loan"""
+    loans = loan_risk(today)
+    outstanding = sum((loan['outstanding_principal'] for loan in loans), ZERO)
+    buckets = {threshold: {'loans': 0, 'amount': ZERO} for threshold in PAR_THRESHOLDS}
+    in_arrears = 0
+    arrears = ZERO
+
+    for loan in loans:
+        if loan['days_past_due']:
+            in_arrears += 1
+            arrears += loan['arrears']
+        for threshold in PAR_THRESHOLDS:
+            if loan['days_past_due'] > threshold:
+                buckets[threshold]['loans'] += 1
+                buckets[threshold]['amount'] += loan['outstanding_principal']
+
+    for bucket in buckets.values():
+        bucket['ratio'] = (bucket['amount'] / outstanding * 100).quantize(Decimal('0.01')) if outstanding else ZERO
+
+    return {
+        'active_loans': len(loans),
+        'outstanding_principal': outstanding,
+        'loans_in_arrears': in_arrears,
+        'arrears': arrears,
+        'par': [dict(buckets[threshold], days=threshold) for threshold in PAR_THRESHOLDS],
+    }
+
+
+def get_portfolio_risk():
+    """Cached portfolio-at-risk figures for the dashboard"""
+    key = f'portfolio_risk:{timezone.localdate().isoformat()}'
+    risk = cache.get(key)
+    if risk is None:
+        risk = compute_portfolio_risk()
+        cache.set(key, risk, PORTFOLIO_RISK_TIMEOUT)
+    return risk
@@ -5,3 +5,5 @@ class LoansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'loans'
 
+    def ready(self):
+        from . import signals  # noqa: F401
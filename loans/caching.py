@@ -0,0 +1,75 @@
+"""
+Versioned caching of dashboard sections, workspace lists and counts.
+
+Entries live in the shared cache configured in settings.CACHES (file-based by
+default, Redis when REDIS_URL is set), so every worker reads and invalidates
+the same copies. Each entry is keyed by the current versions of the scopes it
+was computed from:
+
+* ``loans``: every loan application (workspace queues, status counts),
+* ``user:<id>``: one member's own applications and guarantor requests.
+
+Changing a loan application or guarantor approval publishes new versions of
+the scopes it touches (see loans.signals; bulk writers call ``loans_changed``
+themselves), so outdated entries are never read again and simply expire.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+SECTION_TIMEOUT = 300
+
+LOANS = 'loans'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def _version_key(scope):
+    return f'cache_version:{scope}'
+
+
+def scope_versions(scopes):
+    """Current version of each scope, publishing a first version where there is none"""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, '') for key in keys]
+
+
+def cached(name, scopes, compute, timeout=SECTION_TIMEOUT):
+    """Return `name` as computed at the current versions of `scopes`, computing it on a miss"""
+    key = ':'.join(['section', name, *scope_versions(scopes)])
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def invalidate(*scopes):
+    """Publish new versions of `scopes`, orphaning every entry computed from them"""
+    cache.set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+
+
+def users_changed(user_ids):
+    """A member's own applications or guarantor requests changed"""
+    _invalidate_now_and_on_commit([user_scope(user_id) for user_id in set(user_ids)])
+
+
+def loans_changed(user_ids=()):
+    """Loan applications changed; `user_ids` are the members whose own lists they appear in"""
+    _invalidate_now_and_on_commit([LOANS, *(user_scope(user_id) for user_id in set(user_ids))])
+
+
+def _invalidate_now_and_on_commit(scopes):
+    invalidate(*scopes)
+    # Again once committed, for workers that cached the old rows in between
+    transaction.on_commit(lambda: invalidate(*scopes))
@@ -0,0 +1,135 @@
+"""
+Streaming CSV export of the loan portfolio.
+
+Each application is exported as one row that carries its applicant, loan type,
+payment totals and the outcome of every review stage. The per-application
+figures are correlated subqueries rather than joins, so a row never fans out
+into one line per payment or review. Rows are read with
+`.iterator(chunk_size=...)` and encoded one at a time, so memory stays flat
+and the first bytes go out before the query has finished.
+"""
+
+import csv
+
+from django.db.models import Count, DecimalField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    AccountantReview, CommitteeReview, HRReview, LoanApplication, LoanOfficerReview, LoanPayment,
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+PORTFOLIO_COLUMNS = [
+    ('id', 'Application ID'),
+    ('applicant__username', 'Username'),
+    ('applicant__first_name', 'First Name'),
+    ('applicant__last_name', 'Last Name'),
+    ('department', 'Department'),
+    ('loan_type__name', 'Loan Type'),
+    ('purpose', 'Purpose'),
+    ('status', 'Status'),
+    ('amount', 'Amount Requested'),
+    ('final_approved_amount', 'Amount Approved'),
+    ('period', 'Period (Months)'),
+    ('monthly_repayment', 'Monthly Repayment'),
+    ('total_amount', 'Total Repayable'),
+    ('created_at', 'Applied At'),
+    ('hr_reviewed_at', 'HR Reviewed At'),
+    ('loan_officer_decision', 'Loan Officer Decision'),
+    ('loan_officer_amount', 'Loan Officer Amount'),
+    ('committee_decision', 'Committee Decision'),
+    ('committee_amount', 'Committee Amount'),
+    ('payment_method', 'Payment Method'),
+    ('disbursement_date', 'Disbursed At'),
+    ('payments_count', 'Payments'),
+    ('total_paid', 'Total Paid'),
+    ('last_payment_at', 'Last Payment At'),
+]
+
+DECISION_LABELS = {True: 'Approved', False: 'Rejected', None: 'Pending'}
+
+# Spreadsheets evaluate a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+DECISION_COLUMNS = {'loan_officer_decision', 'committee_decision'}
+
+
+def _latest(model, field, order='-reviewed_at'):
+    """The `field` of an application's most recent `model` row"""
+    return Subquery(
+        model.objects.filter(loan_application=OuterRef('pk')).order_by(order, '-pk').values(field)[:1]
+    )
+
+
+def _payments(aggregate, output_field=None):
+    return Subquery(
+        LoanPayment.objects.filter(loan_application=OuterRef('pk')).order_by()
+        .values('loan_application').annotate(value=aggregate).values('value'),
+        output_field=output_field,
+    )
+
+
+def portfolio_queryset(**filters):
+    """One tuple per application, in PORTFOLIO_COLUMNS order"""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return LoanApplication.objects.filter(**filters).annotate(
+        hr_reviewed_at=_latest(HRReview, 'reviewed_at'),
+        loan_officer_decision=_latest(LoanOfficerReview, 'is_approved'),
+        loan_officer_amount=_latest(LoanOfficerReview, 'approved_amount'),
+        committee_decision=_latest(CommitteeReview, 'is_approved'),
+        committee_amount=_latest(CommitteeReview, 'final_amount'),
+        payment_method=_latest(AccountantReview, 'payment_method', order='-processed_at'),
+        payments_count=Coalesce(_payments(Count('pk')), Value(0)),
+        total_paid=Coalesce(_payments(Sum('amount'), output_field=money), Value(0), output_field=money),
+        last_payment_at=_payments(Max('payment_date')),
+    ).order_by('pk').values_list(*[column for column, _ in PORTFOLIO_COLUMNS])
+
+
+def escape_formula(value):
+    """Keep member-entered text such as names as text when the CSV is opened in Excel"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _format(column, value):
+    if column in DECISION_COLUMNS:
+        return DECISION_LABELS.get(value, value)
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return escape_formula(value)
+
+
+def portfolio_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Header followed by one formatted row per application, read in chunks"""
+    queryset = portfolio_queryset() if queryset is None else queryset
+    columns = [column for column, _ in PORTFOLIO_COLUMNS]
+    yield [label for _, label in PORTFOLIO_COLUMNS]
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield [_format(column, value) for column, value in zip(columns, row)]
+
+
+class Echo:
+    """File-like object whose write() hands back the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_portfolio_csv(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the portfolio export as CSV text, one line at a time"""
+    writer = csv.writer(Echo())
+    for row in portfolio_rows(queryset, chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def write_portfolio_csv(output, queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write the portfolio export to a text file; returns the number of applications"""
+    writer = csv.writer(output)
+    written = -1
+    for row in portfolio_rows(queryset, chunk_size=chunk_size):
+        writer.writerow(row)
+        written += 1
+    return written
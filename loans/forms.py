@@ -99,6 +99,26 @@ class CommitteeReviewForm(forms.ModelForm):
             'comments': forms.Textarea(attrs={'rows': 4, 'class': 'form-control'})
         }
 
+class CommitteeDecisionForm(forms.Form):
+    """One application's decision in a committee sitting; a blank decision leaves it pending"""
+    DECISIONS = [
+        ('', 'No decision'),
+        ('approve', 'Approve'),
+        ('reject', 'Reject'),
+    ]
+
+    application = forms.IntegerField(widget=forms.HiddenInput())
+    decision = forms.ChoiceField(
+        choices=DECISIONS, required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    final_amount = forms.DecimalField(
+        max_digits=12, decimal_places=2, min_value=0, required=False,
+        widget=forms.NumberInput(attrs={'step': '0.01', 'min': '0', 'class': 'form-control form-control-sm'})
+    )
+
+CommitteeDecisionFormSet = forms.formset_factory(CommitteeDecisionForm, extra=0)
+
 class AccountantReviewForm(forms.ModelForm):
     class Meta:
         model = AccountantReview
@@ -113,3 +133,18 @@ class AccountantReviewForm(forms.ModelForm):
             'bank_details': forms.Textarea(attrs={'rows': 3, 'class': 'form-control', 'placeholder': 'Bank transfer details and account information'}),
             'processing_notes': forms.Textarea(attrs={'rows': 4, 'class': 'form-control', 'placeholder': 'Processing notes and comments'})
         }
+
+class PayrollImportForm(forms.Form):
+    deductions_file = forms.FileField(
+        help_text='CSV with salary_number and amount columns',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
+    reference = forms.CharField(
+        max_length=100, required=False,
+        help_text='Reference recorded on every payment, e.g. PAYROLL-202406',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+    dry_run = forms.BooleanField(
+        required=False, help_text='Check the file without posting any payment',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
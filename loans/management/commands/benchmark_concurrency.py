@@ -0,0 +1,191 @@
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import suppress
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test.utils import override_settings
+
+from accounts.models import UserProfile
+from dashboard.views import get_member_loans
+from loans import workflow
+from loans.models import LoanApplication, LoanType
+from loans.summaries import get_member_summary
+from staff.views import workspace_totals
+
+# Connection setups compared: Django's stock SQLite backend with SQLite's
+# defaults and a connection per request, and the project's profile
+# (tblsaccos.database, SQLITE_PRAGMAS and persistent connections)
+PROFILES = [
+    ('default', 'django.db.backends.sqlite3', {}, 0),
+    (
+        'tuned', settings.DATABASES['default']['ENGINE'], settings.SQLITE_PRAGMAS,
+        settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+    ),
+]
+
+# Each write request moves a thread's current application one step along the workflow
+WRITE_STEPS = ['apply', 'committee', 'payment', 'disburse']
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the throughput of concurrent mixed read/write workflow traffic on a scratch SQLite '
+        'database, with SQLite defaults and with the tuned connection profile'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent workers (default: 8)')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per worker (default: 100)')
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Share of requests that run a workflow transition (default: 0.2)'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the request mix')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('The benchmark compares SQLite connection profiles.')
+        if options['threads'] < 1 or options['requests'] < 1 or not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--threads and --requests must be positive and --write-ratio within 0..1.')
+
+        database = connections.settings['default']
+        original = {field: database[field] for field in ('ENGINE', 'NAME', 'CONN_MAX_AGE')}
+        results = []
+        try:
+            for name, engine, pragmas, conn_max_age in PROFILES:
+                with tempfile.TemporaryDirectory() as directory:
+                    self._reset_connection()
+                    # Never touch the real database: every profile gets a fresh scratch file
+                    database.update(
+                        ENGINE=engine, NAME=str(Path(directory) / 'benchmark.sqlite3'), CONN_MAX_AGE=conn_max_age,
+                    )
+                    with override_settings(
+                        SQLITE_PRAGMAS=pragmas,
+                        LOAN_PDF_BACKGROUND_RENDERING=False,
+                        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                    ):
+                        call_command('migrate', verbosity=0)
+                        results.append((name, self._run(options)))
+                    self._reset_connection()
+        finally:
+            database.update(original)
+
+        self.stdout.write(
+            f'{"profile":<8} {"req/s":>8} {"reads":>6} {"writes":>6} {"errors":>6} '
+            f'{"read p50":>9} {"read p95":>9} {"write p50":>10} {"write p95":>10}'
+        )
+        for name, result in results:
+            self.stdout.write(
+                f'{name:<8} {result["throughput"]:8.1f} {len(result["read"]):6d} {len(result["write"]):6d} '
+                f'{result["errors"]:6d} {_percentile(result["read"], 50):7.1f}ms {_percentile(result["read"], 95):7.1f}ms '
+                f'{_percentile(result["write"], 50):8.1f}ms {_percentile(result["write"], 95):8.1f}ms'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully benchmarked {options["threads"]} workers x {options["requests"]} requests per profile.'
+        ))
+
+    def _reset_connection(self):
+        # Drop this thread's connection object too, so the next one is built with the new ENGINE
+        connections.close_all()
+        with suppress(AttributeError):
+            del connections['default']
+
+    def _seed(self, workers):
+        loan_type = LoanType.objects.filter(is_active=True).order_by('name').first()
+        committee = User.objects.create(username='benchmark_committee')
+        UserProfile.objects.create(user=committee, user_type='committee_member', employee_id='BENCH-C')
+        accountant = User.objects.create(username='benchmark_accountant')
+        UserProfile.objects.create(user=accountant, user_type='accountant', employee_id='BENCH-A')
+        members = []
+        for index in range(workers):
+            member = User.objects.create(username=f'benchmark_member_{index}')
+            UserProfile.objects.create(user=member, employee_id=f'BENCH-M{index}')
+            members.append(member)
+        return loan_type, committee, accountant, members
+
+    def _run(self, options):
+        loan_type, committee, accountant, members = self._seed(options['threads'])
+        connections.close_all()
+        result = {'read': [], 'write': [], 'errors': 0}
+        failures = []
+        lock = threading.Lock()
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            member = members[index]
+            loan, step = None, 0
+            latencies = {'read': [], 'write': []}
+            errors = 0
+            try:
+                for _ in range(options['requests']):
+                    # What Django does on request_started/request_finished
+                    close_old_connections()
+                    kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                    start = time.perf_counter()
+                    try:
+                        if kind == 'read':
+                            get_member_loans(member)
+                            get_member_summary(member)
+                            workspace_totals('amount', status='loan_officer_approved')
+                        else:
+                            loan = self._write(WRITE_STEPS[step], loan, member, loan_type, committee, accountant)
+                            step = (step + 1) % len(WRITE_STEPS)
+                    except OperationalError:
+                        # "database is locked": the request would have failed
+                        errors += 1
+                    else:
+                        latencies[kind].append((time.perf_counter() - start) * 1000)
+                    finally:
+                        close_old_connections()
+            except Exception as error:
+                failures.append(error)
+            finally:
+                connections.close_all()
+                with lock:
+                    result['read'] += latencies['read']
+                    result['write'] += latencies['write']
+                    result['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if failures:
+            raise CommandError(f'A benchmark worker failed: {failures[0]!r}')
+        result['throughput'] = (len(result['read']) + len(result['write'])) / elapsed
+        return result
+
+    def _write(self, step, loan, member, loan_type, committee, accountant):
+        if step == 'apply':
+            return LoanApplication.objects.create(
+                applicant=member, loan_type=loan_type, status='loan_officer_approved',
+                purpose='business', amount=Decimal('100000'), period=12, phone_number='0700000000',
+                department='Finance', bank_name='NMB', account_number='0001',
+                savings_value=Decimal('0'), shares_value=Decimal('0'),
+            )
+        if step == 'committee':
+            return workflow.review_as_committee(loan, committee, True).loan
+        if step == 'payment':
+            return workflow.process_payment(loan, accountant, 'Bank Transfer').loan
+        return workflow.disburse(loan).loan
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
@@ -0,0 +1,71 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Dependencies that are only needed on first use and must stay out of startup
+LAZY_MODULES = ['reportlab', 'dateutil']
+
+# Run in a fresh interpreter, so the timings are those of a cold worker boot
+STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+print(json.dumps({
+    'setup': setup_done - start,
+    'urls': urls_done - setup_done,
+    'lazy_loaded': [name for name in %r if name in sys.modules],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Time a cold django.setup() plus URLconf import (what every worker and management command pays)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters to time (default: 5)')
+        parser.add_argument(
+            '--max-ms', type=float, default=None,
+            help='Fail if the median total startup time exceeds this many milliseconds'
+        )
+
+    def _run_once(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'tblsaccos.settings'))
+        completed = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT % LAZY_MODULES],
+            capture_output=True, text=True, env=env,
+        )
+        if completed.returncode:
+            raise CommandError(f'Startup failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+        runs = [self._run_once() for _ in range(options['runs'])]
+
+        for phase, label in [('setup', 'django.setup()'), ('urls', 'URLconf import')]:
+            timings = [run[phase] * 1000 for run in runs]
+            self.stdout.write(
+                f'{label:<16} median {statistics.median(timings):7.1f} ms  '
+                f'min {min(timings):7.1f} ms  max {max(timings):7.1f} ms'
+            )
+        totals = [(run['setup'] + run['urls']) * 1000 for run in runs]
+        median_total = statistics.median(totals)
+        self.stdout.write(f'{"total":<16} median {median_total:7.1f} ms')
+
+        lazy_loaded = sorted({name for run in runs for name in run['lazy_loaded']})
+        if lazy_loaded:
+            self.stdout.write(self.style.WARNING(f'Imported at startup: {", ".join(lazy_loaded)}'))
+        if options['max_ms'] is not None and median_total > options['max_ms']:
+            raise CommandError(f'Median startup of {median_total:.1f} ms exceeds {options["max_ms"]:.1f} ms.')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully benchmarked startup over {len(runs)} runs.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from loans.payroll import parse_month, write_deductions_csv
+
+class Command(BaseCommand):
+    help = "Write the month's payroll deduction file (salary number, loans and amount due) as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', default=None, help='Deduction month as YYYY-MM (default: this month)')
+        parser.add_argument(
+            '--output', metavar='PATH', default=None,
+            help='File to write the CSV to (default: standard output)'
+        )
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = parse_month(options['month'])
+            except ValueError:
+                raise CommandError(f'Invalid month "{options["month"]}", expected YYYY-MM.')
+        else:
+            month = timezone.localdate().replace(day=1)
+
+        if options['output'] is None:
+            write_deductions_csv(self.stdout, month)
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            members = write_deductions_csv(output, month)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully wrote deductions for {members} members to {options["output"]}.')
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from loans.exports import EXPORT_CHUNK_SIZE, portfolio_queryset, write_portfolio_csv
+
+class Command(BaseCommand):
+    help = 'Export every loan application with its reviews and payments as CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', metavar='PATH', default=None,
+            help='File to write the CSV to (default: standard output)'
+        )
+        parser.add_argument('--status', default=None, help='Only export applications with this status')
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+            help='Number of rows fetched from the database at a time'
+        )
+
+    def handle(self, *args, **options):
+        filters = {'status': options['status']} if options['status'] else {}
+        queryset = portfolio_queryset(**filters)
+        if options['output'] is None:
+            write_portfolio_csv(self.stdout, queryset, chunk_size=options['chunk_size'])
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            exported = write_portfolio_csv(output, queryset, chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully exported {exported} loan applications to {options["output"]}.')
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.payroll import PayrollImportError, import_payroll_deductions
+
+class Command(BaseCommand):
+    help = 'Post a monthly payroll deduction CSV (salary_number, amount) as loan payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file of salary numbers and amounts')
+        parser.add_argument('--reference', default='', help='Reference recorded on every payment')
+        parser.add_argument('--dry-run', action='store_true', help='Check the file without posting anything')
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='', encoding='utf-8-sig') as deductions:
+            try:
+                result = import_payroll_deductions(
+                    deductions, reference=options['reference'], dry_run=options['dry_run']
+                )
+            except PayrollImportError as error:
+                raise CommandError(str(error))
+
+        for line_number, salary_number, reason in result.rejected:
+            self.stdout.write(self.style.WARNING(f'Line {line_number} ({salary_number}): {reason}'))
+        verb = 'Checked' if result.dry_run else 'Posted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {result.posted_lines} of {result.lines} lines as {result.payments} payments '
+                f'totalling TZS {result.total_posted:,.2f}.'
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from loans.summaries import rebuild_all_summaries
+
+class Command(BaseCommand):
+    help = 'Rebuild the member financial summary table from loan applications, payments and guarantor approvals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of summary rows inserted per query'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_all_summaries(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {rebuilt} member financial summaries.')
+        )
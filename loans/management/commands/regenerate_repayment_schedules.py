@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.amortization import METHODS, default_method, regenerate_schedules
+from loans.models import LoanApplication, LoanType
+
+class Command(BaseCommand):
+    help = 'Recompute the repayment schedules of disbursed loans, e.g. after a loan type rate change'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loan-type', choices=[name for name, label in LoanType.LOAN_TYPES],
+            help='Only regenerate loans of this loan type'
+        )
+        parser.add_argument(
+            '--method', choices=METHODS, default=None,
+            help='Amortization method (defaults to the LOAN_AMORTIZATION_METHOD setting)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of loans processed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        loans = LoanApplication.objects.filter(status='disbursed')
+        if options['loan_type']:
+            loans = loans.filter(loan_type__name=options['loan_type'])
+
+        method = options['method'] or default_method()
+        processed = regenerate_schedules(loans, method=method, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully regenerated {processed} repayment schedules ({method}).')
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('loans', '0004_alter_accountantreview_accountant_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberFinancialSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_borrowed', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monthly_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending_guarantor_requests', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='financial_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Member Financial Summary',
+                'verbose_name_plural': 'Member Financial Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_memberfinancialsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repaymentschedule',
+            name='interest',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Interest part of the installment', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='repaymentschedule',
+            name='principal',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Principal part of the installment', max_digits=12),
+        ),
+    ]
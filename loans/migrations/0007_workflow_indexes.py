@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_repaymentschedule_principal_interest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guarantorapproval',
+            index=models.Index(condition=models.Q(('approved_at__isnull', True)), fields=['guarantor'], name='guarantor_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='loanapp_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['applicant', 'status', 'created_at'], name='loanapp_applicant_status_idx'),
+        ),
+    ]
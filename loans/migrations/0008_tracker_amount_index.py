@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0007_workflow_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['amount', 'id'], name='loanapp_amount_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:52
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_paid_installments(apps, schema_editor):
+    RepaymentSchedule = apps.get_model('loans', 'RepaymentSchedule')
+    RepaymentSchedule.objects.filter(is_paid=True).update(amount_paid=F('amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0008_tracker_amount_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repaymentschedule',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Amount paid towards the installment so far', max_digits=12),
+        ),
+        migrations.RunPython(mark_paid_installments, migrations.RunPython.noop),
+    ]
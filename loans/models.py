@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from decimal import Decimal
+from .quotes import compute_quote
+from .registry import get_loan_type
 
 class LoanType(models.Model):
     LOAN_TYPES = [
@@ -97,25 +99,43 @@ class LoanApplication(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Fields the member's financial summary is computed from (see loans.signals)
+    SUMMARY_FIELDS = ('status', 'final_approved_amount', 'monthly_repayment')
+
     def __str__(self):
-        return f"{self.applicant.get_full_name()} - {self.loan_type.get_name_display()} - {self.amount}"
+        return f"{self.applicant.get_full_name()} - {self.registered_loan_type().get_name_display()} - {self.amount}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded summary fields so a save can tell whether they changed
+        instance._summary_state = instance.summary_state()
+        return instance
+
+    def summary_state(self):
+        """The summary fields' values, or None when one of them was deferred"""
+        # Read from __dict__ so deferred fields are never loaded from the database
+        loaded = self.__dict__
+        if any(field not in loaded for field in self.SUMMARY_FIELDS):
+            return None
+        return tuple(loaded[field] for field in self.SUMMARY_FIELDS)
+    
+    def registered_loan_type(self):
+        """The loan type, taken from the in-process registry instead of a query when not already loaded"""
+        if not LoanApplication.loan_type.is_cached(self):
+            loan_type = get_loan_type(self.loan_type_id)
+            if loan_type is not None:
+                LoanApplication.loan_type.field.set_cached_value(self, loan_type)
+        return self.loan_type
     
     def save(self, *args, **kwargs):
-        if self.amount and self.period and self.loan_type:
+        if self.amount and self.period and self.registered_loan_type():
             # Calculate based on loan type interest rate
-            interest_rate = self.loan_type.interest_rate / Decimal('100')
-            period_decimal = Decimal(str(self.period))
-            
-            if self.loan_type.name == 'wanawake':
-                # 1% per month for Wanawake loan
-                total_interest = self.amount * Decimal('0.01') * period_decimal
-            else:
-                # Annual interest rate
-                total_interest = self.amount * interest_rate * (period_decimal / Decimal('12'))
-            
-            self.total_interest = total_interest
-            self.total_amount = self.amount + total_interest
-            self.monthly_repayment = self.total_amount / period_decimal
+            loan_type = self.loan_type
+            quote = compute_quote(loan_type.name, loan_type.interest_rate, self.amount, self.period)
+            self.total_interest = quote.total_interest
+            self.total_amount = quote.total_amount
+            self.monthly_repayment = quote.monthly_repayment
             
             # Set final approved amount if not set
             if not self.final_approved_amount:
@@ -153,6 +173,14 @@ class LoanApplication(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Workspace queues: filter by status, newest first
+            models.Index(fields=['status', 'created_at', 'id'], name='loanapp_status_created_idx'),
+            # Member dashboard: an applicant's applications by status
+            models.Index(fields=['applicant', 'status', 'created_at'], name='loanapp_applicant_status_idx'),
+            # Application tracker sorted by amount
+            models.Index(fields=['amount', 'id'], name='loanapp_amount_idx'),
+        ]
 
 class GuarantorApproval(models.Model):
     loan_application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='guarantor_approvals')
@@ -168,6 +196,14 @@ class GuarantorApproval(models.Model):
     
     class Meta:
         unique_together = ['loan_application', 'guarantor']
+        indexes = [
+            # Guarantor badge and inbox: requests still awaiting a response
+            models.Index(
+                fields=['guarantor'],
+                condition=models.Q(approved_at__isnull=True),
+                name='guarantor_pending_idx',
+            ),
+        ]
 
 class HRReview(models.Model):
     loan_application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='hr_reviews')
@@ -220,6 +256,9 @@ class RepaymentSchedule(models.Model):
     installment_number = models.PositiveIntegerField()
     due_date = models.DateField()
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    principal = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='Principal part of the installment')
+    interest = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='Interest part of the installment')
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='Amount paid towards the installment so far')
     is_paid = models.BooleanField(default=False)
     paid_at = models.DateTimeField(null=True, blank=True)
     
@@ -238,3 +277,23 @@ class LoanPayment(models.Model):
     
     def __str__(self):
         return f"{self.loan_application} - {self.amount} - {self.payment_date}"
+
+class MemberFinancialSummary(models.Model):
+    """Per-member loan totals, kept up to date by loans.summaries"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='financial_summary')
+    total_borrowed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monthly_deduction = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_guarantor_requests = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.get_full_name()} - Financial Summary"
+    
+    @property
+    def outstanding_amount(self):
+        return self.total_borrowed - self.total_paid
+    
+    class Meta:
+        verbose_name = 'Member Financial Summary'
+        verbose_name_plural = 'Member Financial Summaries'
@@ -0,0 +1,290 @@
+"""
+Payroll deductions, in both directions.
+
+Every month HR sends the employer a deduction file: one line per member with
+their salary number, the loans being repaid and the amount to deduct, which is
+whatever is unpaid on installments due up to the end of that month (the
+month's installments plus any arrears). The file comes from one grouped query
+over RepaymentSchedule, ordered by member and streamed to CSV.
+
+The employer's confirmation comes back as a CSV of salary numbers and amounts.
+Lines are matched to members through an in-memory index of
+MemberProfile.salary_number, and only the unpaid installments of the members
+named in the file are loaded. Each amount is allocated against the member's
+oldest unpaid installments across their active loans. Every
+LoanPayment and installment change is written with bulk_create/bulk_update
+in a single transaction, so a file either posts completely or not at all.
+"""
+
+import csv
+from collections import defaultdict, deque
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from accounts.models import MemberProfile
+from tblsaccos.database import immediate_atomic
+from . import summaries
+from .amortization import add_months
+from .analytics import ACTIVE_LOAN_STATUSES
+from .exports import EXPORT_CHUNK_SIZE, Echo, escape_formula
+from .models import LoanApplication, LoanPayment, RepaymentSchedule
+
+PAYROLL_PAYMENT_METHOD = 'Payroll Deduction'
+PAYROLL_BATCH_SIZE = 1000
+
+ZERO = Decimal('0')
+
+
+class PayrollImportError(Exception):
+    """The whole deduction file was refused; nothing was posted"""
+
+
+class PayrollImportResult:
+    """Outcome of posting a payroll deduction file"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.lines = 0
+        self.posted_lines = 0
+        self.payments = 0
+        self.total_posted = ZERO
+        self.unallocated = ZERO
+        # (line number, salary number, reason) of every line not fully posted
+        self.rejected = []
+
+    def reject(self, line_number, salary_number, reason):
+        self.rejected.append((line_number, salary_number, reason))
+
+
+def normalize_salary_number(value):
+    return value.strip().upper()
+
+
+def parse_deductions(lines, result):
+    """Yield (line number, salary number, amount) for each well-formed line of the file"""
+    reader = csv.reader(lines)
+    salary_column, amount_column = 0, 1
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        line_number = reader.line_num
+        if line_number == 1:
+            header = [cell.strip().lower() for cell in row]
+            if 'salary_number' in header and 'amount' in header:
+                salary_column, amount_column = header.index('salary_number'), header.index('amount')
+                continue
+
+        result.lines += 1
+        try:
+            salary_number = normalize_salary_number(row[salary_column])
+            amount = Decimal(row[amount_column].strip().replace(',', ''))
+        except (IndexError, InvalidOperation):
+            result.reject(line_number, ','.join(row), 'Malformed line')
+            continue
+        if not salary_number or amount <= 0:
+            result.reject(line_number, salary_number, 'Missing salary number or amount')
+            continue
+        yield line_number, salary_number, amount
+
+
+def member_index():
+    """Salary number -> user id; numbers shared by several members map to None"""
+    index = {}
+    for salary_number, user_id in MemberProfile.objects.values_list('salary_number', 'user_id').iterator():
+        key = normalize_salary_number(salary_number)
+        index[key] = None if key in index and index[key] != user_id else user_id
+    return index
+
+
+def unpaid_installments(user_ids):
+    """User id -> queue of that member's unpaid installments, oldest due first, for `user_ids` only"""
+    queues = defaultdict(deque)
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), PAYROLL_BATCH_SIZE):
+        installments = RepaymentSchedule.objects.filter(
+            loan_application__status__in=ACTIVE_LOAN_STATUSES, is_paid=False,
+            loan_application__applicant_id__in=user_ids[start:start + PAYROLL_BATCH_SIZE],
+        ).annotate(
+            applicant_id=F('loan_application__applicant_id')
+        ).only(
+            'id', 'loan_application_id', 'installment_number', 'due_date', 'amount', 'amount_paid', 'is_paid', 'paid_at'
+        ).order_by('due_date', 'loan_application_id', 'installment_number')
+        for installment in installments.iterator(chunk_size=PAYROLL_BATCH_SIZE):
+            queues[installment.applicant_id].append(installment)
+    return queues
+
+
+def _allocate(queue, amount, now, changed):
+    """Pay `amount` into the oldest installments of `queue`; returns {loan id: amount} and the rest"""
+    allocated = defaultdict(Decimal)
+    while amount and queue:
+        installment = queue[0]
+        part = min(installment.amount - installment.amount_paid, amount)
+        installment.amount_paid += part
+        amount -= part
+        allocated[installment.loan_application_id] += part
+        changed[installment.pk] = installment
+        if installment.amount_paid >= installment.amount:
+            installment.is_paid = True
+            installment.paid_at = now
+            queue.popleft()
+    return allocated, amount
+
+
+def import_payroll_deductions(lines, reference='', dry_run=False):
+    """
+    Post a payroll deduction file given as an iterable of text lines.
+    With `dry_run` every change is rolled back and only the result is kept.
+    Raises PayrollImportError if payroll payments were already posted under
+    `reference`, so the same file cannot be posted twice.
+    """
+    result = PayrollImportResult(dry_run=dry_run)
+    now = timezone.now()
+    reference = reference or f"PAYROLL-{timezone.localdate():%Y%m}"
+
+    with immediate_atomic():
+        if LoanPayment.objects.filter(payment_method=PAYROLL_PAYMENT_METHOD, reference_number=reference).exists():
+            raise PayrollImportError(f'Payroll deductions were already posted under reference {reference}.')
+        index = member_index()
+        # The file is read once up front so only its members' installments are loaded
+        deductions = list(parse_deductions(lines, result))
+        queues = unpaid_installments({index[salary_number] for _, salary_number, _ in deductions if index.get(salary_number)})
+        payments = []
+        changed = {}
+        paid_by_user = defaultdict(Decimal)
+
+        for line_number, salary_number, amount in deductions:
+            user_id = index.get(salary_number)
+            if user_id is None:
+                reason = 'Salary number shared by several members' if salary_number in index else 'Unknown salary number'
+                result.reject(line_number, salary_number, reason)
+                continue
+            if not queues[user_id]:
+                result.reject(line_number, salary_number, 'No unpaid installments on an active loan')
+                continue
+
+            allocated, remainder = _allocate(queues[user_id], amount, now, changed)
+            for loan_id, loan_amount in allocated.items():
+                payments.append(LoanPayment(
+                    loan_application_id=loan_id,
+                    amount=loan_amount,
+                    payment_method=PAYROLL_PAYMENT_METHOD,
+                    reference_number=reference,
+                ))
+            posted = amount - remainder
+            paid_by_user[user_id] += posted
+            result.total_posted += posted
+            result.posted_lines += 1
+            if remainder:
+                result.unallocated += remainder
+                result.reject(line_number, salary_number, f'TZS {remainder:,.2f} exceeds the unpaid installments')
+
+        # Bulk writes bypass the payment and schedule signals, so the member
+        # summaries and the application versions are updated here
+        LoanPayment.objects.bulk_create(payments, batch_size=PAYROLL_BATCH_SIZE)
+        RepaymentSchedule.objects.bulk_update(
+            changed.values(), ['amount_paid', 'is_paid', 'paid_at'], batch_size=PAYROLL_BATCH_SIZE
+        )
+        summaries.apply_payments(paid_by_user, batch_size=PAYROLL_BATCH_SIZE)
+        loan_ids = list({payment.loan_application_id for payment in payments})
+        for start in range(0, len(loan_ids), PAYROLL_BATCH_SIZE):
+            LoanApplication.objects.filter(pk__in=loan_ids[start:start + PAYROLL_BATCH_SIZE]).update(updated_at=now)
+        result.payments = len(payments)
+        # Parse errors were recorded while reading the file, before the allocation rejections
+        result.rejected.sort(key=lambda rejection: rejection[0])
+
+        if dry_run:
+            transaction.set_rollback(True)
+    return result
+
+
+# Column -> header of the deduction file; salary_number and amount match the
+# import above, so the employer's confirmation can be posted back unchanged
+DEDUCTION_COLUMNS = [
+    ('salary_number', 'salary_number'),
+    ('member', 'member'),
+    ('department', 'department'),
+    ('loans', 'loan_references'),
+    ('current_due', 'current_due'),
+    ('arrears', 'arrears'),
+    ('amount', 'amount'),
+]
+
+
+def parse_month(value):
+    """First day of the month given as YYYY-MM"""
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
+
+
+def deduction_queryset(month):
+    """Unpaid amounts due by the end of `month`, one row per loan, grouped by member"""
+    month_start = month.replace(day=1)
+    month_end = add_months(month_start, 1)
+    outstanding = F('amount') - F('amount_paid')
+    return RepaymentSchedule.objects.filter(
+        loan_application__status__in=ACTIVE_LOAN_STATUSES, is_paid=False, due_date__lt=month_end,
+    ).values(
+        'loan_application__applicant_id',
+        'loan_application_id',
+        'loan_application__applicant__member_profile__salary_number',
+        'loan_application__applicant__first_name',
+        'loan_application__applicant__last_name',
+        'loan_application__department',
+    ).annotate(
+        current_due=Sum(outstanding, filter=Q(due_date__gte=month_start)),
+        arrears=Sum(outstanding, filter=Q(due_date__lt=month_start)),
+    ).order_by('loan_application__applicant_id', 'loan_application_id')
+
+
+def deduction_rows(month, chunk_size=EXPORT_CHUNK_SIZE):
+    """Header followed by one row per member, folding their loans together as the rows stream past"""
+    yield [header for _, header in DEDUCTION_COLUMNS]
+    member = None
+    for row in deduction_queryset(month).iterator(chunk_size=chunk_size):
+        if member is None or member['applicant_id'] != row['loan_application__applicant_id']:
+            if member is not None:
+                yield _deduction_row(member)
+            member = {
+                'applicant_id': row['loan_application__applicant_id'],
+                'salary_number': row['loan_application__applicant__member_profile__salary_number'] or '',
+                'member': f"{row['loan_application__applicant__first_name']} {row['loan_application__applicant__last_name']}".strip(),
+                'department': row['loan_application__department'],
+                'loans': [],
+                'current_due': ZERO,
+                'arrears': ZERO,
+            }
+        member['loans'].append(f"#{row['loan_application_id']}")
+        member['current_due'] += row['current_due'] or ZERO
+        member['arrears'] += row['arrears'] or ZERO
+    if member is not None:
+        yield _deduction_row(member)
+
+
+def _deduction_row(member):
+    member['loans'] = ' '.join(member['loans'])
+    member['amount'] = member['current_due'] + member['arrears']
+    member['member'] = escape_formula(member['member'])
+    member['department'] = escape_formula(member['department'])
+    return [member[column] for column, _ in DEDUCTION_COLUMNS]
+
+
+def stream_deductions_csv(month, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the month's deduction file as CSV text, one line at a time"""
+    writer = csv.writer(Echo())
+    for row in deduction_rows(month, chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def write_deductions_csv(output, month, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write the month's deduction file to a text file; returns the number of members"""
+    writer = csv.writer(output)
+    written = -1
+    for row in deduction_rows(month, chunk_size=chunk_size):
+        writer.writerow(row)
+        written += 1
+    return written
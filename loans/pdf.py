@@ -0,0 +1,121 @@
+"""
+Loan application PDF rendering and on-disk cache.
+
+Rendered PDFs are stored under LOAN_PDF_CACHE_DIR, one file per application
+version (id + updated_at). Downloads stream the cached file; saving an
+application (or a record printed on it) bumps its version and queues the
+new PDF to be rendered in a background thread. The ReportLab layout lives in
+loans.rendering, which is imported on the first render.
+"""
+
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# A single worker keeps rendering off the request threads without letting a
+# burst of approvals compete with them for CPU
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='loan-pdf')
+
+
+def pdf_cache_dir():
+    return Path(getattr(settings, 'LOAN_PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'private' / 'loan_pdfs'))
+
+
+def render_application_pdf(loan, output):
+    """Write the PDF for a loan application to a file-like object"""
+    # ReportLab is loaded on the first render rather than at startup
+    from .rendering import render_application_pdf
+
+    render_application_pdf(loan, output)
+
+
+def _version(loan):
+    return int(loan.updated_at.timestamp() * 1000000)
+
+
+def _path_version(path):
+    """Version suffix of a cached PDF's file name, or None if it has none"""
+    try:
+        return int(path.stem.rsplit('_', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def cached_pdf_path(loan):
+    """Path of the cached PDF for the current version of a loan application"""
+    return pdf_cache_dir() / f"loan_application_{loan.pk}_{_version(loan)}.pdf"
+
+
+def discard_application_pdfs(loan_id, keep=None):
+    """
+    Delete cached PDFs of a loan application: every version, or with `keep`
+    only the versions older than it. A render of an outdated version that
+    finishes late therefore never deletes a newer PDF.
+    """
+    newest = _path_version(keep) if keep is not None else None
+    for path in pdf_cache_dir().glob(f"loan_application_{loan_id}_*.pdf"):
+        version = _path_version(path)
+        if keep is not None and (version is None or version >= newest):
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def get_application_pdf(loan):
+    """
+    Return an open binary file with an up to date PDF for `loan`, rendering
+    it if needed. The caller closes it. Returning the handle rather than a
+    path means the PDF can still be read if its file is discarded meanwhile.
+    """
+    path = cached_pdf_path(loan)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Render to a temporary file and rename, so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    output = os.fdopen(fd, 'w+b')
+    try:
+        render_application_pdf(loan, output)
+        output.flush()
+        os.replace(tmp_path, path)
+    except Exception:
+        output.close()
+        os.unlink(tmp_path)
+        raise
+
+    discard_application_pdfs(loan.pk, keep=path)
+    output.seek(0)
+    return output
+
+
+def _render_in_background(loan_id):
+    from .models import LoanApplication
+
+    close_old_connections()
+    try:
+        loan = LoanApplication.objects.select_related('applicant', 'loan_type').get(pk=loan_id)
+        get_application_pdf(loan).close()
+    except LoanApplication.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception("Failed to render PDF for loan application %s", loan_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_pdf_render(loan_id):
+    """Queue the PDF of a loan application to be (re)rendered in the background"""
+    if getattr(settings, 'LOAN_PDF_BACKGROUND_RENDERING', True):
+        _executor.submit(_render_in_background, loan_id)
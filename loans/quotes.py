@@ -0,0 +1,66 @@
+"""
+Loan quotation engine.
+
+A quote depends only on the loan type's name and interest rate, the amount
+and the period, so it is computed by a pure function of those values and
+memoized with an LRU cache. LoanApplication.save() prices applications with
+the same function, which lets the apply form preview repayments through the
+quote endpoint without writing anything. The endpoint reads rates and limits
+from the in-process loan type registry, so quoting never queries LoanType.
+Rates are read through monthly_rate(), exactly as the amortization engine
+reads them for repayment schedules.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+QUOTE_CACHE_SIZE = 4096
+MAX_QUOTE_SCENARIOS = 60
+# Largest amount an application can hold (LoanApplication.amount is 12 digits, 2 decimals)
+MAX_QUOTE_AMOUNT = Decimal('9999999999.99')
+
+CENT = Decimal('0.01')
+
+# Loan types whose interest rate is quoted per month rather than per year
+MONTHLY_RATE_LOAN_TYPES = ['wanawake']
+
+Quote = namedtuple('Quote', ['total_interest', 'total_amount', 'monthly_repayment'])
+
+
+def monthly_rate(loan_type_name, interest_rate):
+    """Monthly interest rate as a fraction, from a loan type's quoted rate"""
+    rate = Decimal(str(interest_rate)) / Decimal('100')
+    if loan_type_name in MONTHLY_RATE_LOAN_TYPES:
+        return rate
+    return rate / Decimal('12')
+
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def compute_quote(loan_type_name, interest_rate, amount, period):
+    """Total interest, total repayable and monthly repayment of a loan"""
+    period = Decimal(period)
+    total_interest = amount * monthly_rate(loan_type_name, interest_rate) * period
+    total_amount = amount + total_interest
+    return Quote(total_interest, total_amount, total_amount / period)
+
+
+def quote_scenario(loan_type_name, amount, period):
+    """JSON-ready quote of one scenario, or None for an unknown loan type"""
+    from .registry import get_loan_type_by_name
+
+    loan_type = get_loan_type_by_name(loan_type_name)
+    if loan_type is None or not loan_type.is_active:
+        return None
+    quote = compute_quote(loan_type.name, loan_type.interest_rate, amount, period)
+    return {
+        'loan_type': loan_type.name,
+        'loan_type_display': loan_type.get_name_display(),
+        'amount': str(amount.quantize(CENT)),
+        'period': period,
+        'interest_rate': str(loan_type.interest_rate),
+        'total_interest': str(quote.total_interest.quantize(CENT)),
+        'total_amount': str(quote.total_amount.quantize(CENT)),
+        'monthly_repayment': str(quote.monthly_repayment.quantize(CENT)),
+        'within_limits': amount <= loan_type.max_amount and period <= loan_type.max_period,
+    }
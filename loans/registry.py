@@ -0,0 +1,103 @@
+"""
+Process-wide registry of loan types.
+
+LoanType is a handful of rows that almost never change, so every worker keeps
+all of them in memory and lookups of rates and limits are dictionary reads.
+A version stamp in the shared cache says which copy is current: saving or
+deleting a loan type (e.g. in the admin) writes a new stamp, and each worker
+compares its own stamp with the shared one at most every
+LOAN_TYPE_REGISTRY_CHECK_INTERVAL seconds, reloading the table on mismatch.
+The registry's instances are shared between requests and must not be modified.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'loan_types:version'
+
+
+class LoanTypeRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0
+        self.by_pk = {}
+        self.by_name = {}
+
+    def _shared_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Nothing published yet (or evicted): publish a stamp every worker can agree on
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _load(self, version):
+        from .models import LoanType
+
+        loan_types = list(LoanType.objects.order_by('name'))
+        self.by_pk = {loan_type.pk: loan_type for loan_type in loan_types}
+        self.by_name = {loan_type.name: loan_type for loan_type in loan_types}
+        self.version = version
+
+    def refresh(self, force=False):
+        """Reload the loan types if another worker (or this one) changed them"""
+        interval = getattr(settings, 'LOAN_TYPE_REGISTRY_CHECK_INTERVAL', 1)
+        now = time.monotonic()
+        if not force and self.version is not None and now - self.checked_at < interval:
+            return
+        with self._lock:
+            version = self._shared_version()
+            if force or version != self.version:
+                self._load(version)
+            self.checked_at = now
+
+    def invalidate(self):
+        """Publish a new version so every worker reloads, this one immediately"""
+        with self._lock:
+            cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+            self.version = None
+
+    def get(self, pk):
+        if pk is None:
+            return None
+        self.refresh()
+        if pk not in self.by_pk:
+            # Created moments ago by another worker
+            self.refresh(force=True)
+        return self.by_pk.get(pk)
+
+    def get_by_name(self, name):
+        self.refresh()
+        return self.by_name.get(name)
+
+    def active(self):
+        self.refresh()
+        return [loan_type for loan_type in self.by_name.values() if loan_type.is_active]
+
+
+loan_types = LoanTypeRegistry()
+
+
+def get_loan_type(pk):
+    return loan_types.get(pk)
+
+
+def get_loan_type_by_name(name):
+    return loan_types.get_by_name(name)
+
+
+def active_loan_types():
+    """Active loan types ordered by name"""
+    return loan_types.active()
+
+
+def default_loan_type():
+    """The loan type new applications are filed under: the first active one by name"""
+    active = loan_types.active()
+    return active[0] if active else None
@@ -0,0 +1,200 @@
+"""
+ReportLab layout of the loan application PDF.
+
+ReportLab takes about a tenth of a second to import, so this module is only
+imported by loans.pdf when the first PDF is rendered, not by every worker and
+management command at startup.
+"""
+
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+TBL_MAROON = colors.HexColor('#8B0000')
+
+
+@lru_cache(maxsize=None)
+def _styles():
+    """Build the stylesheet once per process instead of on every render"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1,  # Center alignment
+            textColor=TBL_MAROON
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            alignment=1,  # Center alignment
+            textColor=colors.grey
+        ),
+        'heading': styles['Heading2'],
+        'normal': styles['Normal'],
+    }
+
+
+def _table_style(align='CENTER', font_size=10, padding=12, header_row=True):
+    commands = [
+        ('ALIGN', (0, 0), (-1, -1), align),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]
+    if header_row:
+        commands += [
+            ('BACKGROUND', (0, 0), (-1, 0), TBL_MAROON),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ]
+    else:
+        commands += [
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F5F5F5')),
+            ('TEXTCOLOR', (0, 0), (0, -1), TBL_MAROON),
+        ]
+    return TableStyle(commands)
+
+
+def _full_name(user):
+    return user.get_full_name() if user else 'Pending'
+
+
+def render_application_pdf(loan, output):
+    """Write the PDF for a loan application to a file-like object"""
+    styles = _styles()
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    story = []
+
+    # Title
+    story.append(Paragraph("TBL SACCOS Loan Application", styles['title']))
+    story.append(Spacer(1, 20))
+
+    # Application Details
+    story.append(Paragraph("Application Details", styles['heading']))
+    story.append(Spacer(1, 12))
+
+    details_data = [
+        ['Applicant Name:', loan.applicant.get_full_name()],
+        ['Loan Type:', loan.loan_type.get_name_display()],
+        ['Purpose:', loan.get_purpose_display()],
+        ['Amount:', f"TZS {loan.amount:,.2f}"],
+        ['Period:', f"{loan.period} months"],
+        ['Monthly Repayment:', f"TZS {loan.monthly_repayment:,.2f}"],
+        ['Total Interest:', f"TZS {loan.total_interest:,.2f}"],
+        ['Total Amount:', f"TZS {loan.total_amount:,.2f}"],
+        ['Status:', loan.get_status_display()],
+        ['Application Date:', loan.created_at.strftime('%B %d, %Y')],
+    ]
+    details_table = Table(details_data, colWidths=[2*inch, 4*inch])
+    details_table.setStyle(_table_style(align='LEFT', header_row=False))
+    story.append(details_table)
+    story.append(Spacer(1, 20))
+
+    # Guarantor Information
+    story.append(Paragraph("Guarantor Information", styles['heading']))
+    story.append(Spacer(1, 12))
+
+    guarantors = loan.guarantor_approvals.select_related('guarantor')
+    if guarantors:
+        guarantor_data = [['Guarantor Name', 'Status', 'Declaration']]
+        for guarantor in guarantors:
+            status = "Approved" if guarantor.is_approved else "Pending"
+            declaration = "Yes" if guarantor.guarantor_declaration else "No"
+            guarantor_data.append([guarantor.guarantor.get_full_name(), status, declaration])
+
+        guarantor_table = Table(guarantor_data, colWidths=[2.5*inch, 1.5*inch, 2*inch])
+        guarantor_table.setStyle(_table_style())
+        story.append(guarantor_table)
+    else:
+        story.append(Paragraph("No guarantors assigned", styles['normal']))
+
+    story.append(Spacer(1, 20))
+
+    # HR Review Information
+    hr_reviews = loan.hr_reviews.select_related('reviewer')
+    if hr_reviews:
+        story.append(Paragraph("HR Review Information", styles['heading']))
+        story.append(Spacer(1, 12))
+
+        hr_data = [['Reviewer', 'Decision', 'Monthly Salary', 'Employer Debts', 'Financial Debts', 'Date']]
+        for review in hr_reviews:
+            hr_data.append([
+                _full_name(review.reviewer),
+                "Reviewed" if review.reviewer else "Pending",
+                f"TZS {review.monthly_salary:,.2f}" if review.monthly_salary else "N/A",
+                f"TZS {review.employer_debts:,.2f}" if review.employer_debts else "N/A",
+                f"TZS {review.financial_debts:,.2f}" if review.financial_debts else "N/A",
+                review.reviewed_at.strftime('%B %d, %Y')
+            ])
+
+        hr_table = Table(hr_data, colWidths=[1.5*inch, 1*inch, 1.5*inch, 1.5*inch, 1.5*inch, 1*inch])
+        hr_table.setStyle(_table_style(font_size=8, padding=8))
+        story.append(hr_table)
+        story.append(Spacer(1, 20))
+
+    # Approval History
+    story.append(Paragraph("Approval History", styles['heading']))
+    story.append(Spacer(1, 12))
+
+    all_reviews = []
+    for review in loan.loan_officer_reviews.select_related('officer'):
+        all_reviews.append(('Loan Officer', review.officer, review.approved_amount, review))
+    for review in loan.committee_reviews.select_related('committee_member'):
+        all_reviews.append(('Committee', review.committee_member, review.final_amount, review))
+
+    if all_reviews:
+        approval_data = [['Approver Type', 'Approver', 'Decision', 'Amount', 'Date', 'Comments']]
+        for review_type, approver, amount, review in all_reviews:
+            if review.is_approved is None:
+                decision = "Pending"
+            else:
+                decision = "Approved" if review.is_approved else "Rejected"
+            approval_data.append([
+                review_type,
+                _full_name(approver),
+                decision,
+                f"TZS {amount:,.2f}" if amount else "",
+                review.reviewed_at.strftime('%B %d, %Y'),
+                review.comments or "No comments"
+            ])
+
+        approval_table = Table(approval_data, colWidths=[1.2*inch, 1.5*inch, 0.8*inch, 1.2*inch, 1.2*inch, 2.1*inch])
+        approval_table.setStyle(_table_style(align='LEFT', font_size=8, padding=8))
+        story.append(approval_table)
+    else:
+        story.append(Paragraph("No approvals yet", styles['normal']))
+
+    # Repayment Schedule
+    if loan.status == 'committee_approved':
+        schedule = loan.repayment_schedule.all().order_by('installment_number')
+        story.append(Spacer(1, 20))
+        story.append(Paragraph("Repayment Schedule", styles['heading']))
+        story.append(Spacer(1, 12))
+
+        if schedule:
+            schedule_data = [['Installment', 'Due Date', 'Amount', 'Status']]
+            for installment in schedule:
+                schedule_data.append([
+                    installment.installment_number,
+                    installment.due_date.strftime('%B %d, %Y'),
+                    f"TZS {installment.amount:,.2f}",
+                    "Paid" if installment.is_paid else "Pending"
+                ])
+
+            schedule_table = Table(schedule_data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 1*inch])
+            schedule_table.setStyle(_table_style())
+            story.append(schedule_table)
+
+    # Footer
+    story.append(Spacer(1, 30))
+    story.append(Paragraph("Generated by TBL SACCOS Loan Management System", styles['footer']))
+
+    doc.build(story)
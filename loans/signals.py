@@ -0,0 +1,113 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    CommitteeReview, GuarantorApproval, HRReview, LoanApplication,
+    LoanOfficerReview, LoanPayment, LoanType, RepaymentSchedule,
+)
+from . import caching, pdf, registry, summaries
+
+
+def _changes_loan_totals(old, new):
+    # Instances that were not loaded with every summary field always count as changed
+    if old is None or new is None:
+        return True
+    # Only applications in a borrowed status count towards the totals
+    borrowed = summaries.BORROWED_STATUSES
+    return old != new and (old[0] in borrowed or new[0] in borrowed)
+
+
+@receiver(post_save, sender=LoanApplication)
+def loan_application_saved(sender, instance, created, **kwargs):
+    """Refresh the applicant's loan totals when the status or approved amount changes"""
+    state = instance.summary_state()
+    if created or _changes_loan_totals(getattr(instance, '_summary_state', None), state):
+        summaries.refresh_loan_totals(instance.applicant_id)
+    instance._summary_state = state
+
+
+@receiver(post_delete, sender=LoanApplication)
+def loan_application_deleted(sender, instance, **kwargs):
+    summaries.refresh_loan_totals(instance.applicant_id)
+
+
+def _payment_applicant_id(payment):
+    return LoanApplication.objects.filter(pk=payment.loan_application_id).values_list(
+        'applicant_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=LoanPayment)
+def loan_payment_saved(sender, instance, created, **kwargs):
+    """Add new payments to the applicant's running total"""
+    applicant_id = _payment_applicant_id(instance)
+    if applicant_id is None:
+        return
+    if created:
+        summaries.apply_payment(applicant_id, instance.amount)
+    else:
+        # The amount may have been edited in the admin
+        summaries.refresh_member_summary(applicant_id)
+
+
+@receiver(post_delete, sender=LoanPayment)
+def loan_payment_deleted(sender, instance, **kwargs):
+    applicant_id = _payment_applicant_id(instance)
+    if applicant_id is not None:
+        summaries.apply_payment(applicant_id, -instance.amount)
+
+
+@receiver([post_save, post_delete], sender=GuarantorApproval)
+def guarantor_approval_changed(sender, instance, **kwargs):
+    summaries.refresh_guarantor_requests(instance.guarantor_id)
+
+
+@receiver([post_save, post_delete], sender=LoanApplication)
+def loan_application_changed(sender, instance, **kwargs):
+    """Workspace queues and counts are shared by role, so every cached one goes stale"""
+    caching.loans_changed([instance.applicant_id])
+
+
+@receiver([post_save, post_delete], sender=GuarantorApproval)
+def guarantor_request_changed(sender, instance, **kwargs):
+    """The guarantor's pending requests (dashboard list and badge) changed"""
+    caching.users_changed([instance.guarantor_id])
+
+
+def touch_application(loan_id):
+    """Bump an application's version after a record printed on its PDF changes"""
+    LoanApplication.objects.filter(pk=loan_id).update(updated_at=timezone.now())
+    transaction.on_commit(partial(pdf.schedule_pdf_render, loan_id))
+
+
+@receiver(post_save, sender=LoanApplication)
+def render_application_pdf(sender, instance, **kwargs):
+    transaction.on_commit(partial(pdf.schedule_pdf_render, instance.pk))
+
+
+@receiver(post_delete, sender=LoanApplication)
+def discard_application_pdf(sender, instance, **kwargs):
+    pdf.discard_application_pdfs(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=GuarantorApproval)
+@receiver([post_save, post_delete], sender=HRReview)
+@receiver([post_save, post_delete], sender=LoanOfficerReview)
+@receiver([post_save, post_delete], sender=CommitteeReview)
+# Schedules are replaced in bulk by loans.amortization, which bumps the version
+# itself; only single installment edits (e.g. in the admin) arrive here
+@receiver(post_save, sender=RepaymentSchedule)
+def pdf_record_changed(sender, instance, **kwargs):
+    touch_application(instance.loan_application_id)
+
+
+@receiver([post_save, post_delete], sender=LoanType)
+def loan_type_changed(sender, instance, **kwargs):
+    """Have every worker reload its loan type registry"""
+    registry.loan_types.invalidate()
+    # Again once committed, for workers that reloaded before the commit
+    transaction.on_commit(registry.loan_types.invalidate)
@@ -0,0 +1,182 @@
+"""
+Maintenance of the per-member MemberFinancialSummary table.
+
+Rows are built the first time a member's dashboard is read. From then on
+payments adjust `total_paid` incrementally with F() expressions, while a
+status change on an application refreshes only that member's loan totals.
+`rebuild_all_summaries` recomputes the whole table from scratch and backs the
+`reconcile_member_summaries` management command.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from tblsaccos.database import immediate_atomic
+from .models import GuarantorApproval, LoanApplication, LoanPayment, MemberFinancialSummary
+
+# Statuses in which an application counts as money borrowed by the member
+BORROWED_STATUSES = ['committee_approved', 'payment_processing', 'disbursed', 'completed']
+
+ZERO = Decimal('0')
+
+
+def _loan_totals(user_id):
+    totals = LoanApplication.objects.filter(
+        applicant_id=user_id, status__in=BORROWED_STATUSES
+    ).aggregate(
+        total_borrowed=Sum('final_approved_amount'),
+        monthly_deduction=Sum('monthly_repayment'),
+    )
+    return {
+        'total_borrowed': totals['total_borrowed'] or ZERO,
+        'monthly_deduction': totals['monthly_deduction'] or ZERO,
+    }
+
+
+def _pending_guarantor_requests(user_id):
+    # GuarantorApproval is unique per (application, guarantor)
+    return GuarantorApproval.objects.filter(guarantor_id=user_id, approved_at__isnull=True).count()
+
+
+def _locked_summary(user_id):
+    """Fetch a member's summary row locked for the current transaction, if it exists"""
+    return MemberFinancialSummary.objects.select_for_update().filter(user_id=user_id).first()
+
+
+@immediate_atomic()
+def refresh_member_summary(user_id):
+    """Recompute every field of a single member's summary"""
+    summary, created = MemberFinancialSummary.objects.select_for_update().get_or_create(user_id=user_id)
+    for field, value in _loan_totals(user_id).items():
+        setattr(summary, field, value)
+    summary.total_paid = LoanPayment.objects.filter(
+        loan_application__applicant_id=user_id
+    ).aggregate(total=Sum('amount'))['total'] or ZERO
+    summary.pending_guarantor_requests = _pending_guarantor_requests(user_id)
+    summary.save()
+    return summary
+
+
+@immediate_atomic()
+def refresh_loan_totals(user_id):
+    """Refresh the borrowed amount and monthly deduction after an application changes"""
+    summary = _locked_summary(user_id)
+    if summary is None:
+        return
+    for field, value in _loan_totals(user_id).items():
+        setattr(summary, field, value)
+    summary.save(update_fields=['total_borrowed', 'monthly_deduction', 'updated_at'])
+
+
+@immediate_atomic()
+def refresh_loan_totals_many(user_ids):
+    """Refresh several members' loan totals with one grouped query, after a bulk status change"""
+    rows = list(MemberFinancialSummary.objects.select_for_update().filter(user_id__in=user_ids))
+    if not rows:
+        return
+    totals = {
+        row['applicant_id']: row
+        for row in LoanApplication.objects.filter(
+            applicant_id__in=[summary.user_id for summary in rows], status__in=BORROWED_STATUSES
+        ).order_by().values('applicant_id').annotate(
+            total_borrowed=Sum('final_approved_amount'),
+            monthly_deduction=Sum('monthly_repayment'),
+        )
+    }
+    now = timezone.now()
+    for summary in rows:
+        member_totals = totals.get(summary.user_id, {})
+        summary.total_borrowed = member_totals.get('total_borrowed') or ZERO
+        summary.monthly_deduction = member_totals.get('monthly_deduction') or ZERO
+        summary.updated_at = now
+    MemberFinancialSummary.objects.bulk_update(rows, ['total_borrowed', 'monthly_deduction', 'updated_at'])
+
+
+@immediate_atomic()
+def refresh_guarantor_requests(user_id):
+    """Refresh the number of guarantor requests awaiting the member's response"""
+    summary = _locked_summary(user_id)
+    if summary is None:
+        return
+    summary.pending_guarantor_requests = _pending_guarantor_requests(user_id)
+    summary.save(update_fields=['pending_guarantor_requests', 'updated_at'])
+
+
+def adjust_guarantor_requests(user_id, delta):
+    """Add `delta` to the number of guarantor requests awaiting a member's response"""
+    MemberFinancialSummary.objects.filter(user_id=user_id).update(
+        pending_guarantor_requests=F('pending_guarantor_requests') + delta,
+        updated_at=timezone.now(),
+    )
+
+
+@immediate_atomic()
+def apply_payment(user_id, amount):
+    """Add (or, for a deleted payment, subtract) an amount from a member's total paid"""
+    MemberFinancialSummary.objects.filter(user_id=user_id).update(
+        total_paid=F('total_paid') + amount,
+        updated_at=timezone.now(),
+    )
+
+
+@immediate_atomic()
+def apply_payments(totals, batch_size=1000):
+    """Add many members' payments at once; `totals` maps user ids to the amount paid"""
+    user_ids = list(totals)
+    now = timezone.now()
+    for start in range(0, len(user_ids), batch_size):
+        rows = list(
+            MemberFinancialSummary.objects.select_for_update().filter(user_id__in=user_ids[start:start + batch_size])
+        )
+        for summary in rows:
+            summary.total_paid += totals[summary.user_id]
+            summary.updated_at = now
+        MemberFinancialSummary.objects.bulk_update(rows, ['total_paid', 'updated_at'])
+
+
+def get_member_summary(user):
+    """Return a member's summary, building it on first access"""
+    summary = MemberFinancialSummary.objects.filter(user=user).first()
+    if summary is None:
+        summary = refresh_member_summary(user.pk)
+    return summary
+
+
+@immediate_atomic()
+def rebuild_all_summaries(batch_size=1000):
+    """Throw away every summary row and rebuild the table from the source tables"""
+    summaries = {}
+
+    def summary_for(user_id):
+        if user_id not in summaries:
+            summaries[user_id] = MemberFinancialSummary(user_id=user_id)
+        return summaries[user_id]
+
+    loans = LoanApplication.objects.order_by().filter(status__in=BORROWED_STATUSES).values(
+        'applicant_id'
+    ).annotate(
+        total_borrowed=Sum('final_approved_amount'),
+        monthly_deduction=Sum('monthly_repayment'),
+    )
+    for row in loans:
+        summary = summary_for(row['applicant_id'])
+        summary.total_borrowed = row['total_borrowed'] or ZERO
+        summary.monthly_deduction = row['monthly_deduction'] or ZERO
+
+    payments = LoanPayment.objects.order_by().values('loan_application__applicant_id').annotate(
+        total_paid=Sum('amount')
+    )
+    for row in payments:
+        summary_for(row['loan_application__applicant_id']).total_paid = row['total_paid'] or ZERO
+
+    guarantees = GuarantorApproval.objects.order_by().filter(approved_at__isnull=True).values(
+        'guarantor_id'
+    ).annotate(pending=Count('id'))
+    for row in guarantees:
+        summary_for(row['guarantor_id']).pending_guarantor_requests = row['pending']
+
+    MemberFinancialSummary.objects.all().delete()
+    MemberFinancialSummary.objects.bulk_create(summaries.values(), batch_size=batch_size)
+    return len(summaries)
@@ -0,0 +1,1072 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import MemberProfile, Notification, UserProfile
+from tblsaccos.database import immediate_atomic
+
+from .analytics import compute_portfolio_risk, loan_risk
+from . import caching, pdf, workflow
+from .amortization import (
+    _spread, add_months, flat_schedule, monthly_rate, persist_schedule, reducing_balance_schedule, regenerate_schedules,
+)
+from .payroll import PayrollImportError, deduction_rows, import_payroll_deductions
+from .quotes import compute_quote
+from .registry import VERSION_KEY, get_loan_type, get_loan_type_by_name, loan_types
+from .summaries import get_member_summary, rebuild_all_summaries
+from .models import (
+    AccountantReview, CommitteeReview, GuarantorApproval, HRReview, LoanApplication, LoanOfficerReview, LoanPayment, LoanType,
+    MemberFinancialSummary, RepaymentSchedule,
+)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are asserted against SQLite')
+class WorkflowIndexTests(TestCase):
+    """The workflow's hot filter paths are served by the composite/partial indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='member')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan)
+
+    def test_workspace_queue_uses_status_created_index(self):
+        queryset = LoanApplication.objects.filter(status='hr_reviewed').order_by('-created_at', '-id')
+        self.assertUsesIndex(queryset, 'loanapp_status_created_idx')
+
+    def test_applicant_status_filter_uses_composite_index(self):
+        queryset = LoanApplication.objects.filter(applicant=self.user, status='pending')
+        self.assertUsesIndex(queryset, 'loanapp_applicant_status_idx')
+
+    def test_pending_guarantor_requests_use_partial_index(self):
+        queryset = GuarantorApproval.objects.filter(guarantor=self.user, approved_at__isnull=True)
+        self.assertUsesIndex(queryset, 'guarantor_pending_idx')
+
+
+def create_loan_type(name='elimu', interest_rate=Decimal('12'), update=False):
+    """
+    A loan type with test terms. The migrations already create the standard
+    types, so an existing row is reused as it is, or with `update` reset to
+    these terms (remember to invalidate the registry afterwards).
+    """
+    create = LoanType.objects.update_or_create if update else LoanType.objects.get_or_create
+    return create(name=name, defaults={
+        'max_amount': Decimal('1000000'), 'interest_rate': interest_rate,
+        'max_period': 12, 'collateral_required': 'None',
+    })[0]
+
+
+def create_application(applicant, loan_type, **fields):
+    defaults = {
+        'purpose': 'business',
+        'amount': Decimal('100000'),
+        'period': 12,
+        'phone_number': '0700000000',
+        'department': 'Finance',
+        'bank_name': 'NMB',
+        'account_number': '0001',
+        'savings_value': Decimal('0'),
+        'shares_value': Decimal('0'),
+    }
+    defaults.update(fields)
+    return LoanApplication.objects.create(applicant=applicant, loan_type=loan_type, **defaults)
+
+
+class GuarantorRequestsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type('chap_chap')
+        cls.applicant = User.objects.create(username='applicant', first_name='Asha', last_name='Juma')
+        cls.guarantor = User.objects.create(username='guarantor')
+
+    def add_requests(self, pending, completed):
+        for _ in range(pending):
+            loan = create_application(self.applicant, self.loan_type)
+            GuarantorApproval.objects.create(loan_application=loan, guarantor=self.guarantor)
+        for _ in range(completed):
+            loan = create_application(self.applicant, self.loan_type)
+            GuarantorApproval.objects.create(
+                loan_application=loan, guarantor=self.guarantor,
+                is_approved=True, approved_at=timezone.now(),
+            )
+
+    def get_inbox(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('loans:guarantor_requests'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_requests(self):
+        self.client.force_login(self.guarantor)
+        self.add_requests(pending=1, completed=1)
+        _, few = self.get_inbox()
+        self.add_requests(pending=8, completed=8)
+        response, many = self.get_inbox()
+        self.assertEqual(few, many)
+        self.assertEqual(response.context['pending_count'], 9)
+        self.assertEqual(response.context['completed_count'], 9)
+
+    def test_requests_are_split_and_paginated(self):
+        self.client.force_login(self.guarantor)
+        self.add_requests(pending=12, completed=2)
+        response, _ = self.get_inbox()
+        pending = response.context['pending_requests']
+        self.assertEqual(len(pending), 10)
+        self.assertTrue(pending.has_next)
+        self.assertTrue(all(item['status'] == 'pending' for item in pending))
+        self.assertEqual([item['status'] for item in response.context['completed_requests']], ['approved'] * 2)
+
+        response = self.client.get(
+            reverse('loans:guarantor_requests'), {'pending_cursor': pending.next_cursor}
+        )
+        self.assertEqual(len(response.context['pending_requests']), 2)
+
+    def test_last_guarantor_approval_notifies_hr_officers(self):
+        hr_officer = User.objects.create(username='hr')
+        UserProfile.objects.create(user=hr_officer, user_type='hr_officer', employee_id='HR1')
+        loan = create_application(self.applicant, self.loan_type)
+        GuarantorApproval.objects.create(loan_application=loan, guarantor=self.guarantor)
+
+        self.client.force_login(self.guarantor)
+        response = self.client.post(
+            reverse('loans:guarantor_approve_reject', args=[loan.pk]), {'action': 'approve'}
+        )
+        self.assertTrue(response.json()['success'])
+        loan.refresh_from_db()
+        self.assertEqual(loan.status, 'guarantor_approved')
+        self.assertTrue(Notification.objects.filter(
+            recipient=hr_officer, notification_type='hr_review_pending', related_object_id=loan.pk
+        ).exists())
+
+
+class ApplicationTrackerApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.member = User.objects.create(username='member')
+        UserProfile.objects.create(user=cls.member, user_type='member')
+        cls.officer = User.objects.create(username='officer')
+        UserProfile.objects.create(user=cls.officer, user_type='loan_officer')
+        cls.other = User.objects.create(username='other')
+        for i in range(5):
+            create_application(cls.member, cls.loan_type, amount=Decimal(10000 + i * 1000))
+        for i in range(3):
+            create_application(cls.other, cls.loan_type, department='ICT', status='hr_reviewed')
+
+    def fetch(self, **params):
+        response = self.client.get(reverse('loans:application_tracker_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_tracker_page_renders_the_filters(self):
+        self.client.force_login(self.officer)
+        response = self.client.get(reverse('loans:application_tracker'))
+        self.assertContains(response, reverse('loans:application_tracker_api'))
+
+    def test_members_only_see_their_own_applications(self):
+        self.client.force_login(self.member)
+        self.assertEqual(len(self.fetch()['results']), 5)
+
+    def test_filters(self):
+        self.client.force_login(self.officer)
+        self.assertEqual(len(self.fetch()['results']), 8)
+        self.assertEqual(len(self.fetch(status='hr_reviewed')['results']), 3)
+        self.assertEqual(len(self.fetch(department='ICT')['results']), 3)
+        self.assertEqual(len(self.fetch(loan_type='bima')['results']), 0)
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.fetch(date_from=today, date_to=today)['results']), 8)
+        self.assertEqual(len(self.fetch(date_to='2000-01-01')['results']), 0)
+
+    @mock.patch('loans.tracker.TRACKER_PAGE_SIZE', 2)
+    def test_cursor_pages_through_sorted_rows(self):
+        self.client.force_login(self.officer)
+        amounts, pages, cursor = [], 0, None
+        while True:
+            params = {'sort': 'amount_asc', 'status': 'pending'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.fetch(**params)
+            amounts += [Decimal(row['amount']) for row in data['results']]
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(amounts, [Decimal(10000 + i * 1000) for i in range(5)])
+
+
+class PortfolioExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.accountant = User.objects.create(username='accountant')
+        UserProfile.objects.create(user=cls.accountant, user_type='admin')
+        cls.loan = create_application(cls.accountant, cls.loan_type, status='disbursed')
+        CommitteeReview.objects.create(loan_application=cls.loan, is_approved=True, final_amount=Decimal('90000'))
+        LoanPayment.objects.create(loan_application=cls.loan, amount=Decimal('1000'))
+        LoanPayment.objects.create(loan_application=cls.loan, amount=Decimal('2500'))
+        create_application(cls.accountant, cls.loan_type)
+
+    def rows(self, content):
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_streams_one_row_per_application(self):
+        self.client.force_login(self.accountant)
+        response = self.client.get(reverse('staff:portfolio_export'))
+        self.assertTrue(response.streaming)
+        rows = self.rows(b''.join(response.streaming_content).decode())
+        self.assertEqual(len(rows), 2)
+        row = next(row for row in rows if row['Application ID'] == str(self.loan.pk))
+        self.assertEqual(row['Payments'], '2')
+        self.assertEqual(Decimal(row['Total Paid']), Decimal('3500'))
+        self.assertEqual(row['Committee Decision'], 'Approved')
+        self.assertEqual(row['Loan Officer Decision'], 'Pending')
+
+    def test_text_that_spreadsheets_would_evaluate_is_escaped(self):
+        applicant = User.objects.create(username='formula', first_name='=HYPERLINK("http://x")', last_name='-2+3')
+        create_application(applicant, self.loan_type, department='@SUM(A1)')
+        output = io.StringIO()
+        call_command('export_portfolio', stdout=output)
+        row = next(row for row in self.rows(output.getvalue()) if row['Username'] == 'formula')
+        self.assertEqual(row['First Name'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(row['Last Name'], "'-2+3")
+        self.assertEqual(row['Department'], "'@SUM(A1)")
+        # Numbers are left alone
+        self.assertEqual(row['Amount Requested'], '100000.00')
+
+    def test_members_cannot_export(self):
+        member = User.objects.create(username='member')
+        UserProfile.objects.create(user=member, user_type='member')
+        self.client.force_login(member)
+        self.assertEqual(self.client.get(reverse('staff:portfolio_export')).status_code, 302)
+
+    def test_management_command(self):
+        output = io.StringIO()
+        call_command('export_portfolio', status='disbursed', stdout=output)
+        rows = self.rows(output.getvalue())
+        self.assertEqual([row['Application ID'] for row in rows], [str(self.loan.pk)])
+
+
+class PortfolioRiskTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.member = User.objects.create(username='member')
+        cls.today = date(2024, 6, 30)
+
+    def loan_with_schedule(self, first_due, paid=0, installments=3, principal=Decimal('1000')):
+        loan = create_application(self.member, self.loan_type, status='disbursed')
+        RepaymentSchedule.objects.bulk_create([
+            RepaymentSchedule(
+                loan_application=loan, installment_number=n + 1,
+                due_date=first_due + timedelta(days=30 * n), amount=principal + 100,
+                principal=principal, interest=Decimal('100'), is_paid=n < paid,
+            )
+            for n in range(installments)
+        ])
+        return loan
+
+    def test_days_past_due_and_outstanding_principal(self):
+        loan = self.loan_with_schedule(date(2024, 5, 1), paid=1)
+        risk, = loan_risk(self.today)
+        self.assertEqual(risk['loan_id'], loan.pk)
+        self.assertEqual(risk['outstanding_principal'], Decimal('2000'))
+        # Installment 2 was due on 2024-05-31
+        self.assertEqual(risk['days_past_due'], 30)
+        self.assertEqual(risk['arrears'], Decimal('1100'))
+
+    def test_partial_payments_reduce_outstanding_principal(self):
+        loan = self.loan_with_schedule(date(2024, 5, 1), paid=1)
+        installments = RepaymentSchedule.objects.filter(loan_application=loan, is_paid=False).order_by('installment_number')
+        # Interest is covered first: 60 of interest pays no principal, 400 pays 300
+        RepaymentSchedule.objects.filter(pk=installments[0].pk).update(amount_paid=Decimal('60'))
+        RepaymentSchedule.objects.filter(pk=installments[1].pk).update(amount_paid=Decimal('400'))
+        risk, = loan_risk(self.today)
+        self.assertEqual(risk['outstanding_principal'], Decimal('1700'))
+        self.assertEqual(risk['arrears'], Decimal('1040'))
+
+    def test_partial_payments_on_schedules_without_a_split(self):
+        loan = self.loan_with_schedule(date(2024, 5, 1), principal=Decimal('0'))
+        RepaymentSchedule.objects.filter(loan_application=loan).update(interest=Decimal('0'), amount_paid=Decimal('40'))
+        risk, = loan_risk(self.today)
+        self.assertEqual(risk['outstanding_principal'], Decimal('180'))
+
+    def test_par_buckets(self):
+        self.loan_with_schedule(date(2024, 7, 15))  # current
+        self.loan_with_schedule(date(2024, 4, 15))  # 76 days past due
+        self.loan_with_schedule(date(2024, 1, 15), installments=2)  # 167 days past due
+        risk = compute_portfolio_risk(self.today)
+        self.assertEqual(risk['outstanding_principal'], Decimal('8000'))
+        self.assertEqual(risk['loans_in_arrears'], 2)
+        par = {bucket['days']: bucket for bucket in risk['par']}
+        self.assertEqual((par[30]['loans'], par[30]['amount']), (2, Decimal('5000')))
+        self.assertEqual((par[60]['loans'], par[60]['ratio']), (2, Decimal('62.50')))
+        self.assertEqual((par[90]['loans'], par[90]['ratio']), (1, Decimal('25.00')))
+
+
+class PayrollImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.member = User.objects.create(username='member')
+        MemberProfile.objects.create(
+            user=cls.member, bank_name='NMB', account_number='0001',
+            salary_number='tbl-001', monthly_salary=Decimal('900000'),
+        )
+        cls.loan = create_application(cls.member, cls.loan_type, status='disbursed')
+        RepaymentSchedule.objects.bulk_create([
+            RepaymentSchedule(
+                loan_application=cls.loan, installment_number=n + 1,
+                due_date=date(2024, 1, 31) + timedelta(days=30 * n), amount=Decimal('1000'),
+            )
+            for n in range(3)
+        ])
+
+    def installments(self):
+        return list(self.loan.repayment_schedule.order_by('installment_number').values_list('amount_paid', 'is_paid'))
+
+    def test_amount_is_allocated_to_the_oldest_installments(self):
+        get_member_summary(self.member)
+        result = import_payroll_deductions(['salary_number,amount', 'TBL-001,"1,500"'], reference='PAY-01')
+        self.assertEqual((result.lines, result.posted_lines, result.payments), (1, 1, 1))
+        self.assertEqual(self.installments(), [
+            (Decimal('1000'), True), (Decimal('500'), False), (Decimal('0'), False),
+        ])
+        payment = LoanPayment.objects.get(loan_application=self.loan)
+        self.assertEqual((payment.amount, payment.reference_number), (Decimal('1500'), 'PAY-01'))
+        self.assertEqual(get_member_summary(self.member).total_paid, Decimal('1500'))
+
+    def test_unknown_and_excess_lines_are_reported(self):
+        result = import_payroll_deductions(['TBL-999,100', 'TBL-001,abc', 'TBL-001,4000'])
+        self.assertEqual(result.total_posted, Decimal('3000'))
+        self.assertEqual(result.unallocated, Decimal('1000'))
+        self.assertEqual([line for line, _, _ in result.rejected], [1, 2, 3])
+        self.assertEqual(self.installments(), [(Decimal('1000'), True)] * 3)
+
+    def test_dry_run_rolls_back(self):
+        result = import_payroll_deductions(['TBL-001,1000'], dry_run=True)
+        self.assertEqual(result.total_posted, Decimal('1000'))
+        self.assertFalse(LoanPayment.objects.exists())
+        self.assertEqual(self.installments()[0], (Decimal('0'), False))
+
+    def test_a_reference_is_posted_only_once(self):
+        import_payroll_deductions(['TBL-001,1000'], reference='PAY-01')
+        with self.assertRaises(PayrollImportError):
+            import_payroll_deductions(['TBL-001,1000'], reference='PAY-01')
+        self.assertEqual(LoanPayment.objects.count(), 1)
+        self.assertEqual(self.installments()[:2], [(Decimal('1000'), True), (Decimal('0'), False)])
+
+        # The default PAYROLL-YYYYMM reference is guarded the same way
+        import_payroll_deductions(['TBL-001,500'])
+        with self.assertRaises(PayrollImportError):
+            import_payroll_deductions(['TBL-001,500'])
+        self.assertEqual(get_member_summary(self.member).total_paid, Decimal('1500'))
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as deductions:
+            deductions.write('TBL-001,1000\n')
+            deductions.flush()
+            call_command('import_payroll_deductions', deductions.name, stdout=io.StringIO())
+        self.assertEqual(self.installments()[0], (Decimal('1000'), True))
+
+    def test_accountant_upload(self):
+        accountant = User.objects.create(username='accountant')
+        UserProfile.objects.create(user=accountant, user_type='accountant')
+        self.client.force_login(accountant)
+        upload = SimpleUploadedFile('deductions.csv', b'TBL-001,2000\n', content_type='text/csv')
+        response = self.client.post(reverse('staff:payroll_import'), {'deductions_file': upload, 'reference': 'PAY-02'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].payments, 1)
+        self.assertEqual(LoanPayment.objects.get().reference_number, 'PAY-02')
+
+
+class PayrollDeductionFileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.member = User.objects.create(username='member', first_name='Asha', last_name='Juma')
+        MemberProfile.objects.create(
+            user=cls.member, bank_name='NMB', account_number='0001',
+            salary_number='TBL-001', monthly_salary=Decimal('900000'),
+        )
+        cls.first = cls.loan_with_schedule(date(2024, 4, 30), amount_paid=Decimal('400'))
+        cls.second = cls.loan_with_schedule(date(2024, 5, 31))
+        # Nothing is due yet on a loan whose first installment falls after May
+        cls.loan_with_schedule(date(2024, 7, 31), applicant=User.objects.create(username='other'))
+
+    @classmethod
+    def loan_with_schedule(cls, first_due, amount_paid=Decimal('0'), applicant=None):
+        loan = create_application(applicant or cls.member, cls.loan_type, status='disbursed')
+        RepaymentSchedule.objects.bulk_create([
+            RepaymentSchedule(
+                loan_application=loan, installment_number=n + 1,
+                due_date=first_due + timedelta(days=30 * n), amount=Decimal('1000'),
+                amount_paid=amount_paid if n == 0 else Decimal('0'),
+            )
+            for n in range(3)
+        ])
+        return loan
+
+    def test_one_row_per_member_with_arrears(self):
+        header, *rows = deduction_rows(date(2024, 5, 1))
+        self.assertEqual(header[0], 'salary_number')
+        self.assertEqual(rows, [[
+            'TBL-001', 'Asha Juma', 'Finance', f'#{self.first.pk} #{self.second.pk}',
+            Decimal('2000'), Decimal('600'), Decimal('2600'),
+        ]])
+
+    def test_names_that_spreadsheets_would_evaluate_are_escaped(self):
+        User.objects.filter(pk=self.member.pk).update(first_name='=cmd', last_name='')
+        LoanApplication.objects.filter(applicant=self.member).update(department='+Finance')
+        header, row = deduction_rows(date(2024, 5, 1))
+        self.assertEqual(row[1:3], ["'=cmd", "'+Finance"])
+
+    def test_file_posts_back_through_the_import(self):
+        output = io.StringIO()
+        call_command('export_payroll_deductions', month='2024-05', stdout=output)
+        result = import_payroll_deductions(io.StringIO(output.getvalue()))
+        self.assertEqual((result.total_posted, result.rejected), (Decimal('2600'), []))
+
+    def test_hr_officer_download(self):
+        hr_officer = User.objects.create(username='hr')
+        UserProfile.objects.create(user=hr_officer, user_type='hr_officer')
+        self.client.force_login(hr_officer)
+        response = self.client.get(reverse('staff:payroll_deductions'), {'month': '2024-05'})
+        self.assertIn('payroll_deductions_2024_05.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2)
+
+
+class LoanWorkflowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.applicant = User.objects.create(username='applicant')
+        cls.guarantors = [User.objects.create(username=f'guarantor{n}') for n in range(2)]
+
+    def staff(self, role, count=1):
+        users = []
+        for _ in range(count):
+            user = User.objects.create(username=f'{role}{User.objects.count()}')
+            UserProfile.objects.create(user=user, user_type=role, employee_id=f'E{user.pk}')
+            users.append(user)
+        return users
+
+    def application(self, **fields):
+        loan = create_application(self.applicant, self.loan_type, **fields)
+        for guarantor in self.guarantors:
+            GuarantorApproval.objects.create(loan_application=loan, guarantor=guarantor)
+        return loan
+
+    def test_application_moves_through_every_stage(self):
+        hr_officer, = self.staff('hr_officer')
+        officer, = self.staff('loan_officer')
+        member, = self.staff('committee_member')
+        accountant, = self.staff('accountant')
+        loan = self.application()
+
+        workflow.respond_as_guarantor(loan, self.guarantors[0], approve=True)
+        self.assertEqual(LoanApplication.objects.get(pk=loan.pk).status, 'pending')
+        workflow.respond_as_guarantor(loan, self.guarantors[1], approve=True)
+        workflow.complete_hr_review(loan, hr_officer, Decimal('900000'), Decimal('0'), Decimal('0'))
+        workflow.review_as_loan_officer(loan, officer, approve=True, approved_amount=Decimal('80000'))
+        workflow.review_as_committee(loan, member, approve=True)
+        workflow.process_payment(loan, accountant, 'Bank Transfer')
+        result = workflow.disburse(loan)
+
+        loan.refresh_from_db()
+        self.assertEqual(result.status, 'disbursed')
+        self.assertEqual(loan.final_approved_amount, Decimal('80000'))
+        self.assertIsNotNone(loan.disbursement_date)
+        # Each stage filled in the placeholder row left by the one before it
+        self.assertEqual(list(HRReview.objects.filter(loan_application=loan).values_list('reviewer', flat=True)), [hr_officer.pk])
+        self.assertEqual(LoanOfficerReview.objects.get(loan_application=loan).officer, officer)
+        self.assertEqual(CommitteeReview.objects.get(loan_application=loan).committee_member, member)
+        self.assertEqual(loan.accountant_reviews.get().accountant, accountant)
+        self.assertEqual(loan.repayment_schedule.count(), loan.period)
+        self.assertTrue(Notification.objects.filter(recipient=accountant, related_object_id=loan.pk).exists())
+
+    def test_query_count_does_not_grow_with_staff(self):
+        officer, = self.staff('loan_officer')
+        self.staff('committee_member')
+        first = self.application(status='hr_reviewed')
+        few = workflow.review_as_loan_officer(first, officer, approve=True).queries
+        self.staff('committee_member', count=5)
+        second = self.application(status='hr_reviewed')
+        many = workflow.review_as_loan_officer(second, officer, approve=True).queries
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 12)
+        self.assertEqual(Notification.objects.filter(notification_type='committee_review_pending').count(), 7)
+
+    def test_second_decision_on_a_stale_application_is_refused(self):
+        first, second = self.staff('committee_member', count=2)
+        loan = self.application(status='loan_officer_approved')
+        stale = LoanApplication.objects.get(pk=loan.pk)
+        workflow.review_as_committee(loan, first, approve=True)
+        with self.assertRaises(workflow.TransitionError):
+            workflow.review_as_committee(stale, second, approve=False)
+        loan.refresh_from_db()
+        self.assertEqual(loan.status, 'committee_approved')
+        self.assertEqual(CommitteeReview.objects.get(loan_application=loan).committee_member, first)
+
+    def test_rejection_waits_for_every_guarantor(self):
+        loan = self.application()
+        workflow.respond_as_guarantor(loan, self.guarantors[0], approve=False)
+        with self.assertRaises(workflow.TransitionError):
+            workflow.respond_as_guarantor(loan, self.guarantors[0], approve=True)
+        self.assertEqual(LoanApplication.objects.get(pk=loan.pk).status, 'pending')
+        result = workflow.respond_as_guarantor(loan, self.guarantors[1], approve=True)
+        self.assertEqual(result.status, 'rejected')
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.applicant, notification_type='guarantor_response').count(), 2
+        )
+
+
+class CommitteeBatchDecisionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.member = User.objects.create(username='committee')
+        UserProfile.objects.create(user=cls.member, user_type='committee_member', employee_id='C1')
+        cls.accountant = User.objects.create(username='accountant')
+        UserProfile.objects.create(user=cls.accountant, user_type='accountant', employee_id='A1')
+        cls.applicant = User.objects.create(username='applicant')
+
+    def applications(self, count, status='loan_officer_approved'):
+        loans = [create_application(self.applicant, self.loan_type, status=status) for _ in range(count)]
+        CommitteeReview.objects.bulk_create([CommitteeReview(loan_application=loan) for loan in loans])
+        return loans
+
+    def test_batch_is_applied_with_bulk_writes(self):
+        approved, rejected, reduced = self.applications(3)
+        decided = self.applications(1, status='committee_approved')[0]
+        result = workflow.decide_as_committee(self.member, [
+            (approved.pk, True, None),
+            (rejected.pk, False, None),
+            (reduced.pk, True, Decimal('60000')),
+            (decided.pk, False, None),
+        ], comments='Kikao cha Oktoba')
+        self.assertEqual(result.approved, [approved.pk, reduced.pk])
+        self.assertEqual(result.rejected, [rejected.pk])
+        self.assertEqual(result.skipped, [decided.pk])
+
+        statuses = dict(LoanApplication.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[rejected.pk], 'rejected')
+        self.assertEqual(statuses[decided.pk], 'committee_approved')
+        reduced.refresh_from_db()
+        self.assertEqual((reduced.status, reduced.final_approved_amount), ('committee_approved', Decimal('60000')))
+        review = CommitteeReview.objects.get(loan_application=reduced)
+        self.assertEqual((review.committee_member, review.comments), (self.member, 'Kikao cha Oktoba'))
+        self.assertEqual(AccountantReview.objects.filter(accountant__isnull=True).count(), 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.accountant).count(), 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.applicant).count(), 3)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        few = workflow.decide_as_committee(self.member, [(loan.pk, True, None) for loan in self.applications(2)])
+        many = workflow.decide_as_committee(self.member, [(loan.pk, True, None) for loan in self.applications(20)])
+        self.assertEqual(few.queries, many.queries)
+
+    def test_json_api(self):
+        loan, = self.applications(1)
+        self.client.force_login(self.member)
+        url = reverse('staff:committee_decisions')
+        response = self.client.post(url, json.dumps({'decisions': [{'application': loan.pk, 'decision': 'sure'}]}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, json.dumps({'decisions': [{'application': loan.pk, 'decision': 'approve'}]}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['approved'], [loan.pk])
+
+    def test_workspace_form(self):
+        first, second = self.applications(2)
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('staff:committee_workspace'))
+        self.assertEqual(len(response.context['decisions'].forms), 2)
+        response = self.client.post(reverse('staff:committee_decisions'), {
+            'form-TOTAL_FORMS': '2', 'form-INITIAL_FORMS': '2',
+            'form-0-application': first.pk, 'form-0-decision': 'reject',
+            'form-1-application': second.pk, 'form-1-decision': '',
+        })
+        self.assertRedirects(response, reverse('staff:committee_workspace'))
+        self.assertEqual(LoanApplication.objects.get(pk=first.pk).status, 'rejected')
+        self.assertEqual(LoanApplication.objects.get(pk=second.pk).status, 'loan_officer_approved')
+
+
+class LoanQuoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type(update=True)
+        cls.member = User.objects.create(username='member')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # The registry may hold the rolled-back terms
+        loan_types.invalidate()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.member)
+
+    def quotes(self, **params):
+        return self.client.get(reverse('loans:loan_quotes'), params)
+
+    def test_saved_application_is_priced_by_the_quote_engine(self):
+        loan = create_application(self.member, self.loan_type, amount=Decimal('120000'), period=6)
+        quote = compute_quote('elimu', Decimal('12'), Decimal('120000'), 6)
+        self.assertEqual(quote.total_interest, Decimal('7200'))
+        self.assertEqual(loan.monthly_repayment, quote.monthly_repayment)
+        self.assertEqual(loan.total_amount, Decimal('127200'))
+
+    def test_quotes_read_rates_like_the_repayment_schedule(self):
+        # Wanawake rates are stored per month; any stored rate is honoured, not a fixed 1%
+        for name, rate in [('wanawake', Decimal('2')), ('elimu', Decimal('12'))]:
+            quote = compute_quote(name, rate, Decimal('100000'), 6)
+            schedule = flat_schedule(Decimal('100000'), monthly_rate(name, rate), 6, date(2026, 1, 31))
+            self.assertEqual(quote.total_interest, schedule.total_interest)
+        self.assertEqual(compute_quote('wanawake', Decimal('2'), Decimal('100000'), 6).total_interest, Decimal('12000'))
+
+    def test_many_scenarios_without_loan_type_queries(self):
+        self.quotes(loan_type='elimu', amount='1000', period='1')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.quotes(loan_type='elimu', amount=['120000', '2000000'], period=['6', '24'])
+        self.assertFalse([query for query in queries if 'loans_loantype' in query['sql']])
+        quotes = response.json()['quotes']
+        self.assertEqual(len(quotes), 4)
+        self.assertEqual(quotes[0]['monthly_repayment'], '21200.00')
+        self.assertEqual([quote['within_limits'] for quote in quotes], [True, False, False, False])
+
+    def test_invalid_scenarios(self):
+        self.assertEqual(self.quotes(amount='abc', period='6').status_code, 400)
+        self.assertEqual(self.quotes(amount='NaN', period='6').status_code, 400)
+        self.assertEqual(self.quotes(amount='1000', period='61').status_code, 400)
+        # Too many digits to quote (or store) would otherwise fail to round to cents
+        self.assertEqual(self.quotes(amount='1E40', period='6').status_code, 400)
+        self.assertEqual(self.quotes(amount='10000000000', period='6').status_code, 400)
+        self.assertEqual(self.quotes(amount='9999999999.99', period='6').status_code, 200)
+        self.assertEqual(self.quotes(loan_type='unknown', amount='1000', period='6').status_code, 400)
+        self.assertEqual(self.quotes(amount=['1000'] * 10, period=[str(n) for n in range(1, 8)]).status_code, 400)
+
+
+
+class AmortizationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type(interest_rate=Decimal('10'), update=True)
+        cls.member = User.objects.create(username='member')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        loan_types.invalidate()
+
+    def test_spread_rounds_to_cents_and_the_last_part_absorbs_the_rest(self):
+        self.assertEqual(_spread(Decimal('100'), 3), [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
+        self.assertEqual(_spread(Decimal('200'), 3), [Decimal('66.67'), Decimal('66.67'), Decimal('66.66')])
+
+    def test_flat_schedule_adds_up_exactly(self):
+        rate = monthly_rate('elimu', Decimal('10'))
+        schedule = flat_schedule(Decimal('100000'), rate, 7, date(2026, 1, 15))
+        self.assertEqual(len(schedule), 7)
+        self.assertEqual(schedule.total_principal, Decimal('100000'))
+        self.assertEqual(schedule.total_interest, Decimal('5833.33'))
+        self.assertEqual(schedule.total_amount, Decimal('105833.33'))
+        self.assertEqual(schedule.principal[:6], [Decimal('14285.71')] * 6)
+        self.assertEqual(schedule.principal[-1], Decimal('14285.74'))
+        self.assertTrue(all(value == value.quantize(Decimal('0.01')) for value in schedule.amounts))
+
+    def test_reducing_balance_schedule_adds_up_exactly(self):
+        rate = monthly_rate('elimu', Decimal('10'))
+        schedule = reducing_balance_schedule(Decimal('100000'), rate, 7, date(2026, 1, 15))
+        self.assertEqual(schedule.total_principal, Decimal('100000'))
+        self.assertEqual(schedule.total_amount, schedule.total_principal + schedule.total_interest)
+        self.assertEqual(schedule.balances()[-1], Decimal('0'))
+        # Level installments; only the last one differs, by the rounding it absorbs
+        self.assertEqual(len(set(schedule.amounts[:-1])), 1)
+        self.assertLess(abs(schedule.amounts[-1] - schedule.amounts[0]), Decimal('0.10'))
+        # Interest falls as the balance is paid down
+        self.assertEqual(schedule.interest, sorted(schedule.interest, reverse=True))
+        self.assertLess(schedule.total_interest, flat_schedule(Decimal('100000'), rate, 7, date(2026, 1, 15)).total_interest)
+
+    def test_zero_rate_reducing_balance_schedule(self):
+        schedule = reducing_balance_schedule(Decimal('1000'), Decimal('0'), 3, date(2026, 1, 15))
+        self.assertEqual(schedule.amounts, [Decimal('333.33'), Decimal('333.33'), Decimal('333.34')])
+        self.assertEqual(schedule.total_interest, Decimal('0'))
+
+    def test_add_months_clamps_to_the_end_of_shorter_months(self):
+        self.assertEqual(add_months(date(2026, 1, 31), 1), date(2026, 2, 28))
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        # Every due date is counted from the start, so the day does not drift
+        self.assertEqual(add_months(date(2026, 1, 31), 2), date(2026, 3, 31))
+        self.assertEqual(add_months(date(2026, 11, 30), 3), date(2027, 2, 28))
+        self.assertEqual(add_months(date(2026, 1, 15), 12), date(2027, 1, 15))
+
+    def test_monthly_rate(self):
+        # Wanawake rates are quoted per month, every other loan type's per year
+        self.assertEqual(monthly_rate('wanawake', Decimal('1')), Decimal('0.01'))
+        self.assertEqual(monthly_rate('elimu', Decimal('12')), Decimal('0.01'))
+        self.assertEqual(monthly_rate('elimu', 18.5), Decimal('0.185') / 12)
+
+    def test_regenerate_schedules_keeps_paid_installments(self):
+        loan = create_application(
+            self.member, self.loan_type, status='disbursed', amount=Decimal('120000'), period=6,
+            disbursement_date=timezone.now(),
+        )
+        persist_schedule(loan)
+        RepaymentSchedule.objects.filter(loan_application=loan, installment_number=1).update(is_paid=True)
+        RepaymentSchedule.objects.filter(loan_application=loan, installment_number=2).update(amount_paid=Decimal('50'))
+        kept = {
+            row.installment_number: row.amount
+            for row in RepaymentSchedule.objects.filter(loan_application=loan, installment_number__lte=2)
+        }
+
+        LoanType.objects.filter(pk=self.loan_type.pk).update(interest_rate=Decimal('20'))
+        self.assertEqual(regenerate_schedules(LoanApplication.objects.filter(pk=loan.pk), batch_size=1), 1)
+
+        rows = list(RepaymentSchedule.objects.filter(loan_application=loan).order_by('installment_number'))
+        self.assertEqual([row.installment_number for row in rows], [1, 2, 3, 4, 5, 6])
+        self.assertEqual({row.installment_number: row.amount for row in rows[:2]}, kept)
+        # 120000 / 6 principal plus 120000 * 20% / 12 interest a month
+        self.assertEqual([row.amount for row in rows[2:]], [Decimal('22000.00')] * 4)
+
+
+class MemberSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type(update=True)
+        cls.member = User.objects.create(username='member')
+        cls.guarantor = User.objects.create(username='guarantor')
+        cls.committee = User.objects.create(username='committee')
+        UserProfile.objects.create(user=cls.committee, user_type='committee_member', employee_id='C1')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        loan_types.invalidate()
+
+    def application(self, **fields):
+        return create_application(self.member, self.loan_type, amount=Decimal('120000'), period=6, **fields)
+
+    def totals(self, user=None):
+        summary = MemberFinancialSummary.objects.get(user=user or self.member)
+        return summary.total_borrowed, summary.monthly_deduction, summary.total_paid
+
+    def test_summary_is_built_on_first_read(self):
+        self.application(status='disbursed')
+        self.application(status='pending')
+        self.assertFalse(MemberFinancialSummary.objects.exists())
+        summary = get_member_summary(self.member)
+        self.assertEqual(summary.total_borrowed, Decimal('120000'))
+        self.assertEqual(summary.monthly_deduction, Decimal('21200'))
+
+    def test_status_changes_refresh_the_loan_totals(self):
+        get_member_summary(self.member)
+        loan = self.application(status='loan_officer_approved')
+        self.assertEqual(self.totals(), (Decimal('0'), Decimal('0'), Decimal('0')))
+
+        loan.status = 'committee_approved'
+        loan.final_approved_amount = Decimal('60000')
+        loan.save()
+        self.assertEqual(self.totals()[0], Decimal('60000'))
+
+        loan.status = 'rejected'
+        loan.save()
+        self.assertEqual(self.totals()[:2], (Decimal('0'), Decimal('0')))
+
+        loan.status = 'disbursed'
+        loan.save()
+        self.assertEqual(self.totals()[:2], (Decimal('60000'), Decimal('21200')))
+        loan.delete()
+        self.assertEqual(self.totals()[:2], (Decimal('0'), Decimal('0')))
+
+    def test_only_changes_to_the_summary_fields_refresh(self):
+        loan = LoanApplication.objects.get(pk=self.application(status='disbursed').pk)
+        with mock.patch('loans.summaries.refresh_loan_totals') as refresh:
+            loan.purpose = 'education'
+            loan.save()
+            refresh.assert_not_called()
+            loan.status = 'completed'
+            loan.save()
+            refresh.assert_called_once_with(self.member.pk)
+            # An instance loaded without a summary field cannot tell, so it refreshes
+            LoanApplication.objects.only('id', 'applicant', 'purpose').get(pk=loan.pk).save(update_fields=['purpose'])
+            self.assertEqual(refresh.call_count, 2)
+
+    def test_bulk_committee_decisions_refresh_the_loan_totals(self):
+        get_member_summary(self.member)
+        loans = [self.application(status='loan_officer_approved') for _ in range(2)]
+        workflow.decide_as_committee(self.committee, [(loans[0].pk, True, None), (loans[1].pk, False, None)])
+        self.assertEqual(self.totals()[:2], (Decimal('120000'), Decimal('21200')))
+
+    def test_payments_and_guarantor_requests(self):
+        get_member_summary(self.member)
+        get_member_summary(self.guarantor)
+        loan = self.application(status='disbursed')
+        payment = LoanPayment.objects.create(loan_application=loan, amount=Decimal('21200'))
+        LoanPayment.objects.create(loan_application=loan, amount=Decimal('800'))
+        self.assertEqual(self.totals()[2], Decimal('22000'))
+        payment.delete()
+        self.assertEqual(self.totals()[2], Decimal('800'))
+
+        GuarantorApproval.objects.create(loan_application=loan, guarantor=self.guarantor)
+        self.assertEqual(get_member_summary(self.guarantor).pending_guarantor_requests, 1)
+
+    def test_rebuild_matches_the_incremental_summary(self):
+        get_member_summary(self.member)
+        loan = self.application(status='disbursed')
+        self.application(status='rejected')
+        LoanPayment.objects.create(loan_application=loan, amount=Decimal('21200'))
+        incremental = self.totals()
+        self.assertEqual(rebuild_all_summaries(), 1)
+        self.assertEqual(self.totals(), incremental)
+
+
+class LoanTypeRegistryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type(update=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        loan_types.invalidate()
+
+    def test_lookups_are_dictionary_reads(self):
+        loan = create_application(User.objects.create(username='member'), self.loan_type)
+        loan = LoanApplication.objects.get(pk=loan.pk)
+        get_loan_type(self.loan_type.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_loan_type_by_name('elimu').interest_rate, Decimal('12'))
+            self.assertEqual(loan.registered_loan_type().name, 'elimu')
+            self.assertEqual(loan.loan_type.name, 'elimu')
+
+    def test_saving_a_loan_type_reloads_the_registry(self):
+        self.loan_type.interest_rate = Decimal('10')
+        self.loan_type.save()
+        self.assertEqual(get_loan_type_by_name('elimu').interest_rate, Decimal('10'))
+
+    def test_reloads_when_another_worker_publishes_a_version(self):
+        get_loan_type_by_name('elimu')
+        # Another worker's change: the row and the shared version move, this worker's copy does not
+        LoanType.objects.filter(pk=self.loan_type.pk).update(interest_rate=Decimal('9'))
+        with self.settings(LOAN_TYPE_REGISTRY_CHECK_INTERVAL=0):
+            self.assertEqual(get_loan_type_by_name('elimu').interest_rate, Decimal('12'))
+            cache.set(VERSION_KEY, 'another-worker', None)
+            self.assertEqual(get_loan_type_by_name('elimu').interest_rate, Decimal('9'))
+
+
+class SharedCacheTests(TestCase):
+    """Cached dashboard sections and workspaces, on a file-based cache like production's"""
+
+    @classmethod
+    def cache_backend(cls):
+        location = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, location, ignore_errors=True)
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_settings = override_settings(CACHES={'default': cls.cache_backend()})
+        cls.cache_settings.enable()
+        cls.addClassCleanup(cls.cache_settings.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.loan_type = create_loan_type()
+        cls.hr_officer = User.objects.create(username='hr')
+        UserProfile.objects.create(user=cls.hr_officer, user_type='hr_officer', employee_id='H1')
+        cls.committee = User.objects.create(username='committee')
+        UserProfile.objects.create(user=cls.committee, user_type='committee_member', employee_id='C1')
+        cls.applicant = User.objects.create(username='applicant')
+        cls.guarantor = User.objects.create(username='guarantor')
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, len(queries)
+
+    def test_workspace_is_served_from_cache_until_an_application_changes(self):
+        create_application(self.applicant, self.loan_type, status='guarantor_approved')
+        self.client.force_login(self.hr_officer)
+        url = reverse('staff:hr_workspace')
+        response, cold = self.count_queries(url)
+        response, warm = self.count_queries(url)
+        self.assertLess(warm, cold)
+        self.assertEqual(response.context['total_applications'], 1)
+
+        create_application(self.applicant, self.loan_type, status='guarantor_approved')
+        response = self.client.get(url)
+        self.assertEqual(response.context['total_applications'], 2)
+        self.assertEqual(len(response.context['pending_applications']), 2)
+
+    def test_member_section_follows_guarantor_requests(self):
+        loan = create_application(self.applicant, self.loan_type)
+        self.client.force_login(self.guarantor)
+        url = reverse('dashboard:index')
+        self.assertEqual(list(self.client.get(url).context['pending_guarantor_applications']), [])
+        GuarantorApproval.objects.create(loan_application=loan, guarantor=self.guarantor)
+        self.assertEqual(list(self.client.get(url).context['pending_guarantor_applications']), [loan])
+
+        workflow.respond_as_guarantor(loan, self.guarantor, approve=True)
+        self.assertEqual(list(self.client.get(url).context['pending_guarantor_applications']), [])
+
+    def test_bulk_committee_decisions_invalidate(self):
+        loans = [create_application(self.applicant, self.loan_type, status='loan_officer_approved') for _ in range(2)]
+        self.client.force_login(self.committee)
+        url = reverse('staff:committee_workspace')
+        self.assertEqual(self.client.get(url).context['pending_decisions'], 2)
+        workflow.decide_as_committee(self.committee, [(loan.pk, False, None) for loan in loans])
+        self.assertEqual(self.client.get(url).context['pending_decisions'], 0)
+
+    def test_entries_and_versions_are_shared_between_workers(self):
+        self.assertEqual(caching.cached('answer', [caching.LOANS], lambda: 42), 42)
+        # Another worker process has its own connection to the same backend
+        with mock.patch('loans.caching.cache', caches.create_connection('default')):
+            self.assertEqual(caching.cached('answer', [caching.LOANS], mock.Mock(side_effect=AssertionError)), 42)
+            caching.invalidate(caching.LOANS)
+        self.assertEqual(caching.cached('answer', [caching.LOANS], lambda: 43), 43)
+
+
+class DatabaseCacheTests(SharedCacheTests):
+    """The same behaviour with the cache kept in an SQLite table"""
+
+    @classmethod
+    def cache_backend(cls):
+        return {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'test_cache'}
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('createcachetable', verbosity=0)
+        super().setUpTestData()
+
+
+class StartupTests(TestCase):
+
+    def test_startup_does_not_import_pdf_dependencies(self):
+        output = io.StringIO()
+        call_command('benchmark_startup', runs=1, stdout=output)
+        self.assertIn('django.setup()', output.getvalue())
+        self.assertNotIn('Imported at startup', output.getvalue())
+
+    def test_application_pdf_is_rendered_on_first_use(self):
+        loan_type = create_loan_type()
+        loan = create_application(User.objects.create(username='member'), loan_type)
+        output = io.BytesIO()
+        pdf.render_application_pdf(loan, output)
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+    def test_cached_pdfs_are_not_publicly_served(self):
+        media_root = Path(settings.MEDIA_ROOT).resolve()
+        self.assertNotIn(media_root, [pdf.pdf_cache_dir().resolve(), *pdf.pdf_cache_dir().resolve().parents])
+
+
+class PdfCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        loan_type = create_loan_type()
+        cls.member = User.objects.create(username='member')
+        cls.loan = create_application(cls.member, loan_type)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(LOAN_PDF_CACHE_DIR=Path(directory), LOAN_PDF_BACKGROUND_RENDERING=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        render = mock.patch(
+            'loans.pdf.render_application_pdf',
+            side_effect=lambda loan, output: output.write(f'%PDF {loan.updated_at.isoformat()}'.encode()),
+        )
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+    def version(self, minutes):
+        loan = LoanApplication.objects.get(pk=self.loan.pk)
+        loan.updated_at += timedelta(minutes=minutes)
+        return loan
+
+    def test_a_late_stale_render_keeps_the_current_pdf(self):
+        current = f'%PDF {self.loan.updated_at.isoformat()}'.encode()
+        download = pdf.get_application_pdf(self.loan)
+        # The background worker finishes rendering an older version in between
+        pdf.get_application_pdf(self.version(-1)).close()
+        with download:
+            self.assertEqual(download.read(), current)
+        self.assertTrue(pdf.cached_pdf_path(self.loan).exists())
+
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('loans:export_pdf', args=[self.loan.pk]))
+        self.assertEqual(b''.join(response.streaming_content), current)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_a_download_survives_a_newer_render_discarding_its_file(self):
+        pdf.get_application_pdf(self.loan).close()
+        stale = pdf.get_application_pdf(self.version(-1))
+        download = pdf.get_application_pdf(self.loan)
+        pdf.get_application_pdf(self.version(1)).close()
+        self.assertFalse(pdf.cached_pdf_path(self.loan).exists())
+        self.assertFalse(pdf.cached_pdf_path(self.version(-1)).exists())
+        with download, stale:
+            self.assertEqual(download.read(), f'%PDF {self.loan.updated_at.isoformat()}'.encode())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The database profile tunes SQLite')
+class DatabaseProfileTests(TransactionTestCase):
+
+    def pragma(self, name):
+        connection.ensure_connection()
+        return connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_connections_are_tuned(self):
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+
+    def test_only_write_transactions_take_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                User.objects.count()
+        self.assertEqual(queries[0]['sql'], 'BEGIN')
+        with CaptureQueriesContext(connection) as queries:
+            with immediate_atomic():
+                User.objects.count()
+            with transaction.atomic():
+                User.objects.count()
+        self.assertEqual([query['sql'] for query in queries if query['sql'].startswith('BEGIN')], ['BEGIN IMMEDIATE', 'BEGIN'])
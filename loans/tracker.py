@@ -0,0 +1,92 @@
+"""
+Query side of the application tracker.
+
+The tracker page loads its rows from a JSON endpoint one keyset page at a
+time. Filters map onto indexed columns (date ranges become created_at bounds
+rather than a DATE() comparison) and every sort pages on (column, id), so a
+page costs the same however large the table grows. Rows are narrow: the
+applicant and loan type are joined in and only the columns shown are loaded.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from staff.pagination import keyset_page
+from .models import LoanApplication
+
+TRACKER_PAGE_SIZE = 25
+
+# Sort key -> (column, descending); each column is indexed together with id
+TRACKER_SORTS = {
+    'newest': ('created_at', True),
+    'oldest': ('created_at', False),
+    'amount_desc': ('amount', True),
+    'amount_asc': ('amount', False),
+}
+DEFAULT_SORT = 'newest'
+
+TRACKER_FIELDS = [
+    'id', 'purpose', 'amount', 'period', 'status', 'department', 'created_at',
+    'applicant__first_name', 'applicant__last_name', 'applicant__username',
+    'loan_type__name',
+]
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _start_of_day(value):
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def tracker_queryset(user, user_type, params):
+    """Applications visible to `user`, narrowed by the tracker's filter parameters"""
+    queryset = LoanApplication.objects.select_related('applicant', 'loan_type').only(*TRACKER_FIELDS)
+    if user_type == 'member':
+        queryset = queryset.filter(applicant=user)
+
+    filters = {}
+    if params.get('status'):
+        filters['status'] = params['status']
+    if params.get('loan_type'):
+        filters['loan_type__name'] = params['loan_type']
+    if params.get('department'):
+        filters['department'] = params['department'].strip()
+    date_from = _parse_date(params.get('date_from'))
+    date_to = _parse_date(params.get('date_to'))
+    if date_from:
+        filters['created_at__gte'] = _start_of_day(date_from)
+    if date_to:
+        filters['created_at__lt'] = _start_of_day(date_to + timedelta(days=1))
+    return queryset.filter(**filters)
+
+
+def tracker_page(queryset, params, per_page=None):
+    field, descending = TRACKER_SORTS.get(params.get('sort'), TRACKER_SORTS[DEFAULT_SORT])
+    return keyset_page(
+        queryset, params.get('cursor'), per_page=per_page or TRACKER_PAGE_SIZE,
+        field=field, descending=descending,
+    )
+
+
+def serialize_application(application):
+    return {
+        'id': application.id,
+        'applicant': application.applicant.get_full_name() or application.applicant.username,
+        'loan_type': application.loan_type.get_name_display(),
+        'purpose': application.get_purpose_display(),
+        'amount': str(application.amount),
+        'period': application.period,
+        'status': application.status,
+        'status_display': application.get_status_display(),
+        'department': application.department,
+        'created_at': application.created_at.isoformat(),
+        'url': reverse('loans:application_detail', args=[application.id]),
+    }
@@ -20,5 +20,7 @@ urlpatterns = [
     path('guarantor-requests/', views.guarantor_requests, name='guarantor_requests'),
     path('guarantor-approve-reject/<int:application_id>/', views.guarantor_approve_reject, name='guarantor_approve_reject'),
     path('api/search-members/', views.search_members, name='search_members'),
+    path('api/applications/', views.application_tracker_api, name='application_tracker_api'),
+    path('api/quotes/', views.loan_quotes, name='loan_quotes'),
 ]
 
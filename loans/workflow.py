@@ -0,0 +1,419 @@
+"""
+The loan application workflow as a state machine.
+
+Each stage moves an application from one status to the next. A transition
+re-reads the application and re-checks its status inside a transaction opened
+with tblsaccos.database.immediate_atomic(). On SQLite that transaction holds
+the database write lock from its first statement, so transitions run one at a
+time: when two officers act on the same application at once, the second sees
+the first's status and gets a TransitionError instead of overwriting it.
+(The select_for_update calls lock the row on backends that have row locks;
+SQLite ignores them.) The reviewer's
+decision is written onto the stage's pending review row, the application is
+saved with update_fields, and the side effects are written in bulk: the next
+stage's placeholder review row in one insert and every notification (the
+applicant's and the next role's) in another.
+
+Every transition takes a small fixed number of queries whatever the number
+of staff being notified; the count is logged and returned on the result.
+`decide_as_committee` applies a whole committee sitting the same way, with
+bulk updates and inserts across every application decided.
+"""
+
+import logging
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from accounts.counters import PAYMENT_ROLES
+from accounts.notifications import notify_batch, role_members
+from tblsaccos.database import immediate_atomic
+from . import caching, pdf, summaries
+from .amortization import persist_schedule
+from .models import (
+    AccountantReview, CommitteeReview, GuarantorApproval, HRReview, LoanApplication, LoanOfficerReview,
+)
+
+logger = logging.getLogger(__name__)
+
+# Status -> the application field recording when it was reached
+STATUS_DATES = {
+    'guarantor_approved': 'guarantor_approval_date',
+    'hr_reviewed': 'hr_review_date',
+    'loan_officer_approved': 'loan_officer_approval_date',
+    'committee_approved': 'committee_approval_date',
+    'payment_processing': 'payment_processing_date',
+    'disbursed': 'disbursement_date',
+}
+
+# Status -> placeholder review row awaiting the stage that follows it
+NEXT_REVIEWS = {
+    'guarantor_approved': (HRReview, {'monthly_salary': 0, 'employer_debts': 0, 'financial_debts': 0}),
+    'hr_reviewed': (LoanOfficerReview, {}),
+    'loan_officer_approved': (CommitteeReview, {}),
+    'committee_approved': (AccountantReview, {}),
+}
+
+# Status -> (notification type, title, message) sent to the applicant
+APPLICANT_NOTICES = {
+    'guarantor_approved': (
+        'guarantor_response', 'Guarantor Approval Complete',
+        'All guarantors have approved your loan application #{id}. Your application is now being reviewed by HR.',
+    ),
+    'hr_reviewed': (
+        'loan_status_change', 'Loan Status: HR Reviewed',
+        'Mkopo wako umepitia mapitio ya HR. Uko kwenye hatua ya mkopo.',
+    ),
+    'loan_officer_approved': (
+        'loan_status_change', 'Loan Status: Loan Officer Approved',
+        'Mkopo wako umepitishwa na afisa wa mkopo. Uko kwenye hatua ya kamati.',
+    ),
+    'committee_approved': (
+        'loan_status_change', 'Loan Status: Committee Approved',
+        'Mkopo wako umepitishwa na kamati. Malipo yanashughulikiwa.',
+    ),
+    'payment_processing': (
+        'loan_status_change', 'Loan Status: Payment Processing',
+        'Malipo ya mkopo wako yanashughulikiwa.',
+    ),
+    'disbursed': (
+        'loan_status_change', 'Loan Status: Disbursed',
+        'Mkopo wako umewasilishwa kikamilifu!',
+    ),
+}
+
+# Status -> (roles, notification type, title, message) for the staff who act next
+ROLE_NOTICES = {
+    'guarantor_approved': (
+        'hr_officer', 'hr_review_pending', 'HR Review Pending',
+        'Maombi ya mkopo #{id} yamepitishwa na wadhamini na yanasubiri mapitio ya HR.',
+    ),
+    'hr_reviewed': (
+        'loan_officer', 'loan_officer_review_pending', 'Loan Officer Review Pending',
+        'Maombi ya mkopo #{id} yanasubiri mapitio ya afisa wa mkopo.',
+    ),
+    'loan_officer_approved': (
+        'committee_member', 'committee_review_pending', 'Committee Review Pending',
+        'Maombi ya mkopo #{id} yanasubiri uamuzi wa kamati.',
+    ),
+    'committee_approved': (
+        PAYMENT_ROLES, 'general', 'Loan Payment Pending',
+        'Mkopo #{id} umepitishwa na kamati na unasubiri malipo.',
+    ),
+}
+
+# Who rejected -> (notification type, message) sent to the applicant
+REJECTION_NOTICES = {
+    'guarantors': ('guarantor_response', 'Your loan application #{id} was rejected by one or more guarantors.'),
+    'loan_officer': ('loan_rejected', 'Your loan application #{id} was rejected by the loan officer.'),
+    'committee': ('loan_rejected', 'Your loan application #{id} was rejected by the committee.'),
+}
+
+
+class TransitionError(Exception):
+    """The application is not in a status the transition can start from"""
+
+
+class TransitionResult:
+    """Outcome of a transition: the locked application, its new status and the queries it took"""
+
+    def __init__(self, loan, source, queries=0):
+        self.loan = loan
+        self.source = source
+        self.queries = queries
+
+    @property
+    def status(self):
+        return self.loan.status
+
+    @property
+    def changed(self):
+        return self.loan.status != self.source
+
+
+@contextmanager
+def _count_queries():
+    executed = []
+
+    def counter(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        yield executed
+
+
+def _lock(loan, *sources):
+    """Re-read the application inside the transition's transaction and check it may still move"""
+    locked = LoanApplication.objects.select_for_update(of=('self',)).select_related('loan_type').get(
+        pk=getattr(loan, 'pk', loan)
+    )
+    if locked.status not in sources:
+        raise TransitionError(f'Loan application #{locked.pk} is {locked.get_status_display()}.')
+    return locked
+
+
+def _notice(loan, notification_type, title, message, **values):
+    return {
+        'notification_type': notification_type,
+        'title': title,
+        'message': message.format(id=loan.pk, **values),
+        'related_object_id': loan.pk,
+        'related_object_type': 'LoanApplication',
+    }
+
+
+def _record_review(model, loan, pending, **fields):
+    """Fill in the stage's pending placeholder row, or add a row if there is none"""
+    if not model.objects.filter(loan_application=loan, **pending).update(**fields):
+        model.objects.bulk_create([model(loan_application=loan, **fields)])
+
+
+def _move(loan, target, notices, now, update_fields=()):
+    """Save the application in its new status and write the side effects in bulk"""
+    fields = ['updated_at', *update_fields]
+    if target != loan.status:
+        loan.status = target
+        fields.append('status')
+        if target in STATUS_DATES:
+            setattr(loan, STATUS_DATES[target], now)
+            fields.append(STATUS_DATES[target])
+    # Saved even without a status change so the application's PDF version moves on
+    loan.save(update_fields=fields)
+
+    if target in NEXT_REVIEWS:
+        model, defaults = NEXT_REVIEWS[target]
+        model.objects.bulk_create([model(loan_application=loan, **defaults)])
+    if target in APPLICANT_NOTICES:
+        notices.append(([loan.applicant_id], _notice(loan, *APPLICANT_NOTICES[target])))
+    if target in ROLE_NOTICES:
+        roles, *notice = ROLE_NOTICES[target]
+        notices.append((role_members(roles).values_list('pk', flat=True), _notice(loan, *notice)))
+    notify_batch(notices)
+
+
+def _reject(loan, rejected_by, now):
+    notification_type, message = REJECTION_NOTICES[rejected_by]
+    notice = _notice(loan, notification_type, 'Loan Application Rejected', message)
+    _move(loan, 'rejected', [([loan.applicant_id], notice)], now)
+
+
+@contextmanager
+def _transition(name, loan, *sources):
+    """Run a transition's writes atomically on the locked application, counting its queries"""
+    with _count_queries() as executed:
+        with immediate_atomic():
+            locked = _lock(loan, *sources)
+            result = TransitionResult(locked, locked.status)
+            yield result
+        result.queries = len(executed)
+    logger.info(
+        'Loan application #%s: %s %s -> %s in %d queries',
+        locked.pk, name, result.source, result.status, result.queries,
+    )
+
+
+def respond_as_guarantor(loan, guarantor, approve, comments='', declaration=None):
+    """Record a guarantor's answer; the application moves on once every guarantor has answered"""
+    now = timezone.now()
+    with _transition('guarantor_response', loan, 'pending') as result:
+        loan = result.loan
+        fields = {'is_approved': approve, 'comments': comments, 'approved_at': now}
+        if declaration is not None:
+            fields['guarantor_declaration'] = declaration
+        answered = GuarantorApproval.objects.filter(
+            loan_application=loan, guarantor=guarantor, approved_at__isnull=True
+        ).update(**fields)
+        if not answered:
+            raise TransitionError(f'There is no pending guarantor request on loan application #{loan.pk}.')
+        # update() skips the signals that keep the guarantor's summary and cached lists in step
+        summaries.adjust_guarantor_requests(guarantor.pk, -1)
+        caching.users_changed([guarantor.pk])
+
+        responses = loan.guarantor_approvals.aggregate(
+            waiting=Count('pk', filter=Q(approved_at__isnull=True)),
+            rejected=Count('pk', filter=Q(approved_at__isnull=False, is_approved=False)),
+        )
+        if responses['waiting']:
+            notice = _notice(
+                loan, 'guarantor_response', 'Guarantor Response Received',
+                'Guarantor {name} has {verb} your loan application #{id}. Waiting for other guarantors to respond.',
+                name=guarantor.get_full_name(), verb='approved' if approve else 'rejected',
+            )
+            _move(loan, loan.status, [([loan.applicant_id], notice)], now)
+        elif responses['rejected']:
+            _reject(loan, 'guarantors', now)
+        else:
+            _move(loan, 'guarantor_approved', [], now)
+    return result
+
+
+def complete_hr_review(loan, reviewer, monthly_salary, employer_debts, financial_debts,
+                       department_advice='', additional_comments=''):
+    """HR records the applicant's employment details; the application always moves on"""
+    now = timezone.now()
+    with _transition('hr_review', loan, 'guarantor_approved') as result:
+        _record_review(
+            HRReview, result.loan, {'reviewer__isnull': True},
+            reviewer=reviewer, monthly_salary=monthly_salary, employer_debts=employer_debts,
+            financial_debts=financial_debts, department_advice=department_advice,
+            additional_comments=additional_comments, reviewed_at=now,
+        )
+        _move(result.loan, 'hr_reviewed', [], now)
+    return result
+
+
+def _approved_amount(loan, amount):
+    # A reviewer may reduce the amount; an empty or unchanged amount keeps the current one
+    if amount and amount != loan.amount:
+        loan.final_approved_amount = amount
+        return ['final_approved_amount']
+    return []
+
+
+def review_as_loan_officer(loan, officer, approve, approved_amount=None, comments=''):
+    """The loan officer approves (possibly for a smaller amount) or rejects the application"""
+    now = timezone.now()
+    with _transition('loan_officer_review', loan, 'hr_reviewed') as result:
+        loan = result.loan
+        _record_review(
+            LoanOfficerReview, loan, {'is_approved__isnull': True},
+            officer=officer, is_approved=approve, approved_amount=approved_amount,
+            comments=comments, reviewed_at=now,
+        )
+        if approve:
+            _move(loan, 'loan_officer_approved', [], now, _approved_amount(loan, approved_amount))
+        else:
+            _reject(loan, 'loan_officer', now)
+    return result
+
+
+def review_as_committee(loan, member, approve, final_amount=None, comments=''):
+    """The committee's final decision on the application and its amount"""
+    now = timezone.now()
+    with _transition('committee_review', loan, 'loan_officer_approved') as result:
+        loan = result.loan
+        _record_review(
+            CommitteeReview, loan, {'is_approved__isnull': True},
+            committee_member=member, is_approved=approve, final_amount=final_amount,
+            comments=comments, reviewed_at=now,
+        )
+        if approve:
+            _move(loan, 'committee_approved', [], now, _approved_amount(loan, final_amount))
+        else:
+            _reject(loan, 'committee', now)
+    return result
+
+
+class BatchResult:
+    """Outcome of a batch of committee decisions"""
+
+    def __init__(self):
+        self.approved = []
+        self.rejected = []
+        # Applications no longer awaiting the committee, left untouched
+        self.skipped = []
+        self.queries = 0
+
+
+def decide_as_committee(member, decisions, comments=''):
+    """
+    Apply a committee sitting's decisions in one transaction. `decisions` is a
+    list of (application id, approve, final amount) entries; applications that
+    are not (or no longer) awaiting the committee are skipped.
+    """
+    now = timezone.now()
+    result = BatchResult()
+    entries = {loan_id: (approve, final_amount) for loan_id, approve, final_amount in decisions}
+    with _count_queries() as executed:
+        with immediate_atomic():
+            loans = list(
+                LoanApplication.objects.select_for_update(of=('self',)).select_related('loan_type')
+                .filter(pk__in=entries, status='loan_officer_approved').order_by('pk')
+            )
+            result.skipped = sorted(set(entries) - {loan.pk for loan in loans})
+            if loans:
+                _apply_committee_decisions(member, loans, entries, comments, now, result)
+        result.queries = len(executed)
+    logger.info(
+        'Committee batch: %d approved, %d rejected, %d skipped in %d queries',
+        len(result.approved), len(result.rejected), len(result.skipped), result.queries,
+    )
+    return result
+
+
+def _apply_committee_decisions(member, loans, entries, comments, now, result):
+    placeholders = {}
+    for review in CommitteeReview.objects.filter(loan_application__in=loans, is_approved__isnull=True).order_by('pk'):
+        placeholders.setdefault(review.loan_application_id, review)
+    payment_roles = ROLE_NOTICES['committee_approved'][0]
+    payment_staff = None
+    reviews, new_reviews, accountant_reviews, notices = [], [], [], []
+
+    for loan in loans:
+        approve, final_amount = entries[loan.pk]
+        review = placeholders.get(loan.pk) or CommitteeReview(loan_application=loan)
+        review.committee_member = member
+        review.is_approved = approve
+        review.final_amount = final_amount
+        review.comments = comments
+        review.reviewed_at = now
+        (reviews if review.pk else new_reviews).append(review)
+
+        loan.updated_at = now
+        if approve:
+            loan.status = 'committee_approved'
+            loan.committee_approval_date = now
+            _approved_amount(loan, final_amount)
+            model, defaults = NEXT_REVIEWS['committee_approved']
+            accountant_reviews.append(model(loan_application=loan, **defaults))
+            if payment_staff is None:
+                payment_staff = list(role_members(payment_roles).values_list('pk', flat=True))
+            notices.append(([loan.applicant_id], _notice(loan, *APPLICANT_NOTICES['committee_approved'])))
+            notices.append((payment_staff, _notice(loan, *ROLE_NOTICES['committee_approved'][1:])))
+            result.approved.append(loan.pk)
+        else:
+            loan.status = 'rejected'
+            notification_type, message = REJECTION_NOTICES['committee']
+            notices.append(([loan.applicant_id], _notice(loan, notification_type, 'Loan Application Rejected', message)))
+            result.rejected.append(loan.pk)
+
+    # Bulk writes skip the model signals, so the summaries, caches and PDFs are refreshed here
+    LoanApplication.objects.bulk_update(
+        loans, ['status', 'committee_approval_date', 'final_approved_amount', 'updated_at']
+    )
+    CommitteeReview.objects.bulk_update(
+        reviews, ['committee_member', 'is_approved', 'final_amount', 'comments', 'reviewed_at']
+    )
+    CommitteeReview.objects.bulk_create(new_reviews)
+    AccountantReview.objects.bulk_create(accountant_reviews)
+    summaries.refresh_loan_totals_many({loan.applicant_id for loan in loans})
+    caching.loans_changed({loan.applicant_id for loan in loans})
+    notify_batch(notices)
+    for loan in loans:
+        transaction.on_commit(partial(pdf.schedule_pdf_render, loan.pk))
+
+
+def process_payment(loan, accountant, payment_method, bank_details='', processing_notes=''):
+    """The accountant starts paying out a committee-approved loan"""
+    now = timezone.now()
+    with _transition('payment_processing', loan, 'committee_approved') as result:
+        _record_review(
+            AccountantReview, result.loan, {'accountant__isnull': True},
+            accountant=accountant, payment_method=payment_method, bank_details=bank_details,
+            processing_notes=processing_notes, processed_at=now,
+        )
+        _move(result.loan, 'payment_processing', [], now)
+    return result
+
+
+def disburse(loan, method=None):
+    """Mark the loan as paid out and generate its repayment schedule"""
+    now = timezone.now()
+    with _transition('disbursement', loan, 'payment_processing') as result:
+        _move(result.loan, 'disbursed', [], now)
+        persist_schedule(result.loan, method=method)
+    return result
@@ -0,0 +1,77 @@
+"""
+Keyset (cursor) pagination for the staff workspaces.
+
+Workspace queues are ordered newest first on (created_at, id); other lists
+may page on any (field, id) pair in either direction. Instead of an OFFSET,
+each page continues strictly after the last row of the previous page, so
+fetching any page costs the same however deep into the list it is.
+"""
+
+import base64
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+WORKSPACE_PAGE_SIZE = 25
+
+
+class KeysetPage:
+    """One page of rows plus the cursor needed to fetch the next page"""
+
+    def __init__(self, object_list, next_cursor, is_first_page):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first_page = is_first_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def encode_cursor(obj, field='created_at'):
+    value = getattr(obj, field)
+    value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return base64.urlsafe_b64encode(f"{value}|{obj.pk}".encode()).decode()
+
+
+def decode_cursor(cursor, model_field=None):
+    """
+    Return (value, id) for a cursor, or None if it is missing or malformed.
+    The value is parsed with `model_field`, a datetime by default.
+    """
+    if not cursor:
+        return None
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        if model_field is None:
+            return datetime.fromisoformat(value), int(pk)
+        return model_field.to_python(value), int(pk)
+    except (ValueError, UnicodeError, ValidationError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, per_page=WORKSPACE_PAGE_SIZE, field='created_at', descending=True):
+    """Fetch the page of `queryset` that follows `cursor`, ordered on (field, id)"""
+    direction, lookup = ('-', 'lt') if descending else ('', 'gt')
+    queryset = queryset.order_by(f'{direction}{field}', f'{direction}id')
+    position = decode_cursor(cursor, queryset.model._meta.get_field(field))
+    if position:
+        value, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk})
+        )
+
+    # One extra row tells us whether another page follows
+    rows = list(queryset[:per_page + 1])
+    next_cursor = encode_cursor(rows[per_page - 1], field) if len(rows) > per_page else None
+    return KeysetPage(rows[:per_page], next_cursor, position is None)
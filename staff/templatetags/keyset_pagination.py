@@ -0,0 +1,14 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor_param, cursor=None):
+    """The current URL with only `cursor_param` replaced (or dropped when `cursor` is empty)"""
+    request = context['request']
+    query = request.GET.copy()
+    query.pop(cursor_param, None)
+    if cursor:
+        query[cursor_param] = cursor
+    return f'{request.path}?{query.urlencode()}' if query else request.path
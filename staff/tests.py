@@ -1,3 +1,86 @@
-from django.test import TestCase
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+
+from loans.models import LoanApplication
+from loans.tests import create_loan_type
+
+from .pagination import KeysetPage, encode_cursor, keyset_page
+
+
+class KeysetPageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        loan_type = create_loan_type('chap_chap')
+        applicant = User.objects.create(username='applicant')
+        # Seven applications sharing three timestamps and three amounts
+        for index in range(7):
+            loan = LoanApplication.objects.create(
+                applicant=applicant, loan_type=loan_type, purpose='business',
+                amount=Decimal(1000 * (1 + index % 3)), period=12, phone_number='0700000000', department='Finance',
+                bank_name='NMB', account_number='0001', savings_value=Decimal('0'), shares_value=Decimal('0'),
+            )
+            LoanApplication.objects.filter(pk=loan.pk).update(
+                created_at=datetime(2026, 1, 1 + index // 3, tzinfo=dt_timezone.utc)
+            )
+
+    def walk(self, per_page, **options):
+        """Ids of every page in order, following each page's cursor"""
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(LoanApplication.objects.all(), cursor, per_page=per_page, **options)
+            pages.append([loan.pk for loan in page])
+            self.assertEqual(page.is_first_page, cursor is None)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_tied_timestamps_are_neither_skipped_nor_repeated(self):
+        expected = list(LoanApplication.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        for per_page in (1, 2, 3, 7):
+            pages = self.walk(per_page)
+            self.assertEqual(sum(pages, []), expected)
+            self.assertTrue(all(len(page) == per_page for page in pages[:-1]))
+
+    def test_ascending_pages_on_another_field(self):
+        expected = list(LoanApplication.objects.order_by('amount', 'id').values_list('pk', flat=True))
+        self.assertEqual(sum(self.walk(2, field='amount', descending=False), []), expected)
+
+    def test_last_full_page_has_no_next_cursor(self):
+        self.assertEqual(len(self.walk(7)), 1)
+        last = LoanApplication.objects.order_by('created_at', 'id').first()
+        page = keyset_page(LoanApplication.objects.all(), encode_cursor(last), per_page=7)
+        self.assertEqual((len(page), page.has_next), (0, False))
+
+    def test_malformed_cursors_start_from_the_first_page(self):
+        first = keyset_page(LoanApplication.objects.all(), per_page=2)
+        for cursor in ('not-a-cursor', 'bm90fGE=', encode_cursor(first.object_list[0], 'amount')):
+            page = keyset_page(LoanApplication.objects.all(), cursor, per_page=2)
+            self.assertTrue(page.is_first_page)
+            self.assertEqual(page.object_list, first.object_list)
+
+
+class KeysetPaginationTemplateTests(TestCase):
+
+    def render(self, url, page, **context):
+        request = RequestFactory().get(url)
+        return render_to_string('staff/_keyset_pagination.html', {'request': request, 'page': page, **context})
+
+    def test_links_keep_the_other_query_parameters(self):
+        html = self.render(
+            '/loans/guarantor-requests/?pending_cursor=abc&completed_cursor=xyz&q=juma',
+            KeysetPage(['row'], 'next=', is_first_page=False), cursor_param='pending_cursor',
+        )
+        self.assertIn('href="/loans/guarantor-requests/?completed_cursor=xyz&amp;q=juma"', html)
+        self.assertIn(
+            'href="/loans/guarantor-requests/?completed_cursor=xyz&amp;q=juma&amp;pending_cursor=next%3D"', html
+        )
+
+    def test_first_page_link_without_other_parameters(self):
+        html = self.render('/staff/hr/?cursor=abc', KeysetPage(['row'], None, is_first_page=False))
+        self.assertIn('href="/staff/hr/"', html)
+        self.assertNotIn('Next', html)
@@ -6,16 +6,20 @@ app_name = 'staff'
 urlpatterns = [
     # HR Officer URLs
     path('hr/workspace/', views.hr_workspace, name='hr_workspace'),
+    path('hr/payroll-deductions/', views.payroll_deductions, name='payroll_deductions'),
     
     # Loan Officer URLs
     path('loans/workspace/', views.loan_workspace, name='loan_workspace'),
     
     # Committee Member URLs
     path('committee/workspace/', views.committee_workspace, name='committee_workspace'),
+    path('committee/decisions/', views.committee_decisions, name='committee_decisions'),
     
     # Accountant URLs
     path('accountant/workspace/', views.accountant_workspace, name='accountant_workspace'),
     path('accountant/payment-history/', views.payment_history, name='payment_history'),
+    path('accountant/payroll-import/', views.payroll_import, name='payroll_import'),
+    path('portfolio-export/', views.portfolio_export, name='portfolio_export'),
     
     # Admin URLs
     path('admin/panel/', views.admin_panel, name='admin_panel'),
@@ -1,10 +1,53 @@
+import io
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Count, Sum
-from loans.models import LoanApplication
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from loans.exports import portfolio_queryset, stream_portfolio_csv
+from loans import caching, workflow
+from loans.forms import CommitteeDecisionForm, CommitteeDecisionFormSet, PayrollImportForm
+from loans.payroll import PayrollImportError, import_payroll_deductions, parse_month, stream_deductions_csv
+from loans.models import AccountantReview, LoanApplication
 from accounts.models import User, UserProfile
+from .pagination import keyset_page
+
+# Columns rendered by the workspace tables
+WORKSPACE_FIELDS = [
+    'id', 'amount', 'final_approved_amount', 'period', 'status', 'department', 'created_at',
+    'hr_review_date', 'loan_officer_approval_date', 'committee_approval_date',
+    'payment_processing_date', 'disbursement_date',
+    'applicant__first_name', 'applicant__last_name', 'applicant__profile__profile_picture',
+    'loan_type__name',
+]
+
+def workspace_queryset(**filters):
+    """Narrow projection of the applications shown in a staff workspace"""
+    return LoanApplication.objects.filter(**filters).select_related(
+        'applicant', 'applicant__profile', 'loan_type'
+    ).only(*WORKSPACE_FIELDS)
+
+def workspace_totals(amount_field, **filters):
+    """Count and total amount of a workspace queue in a single query"""
+    totals = LoanApplication.objects.filter(**filters).aggregate(
+        total_applications=Count('id'),
+        total_amount=Sum(amount_field),
+    )
+    totals['total_amount'] = totals['total_amount'] or 0
+    return totals
+
+def workspace_queue(cursor, amount_field, **filters):
+    """Totals and one page of a workspace queue; the first page is cached until an application changes"""
+    def compute():
+        return workspace_totals(amount_field, **filters), keyset_page(workspace_queryset(**filters), cursor)
+    if cursor:
+        return compute()
+    name = 'workspace:' + ':'.join(f'{field}={value}' for field, value in sorted(filters.items()))
+    return caching.cached(name, [caching.LOANS], compute)
 
 def is_hr_officer(user):
     return user.is_authenticated and hasattr(user, 'profile') and user.profile.user_type == 'hr_officer'
@@ -23,13 +66,12 @@ def is_admin(user):
 @user_passes_test(is_hr_officer)
 def hr_workspace(request):
     # Get applications waiting for HR review
-    pending_applications = LoanApplication.objects.filter(status='guarantor_approved')
-    total_amount = sum(app.amount for app in pending_applications)
+    totals, pending_applications = workspace_queue(request.GET.get('cursor'), 'amount', status='guarantor_approved')
     
     context = {
         'pending_applications': pending_applications,
-        'total_amount': total_amount,
-        'total_applications': pending_applications.count(),
+        'total_amount': totals['total_amount'],
+        'total_applications': totals['total_applications'],
     }
     return render(request, 'staff/hr_workspace.html', context)
 
@@ -38,13 +80,12 @@ def hr_workspace(request):
 @user_passes_test(is_loan_officer)
 def loan_workspace(request):
     # Get applications waiting for loan officer review
-    pending_applications = LoanApplication.objects.filter(status='hr_reviewed')
-    total_amount = sum(app.amount for app in pending_applications)
+    totals, pending_applications = workspace_queue(request.GET.get('cursor'), 'amount', status='hr_reviewed')
     
     context = {
         'pending_applications': pending_applications,
-        'total_amount': total_amount,
-        'total_applications': pending_applications.count(),
+        'total_amount': totals['total_amount'],
+        'total_applications': totals['total_applications'],
     }
     return render(request, 'staff/loan_workspace.html', context)
 
@@ -53,16 +94,72 @@ def loan_workspace(request):
 @user_passes_test(is_committee_member)
 def committee_workspace(request):
     # Get applications waiting for committee review
-    pending_applications = LoanApplication.objects.filter(status='loan_officer_approved')
-    total_amount = sum(app.amount for app in pending_applications)
+    totals, pending_applications = workspace_queue(request.GET.get('cursor'), 'amount', status='loan_officer_approved')
+    # One decision row per application on the page, submitted together
+    decisions = CommitteeDecisionFormSet(initial=[{'application': application.pk} for application in pending_applications])
     
     context = {
         'pending_applications': pending_applications,
-        'total_amount': total_amount,
-        'pending_decisions': pending_applications.count(),
+        'decisions': decisions,
+        'decision_rows': zip(pending_applications, decisions.forms),
+        'total_amount': totals['total_amount'],
+        'pending_decisions': totals['total_applications'],
     }
     return render(request, 'staff/committee_workspace.html', context)
 
+def _committee_decisions(forms):
+    return [
+        (form.cleaned_data['application'], form.cleaned_data['decision'] == 'approve', form.cleaned_data['final_amount'])
+        for form in forms if form.cleaned_data['decision']
+    ]
+
+def _batch_response(result):
+    return {
+        'approved': result.approved,
+        'rejected': result.rejected,
+        'skipped': result.skipped,
+        'queries': result.queries,
+    }
+
+@login_required
+@user_passes_test(is_committee_member)
+@require_POST
+def committee_decisions(request):
+    """Apply a committee sitting's decisions at once, from the workspace form or as JSON"""
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body)
+            entries = payload['decisions']
+            comments = str(payload.get('comments', ''))
+        except (ValueError, KeyError, TypeError):
+            entries = None
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            return JsonResponse({'error': 'Expected {"decisions": [{"application", "decision", "final_amount"}, ...]}'}, status=400)
+        forms = [CommitteeDecisionForm(entry) for entry in entries]
+        errors = {index: form.errors for index, form in enumerate(forms) if not form.is_valid()}
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+        result = workflow.decide_as_committee(request.user, _committee_decisions(forms), comments)
+        return JsonResponse(_batch_response(result))
+
+    formset = CommitteeDecisionFormSet(request.POST)
+    if not formset.is_valid():
+        messages.error(request, 'Maamuzi hayakuhifadhiwa: tafadhali hakiki kiasi ulichoweka.')
+        return redirect('staff:committee_workspace')
+    decisions = _committee_decisions(formset.forms)
+    if not decisions:
+        messages.info(request, 'Hakuna uamuzi uliochaguliwa.')
+        return redirect('staff:committee_workspace')
+
+    result = workflow.decide_as_committee(request.user, decisions, request.POST.get('comments', ''))
+    messages.success(
+        request,
+        f'Maamuzi ya kamati yamehifadhiwa: {len(result.approved)} yamekubaliwa, {len(result.rejected)} yamekataliwa.'
+    )
+    if result.skipped:
+        messages.warning(request, f'Maombi {len(result.skipped)} hayakuwa yakisubiri uamuzi wa kamati tena.')
+    return redirect('staff:committee_workspace')
+
 # Admin Views
 @login_required
 @user_passes_test(is_admin)
@@ -89,13 +186,12 @@ def admin_user_management(request):
 @user_passes_test(lambda u: hasattr(u, 'profile') and u.profile.user_type in ['accountant', 'admin'])
 def accountant_workspace(request):
     # Get applications waiting for payment processing
-    pending_applications = LoanApplication.objects.filter(status='committee_approved')
-    total_amount = sum(app.final_approved_amount for app in pending_applications)
+    totals, pending_applications = workspace_queue(request.GET.get('cursor'), 'final_approved_amount', status='committee_approved')
     
     context = {
         'pending_applications': pending_applications,
-        'total_amount': total_amount,
-        'pending_payments': pending_applications.count(),
+        'total_amount': totals['total_amount'],
+        'pending_payments': totals['total_applications'],
     }
     return render(request, 'staff/accountant_workspace.html', context)
 
@@ -103,11 +199,89 @@ def accountant_workspace(request):
 @user_passes_test(lambda u: hasattr(u, 'profile') and u.profile.user_type in ['accountant', 'admin'])
 def payment_history(request):
     # Get all processed payments
-    processed_applications = LoanApplication.objects.filter(status__in=['payment_processing', 'disbursed'])
-    total_disbursed = sum(app.final_approved_amount for app in processed_applications if app.status == 'disbursed')
+    statuses = ['payment_processing', 'disbursed']
+    totals = LoanApplication.objects.filter(status__in=statuses).aggregate(
+        total_processed=Count('id'),
+        processing_count=Count('id', filter=Q(status='payment_processing')),
+        disbursed_count=Count('id', filter=Q(status='disbursed')),
+        total_disbursed=Sum('final_approved_amount', filter=Q(status='disbursed')),
+    )
+    
+    # Payment method of the accountant review, fetched alongside each row
+    payment_method = AccountantReview.objects.filter(
+        loan_application=OuterRef('pk')
+    ).order_by('pk').values('payment_method')[:1]
+    processed_applications = keyset_page(
+        workspace_queryset(status__in=statuses).annotate(payment_method=Subquery(payment_method)),
+        request.GET.get('cursor')
+    )
     
     context = {
         'processed_applications': processed_applications,
-        'total_disbursed': total_disbursed,
+        'total_processed': totals['total_processed'],
+        'processing_count': totals['processing_count'],
+        'disbursed_count': totals['disbursed_count'],
+        'total_disbursed': totals['total_disbursed'] or 0,
     }
     return render(request, 'staff/payment_history.html', context)
+
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'profile') and u.profile.user_type in ['accountant', 'admin'])
+def payroll_import(request):
+    """Upload the monthly payroll deduction file and post it as loan payments"""
+    result = None
+    if request.method == 'POST':
+        form = PayrollImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Read the upload line by line instead of loading it into memory
+            deductions = io.TextIOWrapper(form.cleaned_data['deductions_file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_payroll_deductions(
+                    deductions,
+                    reference=form.cleaned_data['reference'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except PayrollImportError:
+                messages.error(request, 'Makato ya mshahara yenye kumbukumbu hii yamesharekodiwa; faili halikurekodiwa tena.')
+            else:
+                if result.dry_run:
+                    messages.info(request, f'Ukaguzi umekamilika: mistari {result.posted_lines} kati ya {result.lines} inaweza kulipwa.')
+                else:
+                    messages.success(request, f'Malipo {result.payments} ya TZS {result.total_posted:,.2f} yamerekodiwa.')
+    else:
+        form = PayrollImportForm()
+    return render(request, 'staff/payroll_import.html', {'form': form, 'result': result})
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'profile') and u.profile.user_type in ['hr_officer', 'accountant', 'admin'])
+def payroll_deductions(request):
+    """Stream the month's per-member deduction file for the employer as CSV"""
+    try:
+        month = parse_month(request.GET.get('month', ''))
+    except ValueError:
+        month = timezone.localdate().replace(day=1)
+    response = StreamingHttpResponse(stream_deductions_csv(month), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="payroll_deductions_{month:%Y_%m}.csv"'
+    return response
+
+# Portfolio Export
+def can_export_portfolio(user):
+    return (
+        user.is_authenticated and hasattr(user, 'profile')
+        and user.profile.user_type in ['accountant', 'committee_member', 'admin']
+    )
+
+@login_required
+@user_passes_test(can_export_portfolio)
+def portfolio_export(request):
+    """Stream every loan application with its reviews and payments as CSV"""
+    filters = {}
+    if request.GET.get('status'):
+        filters['status'] = request.GET['status']
+    response = StreamingHttpResponse(
+        stream_portfolio_csv(portfolio_queryset(**filters)), content_type='text/csv'
+    )
+    filename = f"loan_portfolio_{timezone.localdate():%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
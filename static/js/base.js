@@ -0,0 +1,220 @@
+class MessageSystem {
+    constructor() {
+        this.container = document.getElementById('messageContainer');
+        this.messageQueue = [];
+        this.isProcessing = false;
+    }
+
+    show(message, type = 'info', duration = 5000) {
+        const messageElement = this.createMessageElement(message, type);
+        this.messageQueue.push({ element: messageElement, duration });
+
+        if (!this.isProcessing) {
+            this.processQueue();
+        }
+    }
+
+    createMessageElement(message, type) {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `message-popup ${type}`;
+
+        const icons = {
+            'success': 'fas fa-check-circle',
+            'error': 'fas fa-exclamation-circle',
+            'warning': 'fas fa-exclamation-triangle',
+            'info': 'fas fa-info-circle'
+        };
+
+        messageDiv.innerHTML = `
+            <div class="message-content">
+                <i class="message-icon ${icons[type] || icons.info}"></i>
+                <span class="message-text">${message}</span>
+                <button class="message-close" onclick="this.parentElement.parentElement.remove()">
+                    <i class="fas fa-times"></i>
+                </button>
+            </div>
+        `;
+
+        return messageDiv;
+    }
+
+    processQueue() {
+        if (this.messageQueue.length === 0) {
+            this.isProcessing = false;
+            return;
+        }
+
+        this.isProcessing = true;
+        const { element, duration } = this.messageQueue.shift();
+
+        this.container.appendChild(element);
+
+        // Trigger animation
+        setTimeout(() => {
+            element.classList.add('show');
+        }, 100);
+
+        // Auto-remove after duration
+        setTimeout(() => {
+            element.classList.remove('show');
+            setTimeout(() => {
+                if (element.parentNode) {
+                    element.remove();
+                }
+                this.processQueue();
+            }, 400);
+        }, duration);
+    }
+}
+
+// Initialize message system
+const messageSystem = new MessageSystem();
+
+// Override Django messages to use modern popups
+document.addEventListener('DOMContentLoaded', function() {
+    const legacyMessages = document.querySelectorAll('.alert');
+    legacyMessages.forEach(alert => {
+        const message = alert.querySelector('.message-text') || alert.textContent.trim();
+
+        // Only show messages that have actual content
+        if (message && message.length > 0 && message !== 'None' && message !== '') {
+            const type = alert.classList.contains('alert-success') ? 'success' :
+                       alert.classList.contains('alert-danger') ? 'error' :
+                       alert.classList.contains('alert-warning') ? 'warning' : 'info';
+
+            messageSystem.show(message, type);
+        }
+        alert.remove();
+    });
+});
+
+// Global function for other scripts to use
+window.showMessage = function(message, type, duration) {
+    messageSystem.show(message, type, duration);
+};
+
+// Sidebar Functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const sidebar = document.getElementById('sidebar');
+    const sidebarToggleMobile = document.getElementById('sidebarToggleMobile');
+    const sidebarClose = document.getElementById('sidebarClose');
+    const sidebarCollapseToggle = document.getElementById('sidebarCollapseToggle');
+    const sidebarOverlay = document.getElementById('sidebarOverlay');
+    const mainLayout = document.getElementById('mainLayout');
+
+    // Only run sidebar functionality if sidebar exists (authenticated users)
+    if (sidebar && mainLayout) {
+        // Check if sidebar was previously collapsed
+        const sidebarCollapsed = localStorage.getItem('sidebarCollapsed') === 'true';
+        if (sidebarCollapsed && window.innerWidth >= 992) {
+            sidebar.classList.add('collapsed');
+            mainLayout.classList.add('sidebar-collapsed');
+        }
+
+    function openSidebar() {
+        sidebar.classList.add('show');
+        sidebarOverlay.classList.add('show');
+        document.body.style.overflow = 'hidden';
+    }
+
+    function closeSidebar() {
+        sidebar.classList.remove('show');
+        sidebarOverlay.classList.remove('show');
+        document.body.style.overflow = '';
+    }
+
+    function toggleSidebarCollapse() {
+        if (window.innerWidth >= 992) {
+            sidebar.classList.toggle('collapsed');
+            mainLayout.classList.toggle('sidebar-collapsed');
+
+            // Save state to localStorage
+            localStorage.setItem('sidebarCollapsed', sidebar.classList.contains('collapsed'));
+        }
+    }
+
+    // Toggle sidebar (mobile)
+    if (sidebarToggleMobile) {
+        sidebarToggleMobile.addEventListener('click', openSidebar);
+    }
+
+    // Close sidebar (mobile)
+    sidebarClose.addEventListener('click', closeSidebar);
+
+    // Toggle sidebar collapse (desktop)
+    if (sidebarCollapseToggle) {
+        sidebarCollapseToggle.addEventListener('click', toggleSidebarCollapse);
+    }
+
+    // Close on overlay click
+    sidebarOverlay.addEventListener('click', closeSidebar);
+
+    // Close on escape key
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape' && sidebar.classList.contains('show')) {
+            closeSidebar();
+        }
+    });
+
+    // Handle window resize
+    window.addEventListener('resize', function() {
+        if (window.innerWidth < 992) {
+            // Mobile: close sidebar and remove collapsed state
+            if (sidebar.classList.contains('show')) {
+                closeSidebar();
+            }
+            sidebar.classList.remove('collapsed');
+            mainLayout.classList.remove('sidebar-collapsed');
+        } else {
+            // Desktop: restore collapsed state if it was set
+            if (localStorage.getItem('sidebarCollapsed') === 'desktop') {
+                sidebar.classList.add('collapsed');
+                mainLayout.classList.add('sidebar-collapsed');
+            }
+        }
+    });
+    } // End of sidebar functionality check
+});
+
+// Professional Card and Button Styling
+document.addEventListener('DOMContentLoaded', function() {
+    // Apply professional styling to all cards
+    const cards = document.querySelectorAll('.card');
+    cards.forEach(card => {
+        card.style.borderRadius = '0';
+        card.style.border = '1px solid var(--admin-border)';
+        card.style.boxShadow = '0 1px 3px rgba(0, 0, 0, 0.1)';
+    });
+
+    // Apply professional styling to all buttons
+    const buttons = document.querySelectorAll('.btn');
+    buttons.forEach(btn => {
+        btn.style.borderRadius = '0';
+        btn.style.fontWeight = '500';
+        btn.style.fontFamily = "'Inter', sans-serif";
+        btn.style.letterSpacing = '0.025em';
+    });
+
+    // Apply professional styling to form controls
+    const formControls = document.querySelectorAll('.form-control, .form-select');
+    formControls.forEach(control => {
+        control.style.borderRadius = '0';
+        control.style.border = '1px solid var(--admin-border)';
+        control.style.fontFamily = "'Inter', sans-serif";
+    });
+
+    // Apply professional styling to tables
+    const tables = document.querySelectorAll('.table');
+    tables.forEach(table => {
+        table.style.fontFamily = "'Inter', sans-serif";
+        table.style.fontSize = '0.9rem';
+    });
+
+    // Apply professional styling to badges
+    const badges = document.querySelectorAll('.badge');
+    badges.forEach(badge => {
+        badge.style.borderRadius = '0';
+        badge.style.fontWeight = '500';
+        badge.style.fontFamily = "'Inter', sans-serif";
+    });
+});
@@ -0,0 +1,242 @@
+// Read a JSON object embedded with the json_script template filter
+function readChartData(id) {
+    const element = document.getElementById(id);
+    return element ? JSON.parse(element.textContent) : null;
+}
+
+// Initialize charts
+document.addEventListener('DOMContentLoaded', function() {
+    // Loan Progress Chart for members
+    const loanCtx = document.getElementById('loanProgressChart');
+    if (loanCtx) {
+        new Chart(loanCtx, {
+        type: 'doughnut',
+        data: {
+                labels: ['Paid', 'Outstanding'],
+            datasets: [{
+                    data: [Number(loanCtx.dataset.paid), Number(loanCtx.dataset.outstanding)],
+                backgroundColor: [
+                        'rgba(39, 174, 96, 0.8)',
+                        'rgba(243, 156, 18, 0.8)'
+                    ],
+                    borderColor: [
+                        'rgba(39, 174, 96, 1)',
+                        'rgba(243, 156, 18, 1)'
+                    ],
+                    borderWidth: 2
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                        position: 'bottom',
+                        labels: {
+                            padding: 15,
+                            font: {
+                                size: 10,
+                                weight: 'bold'
+                            }
+                        }
+                }
+            }
+        }
+    });
+    }
+
+    // Admin Dashboard Charts, drawn from the data embedded in the page
+    const statusData = readChartData('status-chart-data');
+    const monthlyData = readChartData('monthly-chart-data');
+
+    // Status Distribution Chart
+    const statusCtx = document.getElementById('statusChart');
+    if (statusCtx && statusData) {
+        new Chart(statusCtx, {
+            type: 'pie',
+        data: {
+                labels: Object.keys(statusData),
+            datasets: [{
+                    data: Object.values(statusData),
+                    backgroundColor: [
+                        'rgba(139, 0, 0, 0.8)',
+                        'rgba(39, 174, 96, 0.8)',
+                        'rgba(52, 152, 219, 0.8)',
+                        'rgba(243, 156, 18, 0.8)',
+                        'rgba(155, 89, 182, 0.8)',
+                        'rgba(231, 76, 60, 0.8)'
+                    ],
+                    borderWidth: 2,
+                    borderColor: '#fff'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+                plugins: {
+                    legend: {
+                        position: 'bottom',
+                        labels: {
+                            padding: 15,
+                            font: {
+                                size: 10,
+                                weight: 'bold'
+                            }
+                        }
+                }
+            }
+        }
+    });
+    }
+
+    // Monthly Trends Chart
+    const monthlyCtx = document.getElementById('monthlyChart');
+    if (monthlyCtx && monthlyData) {
+        new Chart(monthlyCtx, {
+        type: 'line',
+        data: {
+                labels: Object.keys(monthlyData),
+            datasets: [{
+                label: 'Applications',
+                    data: Object.values(monthlyData),
+                borderColor: 'rgba(139, 0, 0, 1)',
+                backgroundColor: 'rgba(139, 0, 0, 0.1)',
+                    borderWidth: 2,
+                fill: true,
+                tension: 0.4
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+                plugins: {
+                    legend: {
+                        display: false
+                    }
+                },
+            scales: {
+                y: {
+                        beginAtZero: true,
+                        ticks: {
+                            stepSize: 1,
+                            font: {
+                                size: 10
+                            }
+                        }
+                    },
+                    x: {
+                        ticks: {
+                            font: {
+                                size: 10
+                            }
+                        }
+                }
+            }
+        }
+    });
+    }
+
+    // Add animation to stats cards
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach((entry) => {
+            if (entry.isIntersecting) {
+                entry.target.style.animationDelay = '0.1s';
+                entry.target.classList.add('animate-in');
+            }
+        });
+    });
+
+    document.querySelectorAll('.stats-card-compact').forEach((card) => {
+        observer.observe(card);
+    });
+
+    // Animate progress bar
+    setTimeout(() => {
+        const progressBar = document.querySelector('.progress-bar');
+        if (progressBar) {
+            const width = progressBar.getAttribute('style').match(/width:\s*([^%]+)%/);
+            if (width) {
+                progressBar.style.width = width[1] + '%';
+            }
+        }
+    }, 500);
+
+    // Add hover effects to table rows
+    const tableRows = document.querySelectorAll('tbody tr');
+    tableRows.forEach(row => {
+        row.addEventListener('mouseenter', function() {
+            this.style.backgroundColor = 'rgba(139, 0, 0, 0.05)';
+        });
+        row.addEventListener('mouseleave', function() {
+            this.style.backgroundColor = '';
+        });
+    });
+});
+
+// Function to toggle balance visibility with circular card expansion
+function toggleBalance() {
+    const balanceCard = document.getElementById('balanceCard');
+    const balanceAmount = document.getElementById('balanceAmount');
+    const blurredDiv = balanceAmount.querySelector('.balance-blurred');
+    const visibleDiv = balanceAmount.querySelector('.balance-visible');
+
+    if (visibleDiv.style.display === 'none' || visibleDiv.style.display === '') {
+        // Expand and reveal balance
+        balanceCard.classList.add('expanded');
+
+        setTimeout(() => {
+            blurredDiv.style.opacity = '0';
+            blurredDiv.style.transform = 'scale(0.8)';
+
+            setTimeout(() => {
+                blurredDiv.style.display = 'none';
+                visibleDiv.style.display = 'flex';
+                visibleDiv.style.opacity = '0';
+                visibleDiv.style.transform = 'scale(0.8)';
+
+                setTimeout(() => {
+                    visibleDiv.style.opacity = '1';
+                    visibleDiv.style.transform = 'scale(1)';
+                }, 50);
+            }, 200);
+        }, 300);
+    } else {
+        // Contract and hide balance
+        visibleDiv.style.opacity = '0';
+        visibleDiv.style.transform = 'scale(0.8)';
+
+        setTimeout(() => {
+            visibleDiv.style.display = 'none';
+            blurredDiv.style.display = 'flex';
+            blurredDiv.style.opacity = '0';
+            blurredDiv.style.transform = 'scale(0.8)';
+
+            setTimeout(() => {
+                blurredDiv.style.opacity = '1';
+                blurredDiv.style.transform = 'scale(1)';
+                balanceCard.classList.remove('expanded');
+            }, 200);
+        }, 100);
+    }
+}
+
+// Initialize balance card state
+document.addEventListener('DOMContentLoaded', function() {
+    const balanceCard = document.getElementById('balanceCard');
+    if (balanceCard) {
+        // Add click feedback
+        balanceCard.addEventListener('click', function() {
+            this.style.transform = 'scale(0.95)';
+            setTimeout(() => {
+                this.style.transform = '';
+            }, 150);
+        });
+    }
+});
+
+// Responsive chart resize
+window.addEventListener('resize', function() {
+    Chart.instances.forEach(chart => {
+        chart.resize();
+    });
+});
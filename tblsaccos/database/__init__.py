@@ -0,0 +1,54 @@
+"""
+SQLite database profile.
+
+Used as the database ENGINE ('tblsaccos.database'), which is Django's SQLite
+backend except that immediate_atomic() opens its transaction with BEGIN
+IMMEDIATE (see base.py). The project's write transactions use it (workflow
+transitions, the payroll import, member summary refreshes, schedule
+regeneration and notification archiving): they read and then write, and
+taking the write lock up front makes them queue for it instead of failing
+with "database is locked". transaction.atomic() keeps a plain BEGIN, so other
+transactions never wait for a writer.
+Every new connection is also tuned with the pragmas in
+settings.SQLITE_PRAGMAS through the connection_created signal (connected in
+AccountsConfig.ready):
+
+* journal_mode=WAL lets readers keep reading while a writer commits,
+* synchronous=NORMAL syncs the WAL at checkpoints rather than on every commit;
+  the database cannot be corrupted, though a power cut may lose the last commits,
+* busy_timeout makes a connection wait for a lock instead of failing at once,
+* mmap_size and cache_size keep hot pages in memory.
+
+With CONN_MAX_AGE each worker thread reuses its connection across requests,
+so opening and tuning a connection is paid once rather than on every request.
+"""
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to a newly opened SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def immediate_atomic(using=None):
+    """
+    transaction.atomic() whose transaction holds SQLite's write lock from its
+    first statement, serializing it against every other writer. Nested in an
+    open transaction it is a plain savepoint; on other backends it is atomic().
+    """
+    connection = transaction.get_connection(using)
+    connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            connection.begin_immediate = False
+            yield
+    finally:
+        connection.begin_immediate = False
@@ -0,0 +1,16 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    # Set by tblsaccos.database.immediate_atomic() for the transaction it opens
+    begin_immediate = False
+
+    def _start_transaction_under_autocommit(self):
+        # A plain BEGIN takes the write lock only at the first write. If another
+        # connection has written meanwhile, SQLite fails that upgrade at once with
+        # "database is locked", whatever the busy timeout. Write transactions that
+        # read before they write take the lock up front instead and wait their
+        # turn; every other transaction keeps a plain BEGIN, so readers are never
+        # queued behind a writer.
+        self.cursor().execute('BEGIN IMMEDIATE' if self.begin_immediate else 'BEGIN')
@@ -20,11 +20,15 @@ ALLOWED_HOSTS = [
     '127.0.0.1',
 ]
 
-# Database configuration for production
+# Database configuration for production (SQLite with the tblsaccos.database profile)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'tblsaccos.database',
         'NAME': BASE_DIR / 'tblsaccos_production.db',
+        # Keep each worker's connection open between requests; the SQLite
+        # pragmas come from SQLITE_PRAGMAS in settings
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -32,6 +36,18 @@ DATABASES = {
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATIC_URL = '/static/'
 
+# Content-hashed static files, precompressed with gzip (and brotli when the
+# Brotli package is installed) by collectstatic. WhiteNoise serves hashed
+# names with far-future, immutable cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files configuration for production
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
@@ -78,13 +94,8 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', 'your-email@gmail.com')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', 'your-app-password')
 
-# Cache configuration for production
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
-}
+# Cache configuration for production: the shared backend from settings (files
+# on disk, or Redis with REDIS_URL), so every worker sees the same cache
 
 # Session configuration for production
 SESSION_COOKIE_AGE = 3600  # 1 hour
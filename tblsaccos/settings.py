@@ -63,10 +63,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'accounts.context_processors.user_type_processor',
-                'accounts.context_processors.notifications_processor',
-                'accounts.context_processors.guarantor_requests_processor',
-                'accounts.context_processors.pending_payments_processor',
-                'accounts.context_processors.pending_applications_processor',
+                'accounts.context_processors.nav_counters_processor',
             ],
         },
     },
@@ -77,11 +74,23 @@ WSGI_APPLICATION = 'tblsaccos.wsgi.application'
 # Database
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'tblsaccos.database',
         'NAME': BASE_DIR / 'tblsaccos_new.db',
+        # Keep each worker's connection open between requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Applied to every new SQLite connection by tblsaccos.database
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative: KiB, i.e. 64 MB
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +124,49 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache shared by every worker: Redis when REDIS_URL is set, otherwise files on
+# local disk (CACHE_BACKEND=database keeps it in the SQLite database instead;
+# run `python manage.py createcachetable` once)
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if REDIS_URL else 'file')
+CACHE_BACKENDS = {
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'database': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'tblsaccos_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+CACHES = {
+    'default': dict(CACHE_BACKENDS[CACHE_BACKEND], KEY_PREFIX='tblsaccos'),
+}
+
+# Runs the test suite with an in-memory cache
+TEST_RUNNER = 'tblsaccos.test_runner.LocalCacheTestRunner'
+
+# Files that must never be served directly, unlike MEDIA_ROOT
+PRIVATE_ROOT = BASE_DIR / 'private'
+
+# Rendered loan application PDFs, one file per application version. They hold
+# salary and loan details, so they live outside MEDIA_ROOT and are only served
+# by the download view, which checks permissions.
+LOAN_PDF_CACHE_DIR = PRIVATE_ROOT / 'loan_pdfs'
+LOAN_PDF_BACKGROUND_RENDERING = True
+
+# Repayment schedule method: 'flat' or 'reducing_balance'
+LOAN_AMORTIZATION_METHOD = 'flat'
+
+# Seconds between checks of the shared loan type version by each worker
+LOAN_TYPE_REGISTRY_CHECK_INTERVAL = 1
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -145,3 +197,10 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 
 # Email settings (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Also email in-app notifications to recipients (sent in the background)
+NOTIFICATION_EMAIL_DELIVERY = False
+
+# Read notifications older than this many days are moved to the archive
+# by the daily `archive_notifications` task
+NOTIFICATION_RETENTION_DAYS = 90